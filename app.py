@@ -1,9 +1,19 @@
 # app.py
 
 from middleware.session import SessionMiddleware
+from middleware.query_stats import QueryStatsMiddleware
+from middleware.metrics import MetricsMiddleware
+from middleware.unavailable import UnavailableMiddleware
+from middleware.profiler import ProfilerMiddleware
+from middleware.i18n import I18nMiddleware
 from routes.login import login_handler
 from routes.dashboard import home_handler, domain_handler, mailbox_handler
 from routes.mailbox_creation import create_mailbox_handler
+from routes.mailbox_import import import_mailboxes_handler
+from routes.export import export_handler
+from routes.alias_bulk import bulk_aliases_handler
+from routes.search import search_handler, autocomplete_handler
+from routes.api import API_ROUTES
 from routes.user_management import (
     edit_alias_handler,
     add_alias_handler,
@@ -18,6 +28,7 @@ from routes.moderation import (
 )
 from routes.register import register_handler
 from routes.logout import logout_handler
+from routes.language import language_handler
 from handlers.static import static_handler
 from utils.check_super_admin_exists import check_super_admin_exists
 from routes.initial_setup import config_wizard_handler
@@ -27,6 +38,7 @@ import os
 log_dir = '/var/log/pymailadmin'
 
 from libs import config
+from utils.db import PoolTimeout
 
 logging.basicConfig(
     level=logging.ERROR,
@@ -37,6 +49,40 @@ logging.basicConfig(
     ]
 )
 
+# Slow statements, see DB_SLOW_QUERY_MS
+slow_query_handler = logging.FileHandler('/var/log/pymailadmin/slow-query.log')
+slow_query_handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+slow_query_logger = logging.getLogger('pymailadmin.slow_query')
+slow_query_logger.setLevel(logging.WARNING)
+slow_query_logger.addHandler(slow_query_handler)
+slow_query_logger.propagate = False
+
+# Path -> handler
+ROUTES = {
+    '/login': login_handler,
+    '/home': home_handler,
+    '/domain': domain_handler,
+    '/mailbox': mailbox_handler,
+    '/createmailbox': create_mailbox_handler,
+    '/import': import_mailboxes_handler,
+    '/export': export_handler,
+    '/aliases/bulk': bulk_aliases_handler,
+    '/search': search_handler,
+    '/search/autocomplete': autocomplete_handler,
+    '/editalias': edit_alias_handler,
+    '/addalias': add_alias_handler,
+    '/edituser': edit_user_handler,
+    '/deleteuser': delete_user_handler,
+    '/register': register_handler,
+    '/register/confirm': confirm_registration_handler,
+    '/moderate/pending': moderation_queue_handler,
+    '/moderate/approve': approve_registration_handler,
+    '/moderate/deny': deny_registration_handler,
+    '/logout': logout_handler,
+    '/language': language_handler,
+    **API_ROUTES,
+}
+
 def application(environ, start_response):
     path = environ.get('PATH_INFO', '').rstrip('/')
     
@@ -54,46 +100,25 @@ def application(environ, start_response):
     try:
         # Routes
         if path == '' or path == '/':
+            environ['pymailadmin.route'] = '/'
             start_response("302 Found", [("Location", "/login")])
             return [b"Redirecting to login..."]
-        elif path == '/login':
-            response = login_handler(environ, start_response)
-        elif path == '/home':
-            response = home_handler(environ, start_response)
-        elif path == '/domain':
-            response = domain_handler(environ, start_response)
-        elif path == '/mailbox':
-            response = mailbox_handler(environ, start_response)
-        elif path == '/createmailbox':
-            response = create_mailbox_handler(environ, start_response)
-        elif path == '/editalias':
-            response = edit_alias_handler(environ, start_response)
-        elif path == '/addalias':
-            response = add_alias_handler(environ, start_response)
-        elif path == '/edituser':
-            response = edit_user_handler(environ, start_response)
-        elif path == '/deleteuser':
-            response = delete_user_handler(environ, start_response)
-        elif path.startswith('/static/'):
-            response = static_handler(environ, start_response)
-        elif path == '/register':
-            response = register_handler(environ, start_response)
-        elif path == '/register/confirm':
-            response = confirm_registration_handler(environ, start_response)
-        elif path == '/moderate/pending':
-            response = moderation_queue_handler(environ, start_response)
-        elif path == '/moderate/approve':
-            response = approve_registration_handler(environ, start_response)
-        elif path == '/moderate/deny':
-            response = deny_registration_handler(environ, start_response)
-        elif path == '/logout':
-            response = logout_handler(environ, start_response)
+        
+        if path.startswith('/static/'):
+            route, handler = '/static', static_handler
         else:
+            route, handler = path, ROUTES.get(path)
+        
+        if handler is None:
+            environ['pymailadmin.route'] = 'fallback'
             start_response("302 Found", [("Location", "/login")])
             return [b"Redirecting to login (fallback)"]
+        
+        # Route label for metrics (unknown paths never get their own)
+        environ['pymailadmin.route'] = route
+        response = handler(environ, start_response)
 
-        response = list(response) if response is not None else [b'Internal Server Error']
-
+        # Iterables (e.g. streamed listings) are passed through untouched
         if response is None:
             logging.error(f"Handler for {path} returned None")
             start_response("500 Internal Server Error", [("Content-Type", "text/plain")])
@@ -101,11 +126,15 @@ def application(environ, start_response):
 
         return response
 
+    except PoolTimeout:
+        # Answered 503 by UnavailableMiddleware
+        raise
+
     except Exception as e:
         logging.error(f"Unhandled exception in handler for {path}: {e}", exc_info=True)
         start_response("500 Internal Server Error", [("Content-Type", "text/plain")])
         return [b"Internal Server Error"]
 
 # Middleware
-app = SessionMiddleware(application)
+app = MetricsMiddleware(QueryStatsMiddleware(UnavailableMiddleware(SessionMiddleware(I18nMiddleware(ProfilerMiddleware(application))))))
 
@@ -0,0 +1,195 @@
+# asgi.py
+#
+# ASGI entry point, serving the same routes as the WSGI app:app.
+#
+#   uvicorn asgi:app --host 127.0.0.1 --port 8686
+#   gunicorn -k uvicorn.workers.UvicornWorker --workers 2 asgi:app
+#
+# The event loop holds the client connections (keep-alive, request bodies
+# being uploaded) while the handlers, which block on MySQL, doveadm, SMTP and
+# password hashing, run on a bounded thread pool of ASGI_THREADS (by default
+# half of DB_POOL_SIZE: a streaming page holds two connections at once).
+# argon2/bcrypt and the database drivers release the GIL while they wait or
+# hash, so one process serves many concurrent admins.
+
+import asyncio
+import contextvars
+import io
+import logging
+import signal
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from app import app as wsgi_app
+from libs import config, reload_config
+
+# Handler threads without a MySQL pool to size them from
+DEFAULT_THREADS = 8
+
+def handler_threads():
+    threads = config['asgi']['threads']
+    if threads:
+        return threads
+
+    db_conf = config['db']
+    if db_conf['driver'] == 'mysql' and db_conf.get('pool_size', 0) > 0:
+        return max(1, db_conf['pool_size'] // 2)
+    return DEFAULT_THREADS
+
+executor = ThreadPoolExecutor(
+    max_workers=handler_threads(),
+    thread_name_prefix='pymailadmin-asgi',
+)
+
+def build_environ(scope, body):
+    """WSGI environ (PEP 3333) for an ASGI HTTP scope"""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        # WSGI strings are bytes decoded as latin-1
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': client[0],
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+
+        if name == 'CONTENT_TYPE':
+            environ['CONTENT_TYPE'] = value
+            continue
+        if name == 'CONTENT_LENGTH':
+            continue
+
+        key = f"HTTP_{name}"
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+
+    return environ
+
+async def read_body(receive, max_bytes):
+    """Whole request body, or None if it is larger than max_bytes"""
+    chunks = []
+    size = 0
+
+    while True:
+        message = await receive()
+
+        if message['type'] == 'http.disconnect':
+            return None
+
+        chunk = message.get('body', b'')
+        size += len(chunk)
+        if size > max_bytes:
+            return None
+        chunks.append(chunk)
+
+        if not message.get('more_body', False):
+            return b"".join(chunks)
+
+def run_wsgi(environ, send_sync):
+    """
+    Run the WSGI app in a pool thread. Headers go out with the first
+    non-empty chunk, as a WSGI server would; each chunk is handed to the
+    event loop and waited for, so slow clients throttle the response.
+    """
+    state = {'status': None, 'headers': None, 'sent': False}
+
+    def start_response(status, headers, exc_info=None):
+        if exc_info and state['sent']:
+            raise exc_info[1].with_traceback(exc_info[2])
+        state['status'] = status
+        state['headers'] = headers
+
+    def send_start():
+        if not state['sent']:
+            state['sent'] = True
+            send_sync({
+                'type': 'http.response.start',
+                'status': int(state['status'].split(' ', 1)[0]),
+                'headers': [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in state['headers']],
+            })
+
+    response = wsgi_app(environ, start_response)
+    try:
+        for chunk in response:
+            if chunk:
+                send_start()
+                send_sync({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+        send_start()
+        send_sync({'type': 'http.response.body', 'body': b'', 'more_body': False})
+    finally:
+        if hasattr(response, 'close'):
+            response.close()
+
+async def http(scope, receive, send):
+    body = await read_body(receive, config['asgi']['max_body_bytes'])
+
+    if body is None:
+        await send({'type': 'http.response.start', 'status': 413, 'headers': [(b'content-type', b'text/plain')]})
+        await send({'type': 'http.response.body', 'body': b"Request Entity Too Large"})
+        return
+
+    loop = asyncio.get_running_loop()
+
+    def send_sync(message):
+        asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+    # Each request gets a fresh context: pool threads are reused
+    context = contextvars.copy_context()
+
+    try:
+        await loop.run_in_executor(executor, context.run, run_wsgi, build_environ(scope, body), send_sync)
+    except Exception as e:
+        logging.error(f"Unhandled exception in ASGI adapter for {scope.get('path')}: {e}", exc_info=True)
+        try:
+            await send({'type': 'http.response.start', 'status': 500, 'headers': [(b'content-type', b'text/plain')]})
+            await send({'type': 'http.response.body', 'body': b"Internal Server Error"})
+        except Exception:
+            # Response already started: the server closes the connection
+            pass
+
+def watch_reload_signal():
+    """
+    SIGHUP re-reads .env in place when uvicorn runs the app directly (under
+    gunicorn, the master handles it and replaces the workers).
+    """
+    try:
+        asyncio.get_running_loop().add_signal_handler(signal.SIGHUP, reload_config)
+    except (NotImplementedError, RuntimeError, AttributeError):
+        # No SIGHUP on this platform, or not the main thread
+        pass
+
+async def lifespan(scope, receive, send):
+    while True:
+        message = await receive()
+
+        if message['type'] == 'lifespan.startup':
+            watch_reload_signal()
+            await send({'type': 'lifespan.startup.complete'})
+
+        elif message['type'] == 'lifespan.shutdown':
+            # Wait off the loop: threads still streaming a response need it in send_sync
+            await asyncio.get_running_loop().run_in_executor(None, executor.shutdown)
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+async def app(scope, receive, send):
+    if scope['type'] == 'http':
+        await http(scope, receive, send)
+    elif scope['type'] == 'lifespan':
+        await lifespan(scope, receive, send)
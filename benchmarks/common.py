@@ -0,0 +1,201 @@
+# benchmarks/common.py
+
+import io
+import json
+import os
+import secrets
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# --- Environment ---
+def configure_environment(smtp_address=None, doveadm_url=None):
+    """
+    Point the app to local sinks. Must run before anything imports libs:
+    load_dotenv() never overrides variables already set in os.environ.
+    """
+    if smtp_address:
+        os.environ['MAIL_SMTP_HOST'] = smtp_address[0]
+        os.environ['MAIL_SMTP_PORT'] = str(smtp_address[1])
+        os.environ['MAIL_SMTP_PROTOCOL'] = 'plain'
+        os.environ.setdefault('MAIL_SMTP_USERNAME', 'bench')
+        os.environ.setdefault('MAIL_SMTP_PASSWORD', 'bench')
+        os.environ.setdefault('MAIL_FROM_EMAIL', 'bench@pymailadmin.test')
+    
+    if doveadm_url:
+        os.environ['DOVEADM_HTTP_API_URL'] = doveadm_url
+        os.environ.setdefault('DOVEADM_HTTP_API_SECRET_KEY', 'bench')
+
+def load_app():
+    from app import app
+    return app
+
+# --- Doveadm HTTP API stub ---
+class _DoveadmStubHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        payload = json.loads(self.rfile.read(length) or b'{}')
+        
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        
+        response = [["doveadmResponse", [], c.get('tag', '')] for c in payload.get('commands', [])]
+        body = json.dumps(response).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class DoveadmStub:
+    """Answers every doveadm HTTP API command with an empty success response"""
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0):
+        self._server = ThreadingHTTPServer((host, port), _DoveadmStubHandler)
+        self._server.daemon_threads = True
+        self._server.latency = latency
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}/doveadm/v1"
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+# --- Sessions ---
+def make_session_cookie(data=None):
+    """Persist a session with the given data and return (cookie header, csrf token)"""
+    from libs import config
+    from middleware.session import Session, sign_session_id
+    
+    session = Session()
+    session.data.update(data or {})
+    token = session.get_csrf_token()
+    session.save()
+    return f"session_id={sign_session_id(session.id, config['SECRET_KEY'])}", token
+
+# --- WSGI driver ---
+def call_app(app, method, path, query_string='', body=b'', cookie=None, remote_addr='127.0.0.1', headers=None):
+    """Run one request through the WSGI callable, return (status, headers, body, seconds)"""
+    environ = {
+        'REQUEST_METHOD': method,
+        'PATH_INFO': path,
+        'QUERY_STRING': query_string,
+        'CONTENT_TYPE': 'application/x-www-form-urlencoded',
+        'CONTENT_LENGTH': str(len(body)),
+        'REMOTE_ADDR': remote_addr,
+        'SERVER_NAME': 'localhost',
+        'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': 'http',
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': io.StringIO(),
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    
+    if cookie:
+        environ['HTTP_COOKIE'] = cookie
+    
+    for name, value in (headers or {}).items():
+        environ['HTTP_' + name.upper().replace('-', '_')] = value
+    
+    response_status = []
+    response_headers = []
+
+    def start_response(status, headers, exc_info=None):
+        response_status.append(status)
+        response_headers.extend(headers)
+
+    start = time.perf_counter()
+    result = app(environ, start_response)
+    
+    try:
+        payload = b"".join(result)
+    finally:
+        if hasattr(result, 'close'):
+            result.close()
+    
+    elapsed = time.perf_counter() - start
+    return (response_status[0] if response_status else None), response_headers, payload, elapsed
+
+def unique_suffix():
+    return secrets.token_hex(6)
+
+# --- Load generation ---
+# Synthetic data lives under this domain so that it can be cleaned up
+BENCH_DOMAIN = 'pymailadmin.test'
+
+def bench_ip(i):
+    """Addresses from the 198.18.0.0/15 benchmarking range, one per request"""
+    return f"198.18.{(i // 250) % 250}.{i % 250 + 1}"
+
+def hash_mailbox_password(password):
+    from libs import config
+    from utils.mailbox_hash import hash_mailbox_password as hash_password
+    
+    return hash_password(password, config['mailbox_hash'])
+
+def run_workers(count, concurrency, worker_fn):
+    """Split request indices across threads; worker_fn(worker, index) returns (status, seconds)"""
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+
+    def worker(w):
+        for i in range(w, count, concurrency):
+            status, seconds = worker_fn(w, i)
+            with lock:
+                latencies.append(seconds)
+                if not status or status[0] not in '23':
+                    errors.append(status)
+
+    threads = [threading.Thread(target=worker, args=(w,)) for w in range(concurrency)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return latencies, errors, time.perf_counter() - start
+
+# --- Statistics ---
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * pct / 100
+    low = int(k)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (k - low)
+
+def summarize(latencies, elapsed, errors=0, messages=None):
+    """Latency percentiles in milliseconds plus throughput"""
+    values = sorted(latencies)
+    summary = {
+        'requests': len(values),
+        'errors': errors,
+        'elapsed_s': round(elapsed, 3),
+        'requests_per_s': round(len(values) / elapsed, 2) if elapsed else 0.0,
+        'mean_ms': round(sum(values) / len(values) * 1000, 2) if values else 0.0,
+        'p50_ms': round(percentile(values, 50) * 1000, 2),
+        'p90_ms': round(percentile(values, 90) * 1000, 2),
+        'p95_ms': round(percentile(values, 95) * 1000, 2),
+        'p99_ms': round(percentile(values, 99) * 1000, 2),
+        'max_ms': round(values[-1] * 1000, 2) if values else 0.0,
+    }
+    
+    if messages is not None:
+        summary['messages'] = messages
+        summary['messages_per_s'] = round(messages / elapsed, 2) if elapsed else 0.0
+    
+    return summary
@@ -0,0 +1,122 @@
+# benchmarks/login.py
+#
+# Logins per second through the WSGI app at a given admin argon2 cost, for
+# each outcome of POST /login: success, wrong password, unknown email and
+# malformed form (rejected before any query or hash). With the dummy hash,
+# an unknown email should cost about as much as a wrong password.
+#
+# Runs against the database configured in .env and cleans up what it seeds:
+#   python3 -m benchmarks.login --requests 100 --concurrency 4
+#   python3 -m benchmarks.login --time-cost 3 --memory-cost 67108864 --parallelism 2
+#
+# Costs use the units of ADMIN_HASH_TIME_COST, ADMIN_HASH_MEMORY_COST and
+# ADMIN_HASH_PARALLELISM, which are set from them for the run.
+
+import argparse
+import json
+import os
+import sys
+import time
+from urllib.parse import urlencode
+
+from benchmarks.common import (
+    BENCH_DOMAIN, configure_environment, load_app, make_session_cookie, call_app,
+    summarize, unique_suffix, bench_ip, run_workers
+)
+
+BENCH_PASSWORD = 'bench-password-0'
+
+# outcome -> (email, password) of the form; {email} is the seeded admin
+OUTCOMES = {
+    'success': ('{email}', BENCH_PASSWORD),
+    'wrong_password': ('{email}', 'bench-wrong-password'),
+    'unknown_email': ('bench-unknown-{suffix}@' + BENCH_DOMAIN, BENCH_PASSWORD),
+    'malformed': ('not-an-email', BENCH_PASSWORD),
+}
+
+def run_outcome(app, outcome, email, count, concurrency, suffix, first_ip):
+    form_email, password = OUTCOMES[outcome]
+    form_email = form_email.format(email=email, suffix=suffix)
+
+    # A fresh session per request (a logged-in one short-circuits the form),
+    # a client address per request (no rate limit block)
+    sessions = [make_session_cookie() for _ in range(count)]
+
+    def one(w, i):
+        cookie, token = sessions[i]
+        body = urlencode({'csrf_token': token, 'email': form_email, 'password': password}).encode()
+        status, _, _, seconds = call_app(app, 'POST', '/login', body=body, cookie=cookie, headers={'X-Forwarded-For': bench_ip(first_ip + i)})
+        # Refused logins are the expected outcome here
+        if outcome != 'success' and status and status[:3] in ('400', '401'):
+            status = '200 OK'
+        return status, seconds
+
+    return run_workers(count, concurrency, one)
+
+def hash_verify_ms(password_hash, rounds=5):
+    """Time of one argon2 verify at this cost, without the app around it"""
+    from utils.security import verify_admin_password
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        verify_admin_password(BENCH_PASSWORD, password_hash)
+    return round((time.perf_counter() - start) / rounds * 1000, 2)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure POST /login throughput at a given argon2 cost")
+    parser.add_argument('--outcomes', default=','.join(OUTCOMES), help="Comma-separated outcomes to run")
+    parser.add_argument('--requests', type=int, default=50, help="Requests per outcome")
+    parser.add_argument('--concurrency', type=int, default=1, help="Concurrent client threads")
+    parser.add_argument('--time-cost', type=int, help="argon2 time cost (ADMIN_HASH_TIME_COST)")
+    parser.add_argument('--memory-cost', type=int, help="argon2 memory cost in bytes (ADMIN_HASH_MEMORY_COST)")
+    parser.add_argument('--parallelism', type=int, help="argon2 parallelism (ADMIN_HASH_PARALLELISM)")
+    parser.add_argument('--output', help="Write JSON results to this file instead of stdout")
+    args = parser.parse_args(argv)
+
+    outcomes = [o.strip() for o in args.outcomes.split(',') if o.strip()]
+    unknown = [o for o in outcomes if o not in OUTCOMES]
+    if unknown:
+        parser.error(f"Unknown outcomes: {', '.join(unknown)}")
+
+    for name, value in (('ADMIN_HASH_TIME_COST', args.time_cost), ('ADMIN_HASH_MEMORY_COST', args.memory_cost), ('ADMIN_HASH_PARALLELISM', args.parallelism)):
+        if value is not None:
+            os.environ[name] = str(value)
+
+    configure_environment()
+    app = load_app()
+
+    from libs import config, execute_query
+    from utils.security import hash_admin_password
+
+    suffix = unique_suffix()
+    email = f"bench-login-{suffix}@{BENCH_DOMAIN}"
+    password_hash = hash_admin_password(BENCH_PASSWORD)
+    admin_id = execute_query(config['sql']['insert_admin_user'], (email, password_hash))
+
+    cost = config['security']['argon2id']
+    results = {
+        'argon2': {'time_cost': cost['time_cost'], 'memory_cost': cost['memory_cost'], 'parallelism': cost['threads']},
+        'hash_verify_ms': hash_verify_ms(password_hash),
+        'concurrency': args.concurrency,
+        'outcomes': {},
+    }
+
+    try:
+        for n, outcome in enumerate(outcomes):
+            latencies, errors, elapsed = run_outcome(app, outcome, email, args.requests, args.concurrency, suffix, n * args.requests)
+            results['outcomes'][outcome] = summarize(latencies, elapsed, errors=len(errors))
+    finally:
+        execute_query("DELETE FROM pymailadmin_admin_users WHERE id = %s", (admin_id,))
+        for i in range(len(outcomes) * args.requests):
+            execute_query("DELETE FROM pymailadmin_rate_limits WHERE `key` = %s", (f"ip:{bench_ip(i)}",))
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
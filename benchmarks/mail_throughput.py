@@ -0,0 +1,170 @@
+# benchmarks/mail_throughput.py
+#
+# End-to-end cost of the synchronous send_email path, measured through the
+# WSGI app against a local SMTP sink with configurable accept latency.
+#
+# Runs against the database configured in .env and cleans up what it seeds:
+#   python3 -m benchmarks.mail_throughput --requests 50 --latency 0.5
+#
+# Flows: register (POST /register), approve (POST /moderate/approve),
+# password (POST /edituser).
+
+import argparse
+import json
+import sys
+from urllib.parse import urlencode
+
+from benchmarks.common import (
+    BENCH_DOMAIN, configure_environment, load_app, make_session_cookie, call_app,
+    summarize, unique_suffix, bench_ip, hash_mailbox_password, run_workers, DoveadmStub
+)
+from benchmarks.smtp_sink import SMTPSink
+
+# --- Flows ---
+def flow_register(app, count, concurrency, suffix):
+    from libs import config, execute_query
+    
+    emails = [f"bench-reg-{suffix}-{i}@{BENCH_DOMAIN}" for i in range(count)]
+    sessions = [make_session_cookie() for _ in range(concurrency)]
+
+    def one(w, i):
+        cookie, token = sessions[w]
+        body = urlencode({'csrf_token': token, 'email': emails[i], 'password': 'bench-password-0', 'reason': 'benchmark'}).encode()
+        status, _, _, seconds = call_app(app, 'POST', '/register', body=body, cookie=cookie, headers={'X-Forwarded-For': bench_ip(i)})
+        return status, seconds
+
+    try:
+        return run_workers(count, concurrency, one)
+    finally:
+        for i, email in enumerate(emails):
+            execute_query(config['sql']['delete_registration_by_email'], (email,))
+            execute_query("DELETE FROM pymailadmin_rate_limits WHERE `key` = %s", (f"ip:{bench_ip(i)}",))
+
+def flow_approve(app, count, concurrency, suffix):
+    from libs import config, execute_query, datetime, timedelta
+    
+    emails = [f"bench-approve-{suffix}-{i}@{BENCH_DOMAIN}" for i in range(count)]
+    expires_at = datetime.now() + timedelta(hours=1)
+    
+    for email in emails:
+        execute_query(config['sql']['insert_admin_registration'], (email, 'x', f"bench-{email}", expires_at, 'benchmark'))
+        execute_query("UPDATE pymailadmin_admin_registrations SET confirmed = 1 WHERE email = %s", (email,))
+    
+    admin = {'logged_in': True, 'role': 'super_admin', 'id': 0, 'email': f"bench-admin-{suffix}@{BENCH_DOMAIN}"}
+    sessions = [make_session_cookie(admin) for _ in range(concurrency)]
+
+    def one(w, i):
+        cookie, token = sessions[w]
+        body = urlencode({'csrf_token': token, 'email': emails[i]}).encode()
+        status, _, _, seconds = call_app(app, 'POST', '/moderate/approve', body=body, cookie=cookie)
+        return status, seconds
+
+    try:
+        return run_workers(count, concurrency, one)
+    finally:
+        for email in emails:
+            execute_query(config['sql']['delete_registration_by_email'], (email,))
+            execute_query("DELETE FROM pymailadmin_admin_users WHERE email = %s", (email,))
+
+def flow_password(app, count, concurrency, suffix):
+    from libs import config, execute_query
+    from config_loader import load_db_schema
+    from utils.ownership import add_ownership, remove_ownership
+    
+    schema = load_db_schema()
+    domain_name = f"bench-{suffix}.{BENCH_DOMAIN}"
+    owner_email = f"bench-owner-{suffix}@{BENCH_DOMAIN}"
+    
+    domain_id = execute_query(
+        f"INSERT INTO {schema['table_domains']} ({schema['field_domain_name']}) VALUES (%s)", (domain_name,)
+    )
+    owner_id = execute_query(config['sql']['insert_admin_user'], (owner_email, 'x'))
+    
+    # One mailbox per worker: each worker chains password changes on its own mailbox
+    mailboxes = []
+    for w in range(concurrency):
+        email = f"bench-mbx-{w}@{domain_name}"
+        user_id = execute_query(
+            config['sql_dovecot']['insert_user'],
+            (domain_id, email, hash_mailbox_password('bench-password-0'), 1, 1)
+        )
+        add_ownership(owner_id, user_id, 1)
+        mailboxes.append(user_id)
+    
+    admin = {'logged_in': True, 'role': 'user', 'id': owner_id, 'email': owner_email}
+    sessions = [make_session_cookie(admin) for _ in range(concurrency)]
+    generations = [0] * concurrency
+
+    def one(w, i):
+        cookie, token = sessions[w]
+        old = f"bench-password-{generations[w]}"
+        new = f"bench-password-{generations[w] + 1}"
+        body = urlencode({'csrf_token': token, 'user_id': mailboxes[w], 'old_password': old, 'password': new}).encode()
+        status, _, _, seconds = call_app(app, 'POST', '/edituser', body=body, cookie=cookie)
+        if status and status.startswith('200'):
+            generations[w] += 1
+        return status, seconds
+
+    try:
+        return run_workers(count, concurrency, one)
+    finally:
+        for user_id in mailboxes:
+            remove_ownership(owner_id, user_id)
+            execute_query(config['sql_dovecot']['delete_user'], (user_id,))
+        execute_query(f"DELETE FROM {schema['table_domains']} WHERE {schema['field_domain_id']} = %s", (domain_id,))
+        execute_query("DELETE FROM pymailadmin_admin_users WHERE id = %s", (owner_id,))
+
+FLOWS = {
+    'register': flow_register,
+    'approve': flow_approve,
+    'password': flow_password,
+}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure mail-sending flows against a local SMTP sink")
+    parser.add_argument('--flows', default='register,approve,password', help="Comma-separated flows to run")
+    parser.add_argument('--requests', type=int, default=20, help="Requests per flow")
+    parser.add_argument('--concurrency', type=int, default=1, help="Concurrent client threads")
+    parser.add_argument('--latency', type=float, default=0.0, help="Seconds the sink waits before accepting a message")
+    parser.add_argument('--connect-latency', type=float, default=0.0, help="Seconds the sink waits before its greeting")
+    parser.add_argument('--doveadm-latency', type=float, default=0.0, help="Seconds the doveadm stub waits per call")
+    parser.add_argument('--output', help="Write JSON results to this file instead of stdout")
+    args = parser.parse_args(argv)
+
+    flows = [f.strip() for f in args.flows.split(',') if f.strip()]
+    unknown = [f for f in flows if f not in FLOWS]
+    if unknown:
+        parser.error(f"Unknown flows: {', '.join(unknown)}")
+
+    sink = SMTPSink(latency=args.latency, connect_latency=args.connect_latency).start()
+    doveadm = DoveadmStub(latency=args.doveadm_latency).start()
+    configure_environment(smtp_address=sink.address, doveadm_url=doveadm.url)
+    app = load_app()
+    
+    results = {
+        'smtp_latency_s': args.latency,
+        'smtp_connect_latency_s': args.connect_latency,
+        'concurrency': args.concurrency,
+        'flows': {},
+    }
+    
+    try:
+        for name in flows:
+            suffix = unique_suffix()
+            before = sink.messages
+            latencies, errors, elapsed = FLOWS[name](app, args.requests, args.concurrency, suffix)
+            results['flows'][name] = summarize(latencies, elapsed, errors=len(errors), messages=sink.messages - before)
+    finally:
+        sink.stop()
+        doveadm.stop()
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,305 @@
+# benchmarks/run.py
+#
+# Load test of the main pages and forms against a data set made by
+# benchmarks/seed.py, either through app.app in-process or over HTTP
+# against a local gunicorn started for the run.
+#
+#   python3 -m benchmarks.seed --scale 1k
+#   python3 -m benchmarks.run --requests 200 --concurrency 4
+#   python3 -m benchmarks.run --mode gunicorn --workers 2 --output results.json
+#
+# Pages are requested both as the owner of one domain ("owner") and as the
+# super_admin that sees every domain ("super"). Results are throughput and
+# latency percentiles per scenario, as JSON, labelled with the git commit.
+
+import argparse
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from urllib.parse import urlencode
+
+from benchmarks.common import (
+    configure_environment, load_app, make_session_cookie, call_app,
+    summarize, unique_suffix, bench_ip, run_workers, DoveadmStub
+)
+
+SCENARIOS = (
+    'login', 'home', 'domain', 'mailbox',
+    'alias_add', 'alias_edit', 'create_mailbox',
+)
+# Pages requested once per role
+PAGE_SCENARIOS = ('home', 'domain', 'mailbox')
+
+# --- Clients ---
+class InProcessClient:
+    def __init__(self, app):
+        self.app = app
+
+    def request(self, method, path, query_string='', body=b'', cookie=None, remote_addr='127.0.0.1'):
+        status, _, _, seconds = call_app(
+            self.app, method, path, query_string=query_string, body=body,
+            cookie=cookie, headers={'X-Forwarded-For': remote_addr}
+        )
+        return status, seconds
+
+class HTTPClient:
+    """One keep-alive connection per client thread"""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self._local = threading.local()
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = self._local.connection = http.client.HTTPConnection(self.host, self.port, timeout=120)
+        return connection
+
+    def request(self, method, path, query_string='', body=b'', cookie=None, remote_addr='127.0.0.1'):
+        headers = {'X-Forwarded-For': remote_addr}
+        if cookie:
+            headers['Cookie'] = cookie
+        if body:
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        url = f"{path}?{query_string}" if query_string else path
+
+        start = time.perf_counter()
+        try:
+            connection = self._connection()
+            connection.request(method, url, body=body or None, headers=headers)
+            response = connection.getresponse()
+            response.read()
+        except (http.client.HTTPException, OSError):
+            self._local.connection = None
+            return None, time.perf_counter() - start
+        return f"{response.status} {response.reason}", time.perf_counter() - start
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+class Gunicorn:
+    """gunicorn serving app:app on a free local port, with the benchmark environment"""
+
+    def __init__(self, workers, worker_class, threads):
+        self.port = free_port()
+        self.command = [
+            sys.executable, '-m', 'gunicorn',
+            '--bind', f"127.0.0.1:{self.port}",
+            '--workers', str(workers),
+            '--worker-class', worker_class,
+            '--threads', str(threads),
+            '--timeout', '120',
+            '--preload',
+            'app:app',
+        ]
+        self.process = None
+
+    def start(self):
+        self.process = subprocess.Popen(self.command, env=os.environ.copy())
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"gunicorn exited with code {self.process.returncode}")
+            try:
+                socket.create_connection(('127.0.0.1', self.port), timeout=1).close()
+                return self
+            except OSError:
+                time.sleep(0.2)
+        self.stop()
+        raise RuntimeError("gunicorn did not start within 30 seconds")
+
+    def stop(self):
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+            self.process.wait(timeout=30)
+
+# --- Scenarios ---
+def logged_in_cookie(admin, role):
+    cookie, csrf = make_session_cookie({'logged_in': True, 'role': role, 'id': admin['id'], 'email': admin['email']})
+    return cookie, csrf
+
+def scenario_login(client, fixture, count, concurrency, suffix):
+    from benchmarks.seed import SEED_PASSWORD
+
+    # A fresh session per request: a logged-in session short-circuits the form
+    sessions = [make_session_cookie() for _ in range(count)]
+    email = fixture['owner']['email']
+
+    def one(w, i):
+        cookie, csrf = sessions[i]
+        body = urlencode({'csrf_token': csrf, 'email': email, 'password': SEED_PASSWORD}).encode()
+        return client.request('POST', '/login', body=body, cookie=cookie, remote_addr=bench_ip(i))
+
+    return run_workers(count, concurrency, one)
+
+def page_scenario(path, query_string):
+    def run(client, cookie, count, concurrency):
+        return run_workers(count, concurrency, lambda w, i: client.request('GET', path, query_string, cookie=cookie))
+    return run
+
+def scenario_alias_add(client, fixture, count, concurrency, suffix):
+    cookie, csrf = logged_in_cookie(fixture['owner'], 'user')
+    mailboxes = fixture['mailboxes']
+
+    def one(w, i):
+        body = urlencode({
+            'csrf_token': csrf,
+            'source': f"bench-alias-{suffix}-{i}",
+            'destination': mailboxes[i % len(mailboxes)]['email'],
+        }).encode()
+        return client.request('POST', '/addalias', body=body, cookie=cookie)
+
+    return run_workers(count, concurrency, one)
+
+def scenario_alias_edit(client, fixture, count, concurrency, suffix):
+    cookie, csrf = logged_in_cookie(fixture['owner'], 'user')
+    aliases = fixture['aliases']
+
+    # Rewrite seeded aliases with their current values: same work, data unchanged
+    def one(w, i):
+        alias = aliases[i % len(aliases)]
+        body = urlencode({
+            'csrf_token': csrf,
+            'alias_id': alias['id'],
+            'source': alias['source'].split('@', 1)[0],
+            'destination': alias['destination'],
+        }).encode()
+        return client.request('POST', '/editalias', body=body, cookie=cookie)
+
+    return run_workers(count, concurrency, one)
+
+def scenario_create_mailbox(client, fixture, count, concurrency, suffix):
+    cookie, csrf = logged_in_cookie(fixture['owner'], 'user')
+
+    def one(w, i):
+        body = urlencode({
+            'csrf_token': csrf,
+            'local_part': f"bench-new-{suffix}-{i}",
+            'domain_id': fixture['domain']['id'],
+            'password': 'Bench-password-1234',
+            'quota': '1000',
+        }).encode()
+        return client.request('POST', '/createmailbox', body=body, cookie=cookie)
+
+    return run_workers(count, concurrency, one)
+
+def cleanup(fixture, suffix):
+    from libs import execute_query
+    from config_loader import load_db_schema
+
+    schema = load_db_schema()
+    execute_query(f"DELETE FROM {schema['table_aliases']} WHERE {schema['field_alias_source']} LIKE %s", (f"bench-alias-{suffix}-%",))
+    execute_query(f"DELETE FROM {schema['table_users']} WHERE {schema['field_user_email']} LIKE %s", (f"bench-new-{suffix}-%",))
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark pymailadmin pages and forms against seeded data")
+    parser.add_argument('--mode', choices=('inprocess', 'gunicorn'), default='inprocess', help="Drive app.app directly or over HTTP")
+    parser.add_argument('--tag', default='seed', help="Data set made by benchmarks.seed")
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help="Comma-separated scenarios")
+    parser.add_argument('--roles', default='owner,super', help="Roles for page scenarios")
+    parser.add_argument('--requests', type=int, default=100, help="Requests per scenario")
+    parser.add_argument('--warmup', type=int, default=5, help="Untimed requests per page scenario")
+    parser.add_argument('--concurrency', type=int, default=1, help="Concurrent client threads")
+    parser.add_argument('--workers', type=int, default=2, help="gunicorn workers")
+    parser.add_argument('--worker-class', default='sync', help="gunicorn worker class")
+    parser.add_argument('--threads', type=int, default=1, help="gunicorn threads per worker")
+    parser.add_argument('--doveadm-latency', type=float, default=0.0, help="Seconds the doveadm stub waits per call")
+    parser.add_argument('--label', default=None, help="Label stored with the results (default: git commit)")
+    parser.add_argument('--output', help="Write JSON results to this file instead of stdout")
+    args = parser.parse_args(argv)
+
+    scenarios = [s.strip() for s in args.scenarios.split(',') if s.strip()]
+    unknown = [s for s in scenarios if s not in SCENARIOS]
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(unknown)}")
+    roles = [r.strip() for r in args.roles.split(',') if r.strip()]
+
+    doveadm = DoveadmStub(latency=args.doveadm_latency).start()
+    configure_environment(doveadm_url=doveadm.url)
+    # Mailbox creation must not stop at the per-admin limit halfway through a run
+    os.environ['MAX_MAILBOXES_PER_USER'] = str(10 ** 9)
+    os.environ['MAX_ALIASES_PER_MAILBOX'] = str(10 ** 9)
+
+    from benchmarks.seed import load_fixture
+    fixture = load_fixture(args.tag)
+
+    server = None
+    if args.mode == 'gunicorn':
+        server = Gunicorn(args.workers, args.worker_class, args.threads).start()
+        client = HTTPClient('127.0.0.1', server.port)
+    else:
+        client = InProcessClient(load_app())
+
+    results = {
+        'label': args.label or git_revision(),
+        'mode': args.mode,
+        'concurrency': args.concurrency,
+        'doveadm_latency': args.doveadm_latency,
+        'data': {
+            'tag': args.tag,
+            'domains': fixture['domain_count'],
+            'mailboxes_in_domain': len(fixture['mailboxes']),
+            'aliases_in_domain': len(fixture['aliases']),
+        },
+        'scenarios': {},
+    }
+    if server:
+        results['gunicorn'] = {'workers': args.workers, 'worker_class': args.worker_class, 'threads': args.threads}
+
+    suffix = unique_suffix()
+    pages = {
+        'home': page_scenario('/home', ''),
+        'domain': page_scenario('/domain', f"id={fixture['domain']['id']}"),
+        'mailbox': page_scenario('/mailbox', f"id={fixture['mailboxes'][0]['id']}"),
+    }
+    forms = {
+        'login': scenario_login,
+        'alias_add': scenario_alias_add,
+        'alias_edit': scenario_alias_edit,
+        'create_mailbox': scenario_create_mailbox,
+    }
+
+    try:
+        for name in scenarios:
+            if name in PAGE_SCENARIOS:
+                for role in roles:
+                    admin = fixture['super_admin'] if role == 'super' else fixture['owner']
+                    cookie, _ = logged_in_cookie(admin, 'super_admin' if role == 'super' else 'user')
+                    pages[name](client, cookie, args.warmup, 1)
+                    latencies, errors, elapsed = pages[name](client, cookie, args.requests, args.concurrency)
+                    results['scenarios'][f"{name}:{role}"] = summarize(latencies, elapsed, errors=len(errors))
+            else:
+                latencies, errors, elapsed = forms[name](client, fixture, args.requests, args.concurrency, suffix)
+                results['scenarios'][name] = summarize(latencies, elapsed, errors=len(errors))
+    finally:
+        if server:
+            server.stop()
+        doveadm.stop()
+        cleanup(fixture, suffix)
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,229 @@
+# benchmarks/seed.py
+#
+# Seed the database configured in .env with synthetic domains, mailboxes,
+# aliases and ownerships, for benchmarks/run.py.
+#
+#   python3 -m benchmarks.seed --scale 1k            # 1000 mailboxes
+#   python3 -m benchmarks.seed --scale 100k --aliases-per-mailbox 3
+#   python3 -m benchmarks.seed --clean               # remove the seeded data
+#
+# Every row is named under *.pymailadmin.test with a tag (default "seed"),
+# so several data sets can coexist and --clean never touches real data.
+# Each domain gets one owner admin (role "user") owning all its mailboxes,
+# and one super_admin is created per tag. Their password is SEED_PASSWORD.
+
+import argparse
+import json
+import sys
+import time
+
+from benchmarks.common import BENCH_DOMAIN, hash_mailbox_password
+
+SCALES = {'10': 10, '1k': 1000, '10k': 10000, '100k': 100000}
+MAILBOXES_PER_DOMAIN = 100
+SEED_PASSWORD = 'bench-password'
+BATCH_SIZE = 1000
+
+def domain_pattern(tag):
+    return f"{tag}-d%.{BENCH_DOMAIN}"
+
+def admin_pattern(tag):
+    return f"{tag}-%@{BENCH_DOMAIN}"
+
+def super_admin_email(tag):
+    return f"{tag}-super@{BENCH_DOMAIN}"
+
+def owner_email(tag, n):
+    return f"{tag}-owner-{n:05d}@{BENCH_DOMAIN}"
+
+def insert_many(connection, query, rows):
+    """executemany in batches, one transaction per batch"""
+    cursor = connection.cursor()
+    try:
+        for start in range(0, len(rows), BATCH_SIZE):
+            cursor.executemany(query, rows[start:start + BATCH_SIZE])
+            connection.commit()
+    finally:
+        cursor.close()
+
+def select_ids(connection, query, params=None):
+    cursor = connection.cursor()
+    try:
+        cursor.execute(query, params)
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+
+def seed(tag, mailboxes, aliases_per_mailbox):
+    from libs import config, argon2
+    from config_loader import load_db_schema
+    from utils.db import get_db_connection
+
+    schema = load_db_schema()
+    domain_count = max(1, -(-mailboxes // MAILBOXES_PER_DOMAIN))
+    started = time.perf_counter()
+
+    # Hash once: every seeded account shares the same password
+    argon_conf = config['security']['argon2id']
+    admin_hash = argon2.using(
+        type='ID',
+        time_cost=argon_conf['time_cost'],
+        memory_cost=argon_conf['memory_cost'],
+        parallelism=argon_conf['threads']
+    ).hash(SEED_PASSWORD)
+    mailbox_hash = hash_mailbox_password(SEED_PASSWORD)
+
+    connection = get_db_connection(autocommit=False)
+    if connection is None:
+        raise RuntimeError("Cannot connect to the database")
+
+    try:
+        # Domains
+        domain_names = [f"{tag}-d{n:05d}.{BENCH_DOMAIN}" for n in range(domain_count)]
+        insert_many(
+            connection,
+            f"INSERT INTO {schema['table_domains']} ({schema['field_domain_name']}) VALUES (%s)",
+            [(name,) for name in domain_names]
+        )
+        domain_ids = dict((name, domain_id) for domain_id, name in select_ids(
+            connection,
+            f"SELECT {schema['field_domain_id']}, {schema['field_domain_name']} FROM {schema['table_domains']} WHERE {schema['field_domain_name']} LIKE %s",
+            (domain_pattern(tag),)
+        ))
+
+        # Admins: one super_admin, one owner per domain
+        insert_many(
+            connection,
+            "INSERT INTO pymailadmin_admin_users (email, password_hash, role, active) VALUES (%s, %s, %s, 1)",
+            [(super_admin_email(tag), admin_hash, 'super_admin')]
+            + [(owner_email(tag, n), admin_hash, 'user') for n in range(domain_count)]
+        )
+        admin_ids = dict((email, admin_id) for admin_id, email in select_ids(
+            connection,
+            "SELECT id, email FROM pymailadmin_admin_users WHERE email LIKE %s",
+            (admin_pattern(tag),)
+        ))
+
+        insert_many(
+            connection,
+            config['sql']['insert_allowed_domains_for_user'],
+            [(admin_ids[owner_email(tag, n)], domain_ids[name]) for n, name in enumerate(domain_names)]
+        )
+
+        # Mailboxes, spread over the domains
+        insert_many(
+            connection,
+            config['sql_dovecot']['insert_user'],
+            [
+                (domain_ids[domain_names[i // MAILBOXES_PER_DOMAIN]], f"u{i:06d}@{domain_names[i // MAILBOXES_PER_DOMAIN]}", mailbox_hash, 1000, 1)
+                for i in range(mailboxes)
+            ]
+        )
+        users = select_ids(
+            connection,
+            f"SELECT {schema['field_user_id']}, {schema['field_user_email']}, {schema['field_user_domain_id']} FROM {schema['table_users']} WHERE {schema['field_user_email']} LIKE %s",
+            (f"%@{domain_pattern(tag)}",)
+        )
+
+        owner_by_domain = dict((domain_ids[name], admin_ids[owner_email(tag, n)]) for n, name in enumerate(domain_names))
+        insert_many(
+            connection,
+            config['sql']['add_ownership'],
+            [(owner_by_domain[domain_id], user_id, 1) for user_id, _, domain_id in users]
+        )
+
+        # Aliases
+        insert_many(
+            connection,
+            config['sql_dovecot']['insert_alias'],
+            [
+                (domain_id, f"a{n}-{email.split('@', 1)[0]}@{email.split('@', 1)[1]}", email)
+                for _, email, domain_id in users
+                for n in range(aliases_per_mailbox)
+            ]
+        )
+    finally:
+        connection.close()
+
+    return {
+        'tag': tag,
+        'domains': domain_count,
+        'mailboxes': len(users),
+        'aliases': len(users) * aliases_per_mailbox,
+        'admins': len(admin_ids),
+        'seconds': round(time.perf_counter() - started, 2),
+    }
+
+def clean(tag):
+    from libs import execute_query
+    from config_loader import load_db_schema
+
+    schema = load_db_schema()
+    domains = f"SELECT {schema['field_domain_id']} FROM {schema['table_domains']} WHERE {schema['field_domain_name']} LIKE %s"
+
+    # Ownerships go with their admin users and mailboxes (ON DELETE CASCADE)
+    execute_query(f"DELETE FROM {schema['table_aliases']} WHERE {schema['field_alias_domain_id']} IN ({domains})", (domain_pattern(tag),))
+    execute_query(f"DELETE FROM {schema['table_users']} WHERE {schema['field_user_domain_id']} IN ({domains})", (domain_pattern(tag),))
+    execute_query("DELETE FROM pymailadmin_admin_users WHERE email LIKE %s", (admin_pattern(tag),))
+    execute_query(f"DELETE FROM {schema['table_domains']} WHERE {schema['field_domain_name']} LIKE %s", (domain_pattern(tag),))
+
+def load_fixture(tag):
+    """What benchmarks/run.py needs from a seeded data set"""
+    from libs import fetch_all
+    from config_loader import load_db_schema
+
+    schema = load_db_schema()
+    domains = fetch_all(
+        f"SELECT {schema['field_domain_id']} AS id, {schema['field_domain_name']} AS domain FROM {schema['table_domains']} WHERE {schema['field_domain_name']} LIKE %s ORDER BY {schema['field_domain_name']}",
+        (domain_pattern(tag),)
+    )
+    if not domains:
+        raise RuntimeError(f"No seeded data for tag '{tag}', run: python3 -m benchmarks.seed --tag {tag}")
+
+    domain = domains[0]
+    super_admin = fetch_all("SELECT id, email FROM pymailadmin_admin_users WHERE email = %s", (super_admin_email(tag),))[0]
+    owner = fetch_all("SELECT id, email FROM pymailadmin_admin_users WHERE email = %s", (owner_email(tag, 0),))[0]
+    mailboxes = fetch_all(
+        f"SELECT {schema['field_user_id']} AS id, {schema['field_user_email']} AS email FROM {schema['table_users']} WHERE {schema['field_user_domain_id']} = %s",
+        (domain['id'],)
+    )
+    aliases = fetch_all(
+        f"SELECT {schema['field_alias_id']} AS id, {schema['field_alias_source']} AS source, {schema['field_alias_destination']} AS destination FROM {schema['table_aliases']} WHERE {schema['field_alias_domain_id']} = %s",
+        (domain['id'],)
+    )
+
+    return {
+        'domain_count': len(domains),
+        'domain': domain,
+        'super_admin': super_admin,
+        'owner': owner,
+        'mailboxes': mailboxes,
+        'aliases': aliases,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Seed synthetic pymailadmin data for benchmarks")
+    parser.add_argument('--scale', default='1k', help=f"Number of mailboxes: {', '.join(SCALES)} or an integer")
+    parser.add_argument('--aliases-per-mailbox', type=int, default=2, help="Aliases created for each mailbox")
+    parser.add_argument('--tag', default='seed', help="Name of the data set")
+    parser.add_argument('--clean', action='store_true', help="Remove the data set instead")
+    args = parser.parse_args(argv)
+
+    if args.clean:
+        clean(args.tag)
+        print(json.dumps({'tag': args.tag, 'cleaned': True}))
+        return 0
+
+    mailboxes = SCALES.get(args.scale)
+    if mailboxes is None:
+        if not args.scale.isdigit():
+            parser.error(f"Unknown scale: {args.scale}")
+        mailboxes = int(args.scale)
+
+    # Re-seeding a tag starts from scratch
+    clean(args.tag)
+    print(json.dumps(seed(args.tag, mailboxes, args.aliases_per_mailbox), indent=2))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
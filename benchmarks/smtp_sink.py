@@ -0,0 +1,101 @@
+# benchmarks/smtp_sink.py
+
+import socketserver
+import threading
+import time
+
+class _SMTPSinkHandler(socketserver.StreamRequestHandler):
+    """Minimal SMTP dialogue: accepts any auth, any sender and any recipient"""
+
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        sink = self.server.sink
+        
+        if sink.connect_latency:
+            time.sleep(sink.connect_latency)
+        
+        self.reply("220 pymailadmin-sink ESMTP")
+        
+        while True:
+            line = self.rfile.readline()
+            
+            if not line:
+                return
+            
+            command = line.decode('utf-8', 'replace').strip()
+            verb = command.split(' ', 1)[0].upper()
+            
+            if verb == 'EHLO':
+                self.wfile.write(b"250-pymailadmin-sink\r\n250-AUTH PLAIN LOGIN\r\n250 8BITMIME\r\n")
+            
+            elif verb == 'AUTH':
+                # AUTH PLAIN sends credentials inline, AUTH LOGIN needs two prompts
+                if command.upper().startswith('AUTH LOGIN'):
+                    self.reply("334 VXNlcm5hbWU6")
+                    self.rfile.readline()
+                    self.reply("334 UGFzc3dvcmQ6")
+                    self.rfile.readline()
+                self.reply("235 Authentication successful")
+            
+            elif verb == 'DATA':
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                
+                while True:
+                    data_line = self.rfile.readline()
+                    if not data_line or data_line in (b".\r\n", b".\n"):
+                        break
+                
+                if sink.latency:
+                    time.sleep(sink.latency)
+                
+                sink.record_message()
+                self.reply("250 Queued")
+            
+            elif verb == 'QUIT':
+                self.reply("221 Bye")
+                return
+            
+            elif verb in ('HELO', 'MAIL', 'RCPT', 'RSET', 'NOOP'):
+                self.reply("250 OK")
+            
+            else:
+                self.reply("502 Command not implemented")
+
+class _ThreadingTCPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+class SMTPSink:
+    """
+    Local SMTP server discarding every message it receives.
+    `latency` delays the final reply to DATA (slow accepting relay),
+    `connect_latency` delays the greeting (slow handshake).
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, connect_latency=0.0):
+        self.latency = latency
+        self.connect_latency = connect_latency
+        self.messages = 0
+        self._lock = threading.Lock()
+        self._server = _ThreadingTCPServer((host, port), _SMTPSinkHandler)
+        self._server.sink = self
+        self._thread = None
+
+    @property
+    def address(self):
+        return self._server.server_address
+
+    def record_message(self):
+        with self._lock:
+            self.messages += 1
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
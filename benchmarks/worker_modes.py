@@ -0,0 +1,96 @@
+# benchmarks/worker_modes.py
+#
+# Same benchmark (benchmarks/run.py --mode gunicorn) against several gunicorn
+# worker configurations, to size --workers/--threads for pymailadmin.service.
+#
+#   python3 -m benchmarks.seed --scale 1k
+#   python3 -m benchmarks.worker_modes --concurrency 16 --doveadm-latency 0.05
+#
+# Configurations are worker_class:workers:threads. Prints requests per second
+# and p95 latency per scenario and configuration, or the full JSON results.
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+DEFAULT_CONFIGS = 'sync:2:1,sync:4:1,gthread:2:8'
+DEFAULT_SCENARIOS = 'login,home,domain,mailbox,alias_add'
+
+def parse_configs(text):
+    configs = []
+    for item in text.split(','):
+        worker_class, workers, threads = item.strip().split(':')
+        configs.append((worker_class, int(workers), int(threads)))
+    return configs
+
+def run_config(worker_class, workers, threads, args):
+    with tempfile.NamedTemporaryFile(suffix='.json', delete=False) as f:
+        output = f.name
+
+    command = [
+        sys.executable, '-m', 'benchmarks.run',
+        '--mode', 'gunicorn',
+        '--worker-class', worker_class,
+        '--workers', str(workers),
+        '--threads', str(threads),
+        '--tag', args.tag,
+        '--scenarios', args.scenarios,
+        '--roles', args.roles,
+        '--requests', str(args.requests),
+        '--concurrency', str(args.concurrency),
+        '--doveadm-latency', str(args.doveadm_latency),
+        '--output', output,
+    ]
+    try:
+        subprocess.run(command, check=True)
+        with open(output) as f:
+            return json.load(f)
+    finally:
+        os.unlink(output)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare gunicorn worker configurations on the pymailadmin benchmark")
+    parser.add_argument('--configs', default=DEFAULT_CONFIGS, help="Comma-separated worker_class:workers:threads")
+    parser.add_argument('--tag', default='seed', help="Data set made by benchmarks.seed")
+    parser.add_argument('--scenarios', default=DEFAULT_SCENARIOS, help="Comma-separated scenarios of benchmarks.run")
+    parser.add_argument('--roles', default='owner,super', help="Roles for page scenarios")
+    parser.add_argument('--requests', type=int, default=200, help="Requests per scenario")
+    parser.add_argument('--concurrency', type=int, default=16, help="Concurrent client threads")
+    parser.add_argument('--doveadm-latency', type=float, default=0.0, help="Seconds the doveadm stub waits per call")
+    parser.add_argument('--json', action='store_true', help="Print the full results as JSON")
+    args = parser.parse_args(argv)
+
+    try:
+        configs = parse_configs(args.configs)
+    except ValueError:
+        parser.error("--configs must be worker_class:workers:threads[,...]")
+
+    results = {}
+    for worker_class, workers, threads in configs:
+        name = f"{worker_class} {workers}x{threads}"
+        print(f"--- {name}", file=sys.stderr)
+        results[name] = run_config(worker_class, workers, threads, args)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return 0
+
+    scenarios = list(next(iter(results.values()))['scenarios'])
+    names = list(results)
+    width = max(len(s) for s in scenarios + ['scenario'])
+
+    print(f"{'scenario':<{width}}  " + "  ".join(f"{n:>24}" for n in names))
+    print(f"{'':<{width}}  " + "  ".join(f"{'req/s':>11} {'p95 ms':>12}" for _ in names))
+    for scenario in scenarios:
+        cells = []
+        for n in names:
+            summary = results[n]['scenarios'].get(scenario, {})
+            cells.append(f"{summary.get('requests_per_s', 0):>11.1f} {summary.get('p95_ms', 0):>12.1f}")
+        print(f"{scenario:<{width}}  " + "  ".join(cells))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
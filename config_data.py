@@ -21,6 +21,7 @@ config = {
         """,
         
         'reset_rate_limit': "UPDATE pymailadmin_rate_limits SET `attempts` = 0, `blocked_until` = NULL WHERE `key` = %s",
+        'expire_rate_limit': "UPDATE pymailadmin_rate_limits SET `attempts` = 0, `blocked_until` = NULL WHERE `key` = %s AND (`blocked_until` <= NOW() OR `last_attempt` < NOW() - INTERVAL %s MINUTE)",
         'delete_expired_rate_limits': "DELETE FROM pymailadmin_rate_limits WHERE `blocked_until` IS NOT NULL AND `blocked_until` < NOW()",
         
         # Admin user utilities
@@ -31,6 +32,15 @@ config = {
         # Admin users for web admin
         'insert_admin_user': "INSERT INTO pymailadmin_admin_users (email, password_hash) VALUES (%s, %s)",
         'select_admin_user_by_email': "SELECT * FROM pymailadmin_admin_users WHERE email = %s",
+        
+        # Login: the user (NULLs if unknown) and the rate limit row of the client, in one row
+        'select_login_state': """
+            SELECT u.id, u.role, u.password_hash, r.attempts, r.last_attempt, r.blocked_until
+            FROM (SELECT 1 AS one) AS k
+            LEFT JOIN pymailadmin_admin_users u ON u.email = %s
+            LEFT JOIN pymailadmin_rate_limits r ON r.`key` = %s
+        """,
+        
         'update_admin_password': "UPDATE pymailadmin_admin_users SET password_hash = %s WHERE id = %s",
         'update_admin_user_role': "UPDATE pymailadmin_admin_users SET role = %s WHERE id = %s",
         
@@ -51,6 +61,40 @@ config = {
         'select_admin_registration_by_hash_unconfirmed': "SELECT * FROM pymailadmin_admin_registrations WHERE confirmation_hash = %s AND expires_at > NOW() AND confirmed = 0",
         'delete_registration_by_email': "DELETE FROM pymailadmin_admin_registrations WHERE email = %s",
         'select_superadmins_for_moderation': "SELECT email FROM pymailadmin_admin_users WHERE role = 'super_admin' AND active = 1",
+        'select_pending_registrations_page': "SELECT id, email, reason FROM pymailadmin_admin_registrations WHERE confirmed = 1 AND expires_at > NOW() AND id > %s ORDER BY id LIMIT %s",
+        'select_admin_registrations_by_email_in': "SELECT * FROM pymailadmin_admin_registrations WHERE email IN ({emails}) AND confirmed = 1 AND expires_at > NOW()",
+        'select_admin_user_ids_by_email_in': "SELECT id, email FROM pymailadmin_admin_users WHERE email IN ({emails})",
+        
+        # API keys: only their SHA-256 is stored
+        'insert_api_key': "INSERT INTO pymailadmin_api_keys (admin_user_id, name, key_hash) VALUES (%s, %s, %s)",
+        'select_api_key_admin': "SELECT u.id, u.email, u.role FROM pymailadmin_api_keys k JOIN pymailadmin_admin_users u ON u.id = k.admin_user_id WHERE k.key_hash = %s AND u.active = 1",
+        'select_api_keys': "SELECT k.id, k.name, k.created_at, u.email FROM pymailadmin_api_keys k JOIN pymailadmin_admin_users u ON u.id = k.admin_user_id ORDER BY k.id",
+        'delete_api_key': "DELETE FROM pymailadmin_api_keys WHERE id = %s",
+        
+        # Counters (utils/counters.py)
+        'select_mailbox_count': "SELECT mailboxes FROM pymailadmin_mailbox_counts WHERE admin_user_id = %s",
+        'select_alias_counts_in': "SELECT destination, aliases FROM pymailadmin_alias_counts WHERE destination IN ({destinations})",
+        'add_mailbox_count': "UPDATE pymailadmin_mailbox_counts SET mailboxes = mailboxes + %s WHERE admin_user_id = %s",
+        'add_alias_count': "UPDATE pymailadmin_alias_counts SET aliases = aliases + %s WHERE destination = %s",
+        'select_all_mailbox_counts': "SELECT admin_user_id AS `key`, mailboxes AS count FROM pymailadmin_mailbox_counts",
+        'select_all_alias_counts': "SELECT destination AS `key`, aliases AS count FROM pymailadmin_alias_counts",
+        'delete_mailbox_count': "DELETE FROM pymailadmin_mailbox_counts WHERE admin_user_id = %s",
+        'delete_alias_count': "DELETE FROM pymailadmin_alias_counts WHERE destination = %s",
+        
+        # Change feed for the Dovecot connector (utils/changes.py)
+        'insert_change': "INSERT INTO pymailadmin_changes (entity, action, object) VALUES (%s, %s, %s)",
+        'select_changes_since': "SELECT id, entity, action, object, created_at FROM pymailadmin_changes WHERE id > %s AND created_at <= NOW() - INTERVAL %s SECOND ORDER BY id LIMIT %s",
+        'select_last_change_id': "SELECT COALESCE(MAX(id), 0) AS last_id FROM pymailadmin_changes WHERE created_at <= NOW() - INTERVAL %s SECOND",
+        'select_change_cursors': "SELECT consumer, last_id, updated_at FROM pymailadmin_change_cursors ORDER BY consumer",
+        'ack_change_cursor': "INSERT INTO pymailadmin_change_cursors (consumer, last_id) VALUES (%s, %s) ON DUPLICATE KEY UPDATE last_id = GREATEST(last_id, VALUES(last_id))",
+        'delete_changes_upto': "DELETE FROM pymailadmin_changes WHERE id <= %s AND created_at < NOW() - INTERVAL %s DAY ORDER BY id LIMIT %s",
+        
+        # Change tokens for conditional GET
+        'bump_version': "INSERT INTO pymailadmin_versions (`scope`, `version`) VALUES (%s, 1) ON DUPLICATE KEY UPDATE `version` = `version` + 1",
+        'select_versions_in': "SELECT `scope`, `version` FROM pymailadmin_versions WHERE `scope` IN ({scopes})",
+        
+        # Maintenance (MySQL/MariaDB information_schema)
+        'select_table_indexes': "SELECT INDEX_NAME AS index_name, SEQ_IN_INDEX AS seq, COLUMN_NAME AS column_name FROM information_schema.STATISTICS WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s ORDER BY INDEX_NAME, SEQ_IN_INDEX",
         
         # Allowed domains for users
         'insert_allowed_domains_for_user': "INSERT IGNORE INTO pymailadmin_domains_ownerships (admin_user_id, domain_id) VALUES (%s, %s)",
@@ -63,5 +107,31 @@ config = {
             ORDER BY d.{field_domain_name}
         """,
 
-    },   
+    },
+    
+    # Per-dialect replacements for queries config_loader.adapt_sql() cannot
+    # translate mechanically (upserts, MySQL functions, information_schema)
+    'sql_overrides': {
+        'sqlite': {
+            'insert_session': "INSERT INTO pymailadmin_sessions (id, data, expires_at) VALUES (%s, %s, %s) ON CONFLICT(id) DO UPDATE SET data = excluded.data, expires_at = excluded.expires_at",
+            # In MySQL, `attempts` already holds the incremented value when
+            # blocked_until is computed: SQLite sees the old one, hence + 2
+            'upsert_rate_limit': """
+                INSERT INTO pymailadmin_rate_limits (`key`, `attempts`, `last_attempt`, `blocked_until`)
+                VALUES (%s, 1, datetime('now', 'localtime'), NULL)
+                ON CONFLICT(`key`) DO UPDATE SET
+                    `attempts` = COALESCE(`attempts`, 0) + 1,
+                    `last_attempt` = datetime('now', 'localtime'),
+                    `blocked_until` = CASE WHEN COALESCE(`attempts`, 0) + 2 >= %s THEN datetime('now', 'localtime', '+' || %s || ' minutes') ELSE NULL END
+            """,
+            'expire_rate_limit': "UPDATE pymailadmin_rate_limits SET `attempts` = 0, `blocked_until` = NULL WHERE `key` = %s AND (`blocked_until` <= datetime('now', 'localtime') OR `last_attempt` < datetime('now', 'localtime', '-' || %s || ' minutes'))",
+            'add_ownership': "INSERT INTO pymailadmin_ownerships (admin_user_id, user_id, is_primary) VALUES (%s, %s, %s) ON CONFLICT(admin_user_id, user_id) DO UPDATE SET is_primary = excluded.is_primary",
+            'bump_version': "INSERT INTO pymailadmin_versions (`scope`, `version`) VALUES (%s, 1) ON CONFLICT(`scope`) DO UPDATE SET `version` = `version` + 1",
+            'ack_change_cursor': "INSERT INTO pymailadmin_change_cursors (consumer, last_id) VALUES (%s, %s) ON CONFLICT(consumer) DO UPDATE SET last_id = MAX(last_id, excluded.last_id), updated_at = datetime('now', 'localtime')",
+            'select_changes_since': "SELECT id, entity, action, object, created_at FROM pymailadmin_changes WHERE id > %s AND created_at <= datetime('now', 'localtime', '-' || %s || ' seconds') ORDER BY id LIMIT %s",
+            'select_last_change_id': "SELECT COALESCE(MAX(id), 0) AS last_id FROM pymailadmin_changes WHERE created_at <= datetime('now', 'localtime', '-' || %s || ' seconds')",
+            'delete_changes_upto': "DELETE FROM pymailadmin_changes WHERE id IN (SELECT id FROM pymailadmin_changes WHERE id <= %s AND created_at < datetime('now', 'localtime', '-' || %s || ' days') ORDER BY id LIMIT %s)",
+            'select_table_indexes': "SELECT il.name AS index_name, ii.seqno + 1 AS seq, ii.name AS column_name FROM pragma_index_list(%s) il JOIN pragma_index_info(il.name) ii ORDER BY il.name, ii.seqno",
+        },
+    },
 }
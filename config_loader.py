@@ -1,10 +1,43 @@
 # config_loader.py
 
-from dotenv import load_dotenv
+from dotenv import dotenv_values
 import os
+from types import MappingProxyType
 from config_data import config
 
-load_dotenv()
+# .env of the installation, re-read on reload
+ENV_FILE = os.getenv('PYMAILADMIN_ENV_FILE', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.env'))
+
+# Variables of the process environment (systemd, shell) win over .env, as
+# with load_dotenv(): only the ones .env provided are replaced on reload
+_PROCESS_ENV = frozenset(os.environ)
+_from_env_file = set()
+
+class ConfigError(EnvironmentError):
+    pass
+
+def load_env_file():
+    """Apply .env to os.environ, dropping the variables it no longer sets"""
+    values = dotenv_values(ENV_FILE) if os.path.isfile(ENV_FILE) else {}
+    values = {key: value for key, value in values.items() if key not in _PROCESS_ENV and value is not None}
+
+    for key in _from_env_file - set(values):
+        os.environ.pop(key, None)
+    os.environ.update(values)
+
+    _from_env_file.clear()
+    _from_env_file.update(values)
+
+load_env_file()
+
+def env_int(name, default):
+    value = os.getenv(name)
+    if value is None or value == '':
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise ConfigError(f"{name} must be an integer, not {value!r}")
 
 # Guess prefix for dovecot
 def determine_prefix(algorithm):
@@ -71,8 +104,17 @@ def generate_sql_queries(schema):
         'insert_user': f"INSERT INTO {schema['table_users']} ({schema['field_user_domain_id']}, {schema['field_user_email']}, {schema['field_user_password']}, {schema['field_user_quota']}, {schema['field_user_active']}) VALUES (%s, %s, %s, %s, %s)",
         'select_user_by_id_in': f"SELECT * FROM {schema['table_users']} WHERE {schema['field_user_id']} IN ({{user_ids}})",
         'select_users_by_domain': f"SELECT * FROM {schema['table_users']} WHERE {schema['field_user_domain_id']} = %s",
+        # Alias counters joined in, a real COUNT for mailboxes without one yet (utils/counters.py)
+        'select_users_with_alias_counts_by_domain': f"""
+            SELECT u.{schema['field_user_id']} AS id, u.{schema['field_user_email']} AS email,
+                COALESCE(c.aliases, (SELECT COUNT(*) FROM {schema['table_aliases']} a WHERE a.{schema['field_alias_destination']} = u.{schema['field_user_email']})) AS alias_count
+            FROM {schema['table_users']} u
+            LEFT JOIN pymailadmin_alias_counts c ON c.destination = u.{schema['field_user_email']}
+            WHERE u.{schema['field_user_domain_id']} = %s
+        """,
         'select_user_by_id': f"SELECT * FROM {schema['table_users']} WHERE {schema['field_user_id']} = %s",
         'select_user_by_email': f"SELECT * FROM {schema['table_users']} WHERE {schema['field_user_email']} = %s",
+        'select_user_ids_by_email_in': f"SELECT {schema['field_user_id']} AS id, {schema['field_user_domain_id']} AS domain_id, {schema['field_user_email']} AS email FROM {schema['table_users']} WHERE {schema['field_user_email']} IN ({{emails}})",
         'update_user_password': f"UPDATE {schema['table_users']} SET {schema['field_user_password']} = %s WHERE {schema['field_user_id']} = %s",
         'update_user_email': f"UPDATE {schema['table_users']} SET {schema['field_user_email']} = %s WHERE {schema['field_user_id']} = %s",
         'enable_user': f"UPDATE {schema['table_users']} SET {schema['field_user_active']} = 1 WHERE {schema['field_user_email']} = %s",
@@ -87,6 +129,22 @@ def generate_sql_queries(schema):
             WHERE o.admin_user_id = %s
         """,
         
+        # Counters (utils/counters.py): first value of a missing row, and the
+        # true values for scripts/reconcile_counters.py
+        'seed_mailbox_count': f"""
+            INSERT IGNORE INTO pymailadmin_mailbox_counts (admin_user_id, mailboxes)
+            SELECT %s, COUNT(*)
+            FROM pymailadmin_ownerships o
+            INNER JOIN {schema['table_users']} u ON o.user_id = u.{schema['field_user_id']}
+            WHERE o.admin_user_id = %s
+        """,
+        'count_mailboxes_by_owner_all': f"""
+            SELECT o.admin_user_id AS `key`, COUNT(*) AS count
+            FROM pymailadmin_ownerships o
+            INNER JOIN {schema['table_users']} u ON o.user_id = u.{schema['field_user_id']}
+            GROUP BY o.admin_user_id
+        """,
+        
     }
     
     # Aliases queries
@@ -99,115 +157,369 @@ def generate_sql_queries(schema):
         'count_aliases_by_mailbox': f"SELECT COUNT(*) as count FROM {schema['table_aliases']} WHERE {schema['field_alias_destination']} = %s",
         'update_alias': f"UPDATE {schema['table_aliases']} SET {schema['field_alias_source']} = %s, {schema['field_alias_destination']} = %s WHERE {schema['field_alias_id']} = %s",
         'delete_alias': f"DELETE FROM {schema['table_aliases']} WHERE {schema['field_alias_id']} = %s",
+        
+        # Bulk alias management (utils/alias_bulk.py)
+        'select_aliases_by_source_in': f"SELECT {schema['field_alias_id']} AS id, {schema['field_alias_domain_id']} AS domain_id, {schema['field_alias_source']} AS source, {schema['field_alias_destination']} AS destination FROM {schema['table_aliases']} WHERE {schema['field_alias_source']} IN ({{sources}})",
+        'select_alias_sources_by_destination_in_domain': f"SELECT {schema['field_alias_source']} AS source FROM {schema['table_aliases']} WHERE {schema['field_alias_domain_id']} = %s AND {schema['field_alias_destination']} = %s",
+        'update_alias_destination_in_domain': f"UPDATE {schema['table_aliases']} SET {schema['field_alias_destination']} = %s WHERE {schema['field_alias_domain_id']} = %s AND {schema['field_alias_destination']} = %s",
+        
+        # Counters (utils/counters.py)
+        'seed_alias_count': f"INSERT IGNORE INTO pymailadmin_alias_counts (destination, aliases) SELECT %s, COUNT(*) FROM {schema['table_aliases']} WHERE {schema['field_alias_destination']} = %s",
+        'count_aliases_by_destination_all': f"SELECT {schema['field_alias_destination']} AS `key`, COUNT(*) AS count FROM {schema['table_aliases']} GROUP BY {schema['field_alias_destination']}",
     }
     
+    # Bulk exports (utils/export.py): explicit columns, never password hashes.
+    # The ownership filter is a JOIN, its admin_user_id parameter comes first
+    domain_columns = f"d.{schema['field_domain_id']} AS id, d.{schema['field_domain_name']} AS domain"
+    user_columns = f"u.{schema['field_user_id']} AS id, u.{schema['field_user_domain_id']} AS domain_id, u.{schema['field_user_email']} AS email, u.{schema['field_user_quota']} AS quota, u.{schema['field_user_active']} AS active"
+    alias_columns = f"a.{schema['field_alias_id']} AS id, a.{schema['field_alias_domain_id']} AS domain_id, a.{schema['field_alias_source']} AS source, a.{schema['field_alias_destination']} AS destination"
+    owned_users = f"JOIN pymailadmin_ownerships o ON o.user_id = u.{schema['field_user_id']} AND o.admin_user_id = %s"
+    owned_aliases = f"JOIN {schema['table_users']} u ON u.{schema['field_user_email']} = a.{schema['field_alias_destination']} {owned_users}"
+    
+    sql_export = {
+        'export_domains': f"SELECT {domain_columns} FROM {schema['table_domains']} d ORDER BY d.{schema['field_domain_id']}",
+        'export_domains_by_admin': f"""
+            SELECT {domain_columns} FROM {schema['table_domains']} d
+            JOIN pymailadmin_domains_ownerships o ON o.domain_id = d.{schema['field_domain_id']} AND o.admin_user_id = %s
+            ORDER BY d.{schema['field_domain_id']}
+        """,
+    }
+    
+    for suffix, join, where in (
+        ('', '', ''),
+        ('_by_owner', 'owned', ''),
+        ('_by_domain', '', 'domain'),
+        ('_by_domain_and_owner', 'owned', 'domain'),
+    ):
+        sql_export[f'export_users{suffix}'] = (
+            f"SELECT {user_columns} FROM {schema['table_users']} u "
+            + (owned_users + " " if join else "")
+            + (f"WHERE u.{schema['field_user_domain_id']} = %s " if where else "")
+            + f"ORDER BY u.{schema['field_user_id']}"
+        )
+        sql_export[f'export_aliases{suffix}'] = (
+            f"SELECT {alias_columns} FROM {schema['table_aliases']} a "
+            + (owned_aliases + " " if join else "")
+            + (f"WHERE a.{schema['field_alias_domain_id']} = %s " if where else "")
+            + f"ORDER BY a.{schema['field_alias_id']}"
+        )
+        
+        # Same listings one page at a time for /api/v1: params end with
+        # the cursor (last id returned) and the page size
+        sql_export[f'api_users{suffix}'] = (
+            f"SELECT {user_columns} FROM {schema['table_users']} u "
+            + (owned_users + " " if join else "")
+            + "WHERE " + (f"u.{schema['field_user_domain_id']} = %s AND " if where else "")
+            + f"u.{schema['field_user_id']} > %s ORDER BY u.{schema['field_user_id']} LIMIT %s"
+        )
+        sql_export[f'api_aliases{suffix}'] = (
+            f"SELECT {alias_columns} FROM {schema['table_aliases']} a "
+            + (owned_aliases + " " if join else "")
+            + "WHERE " + (f"a.{schema['field_alias_domain_id']} = %s AND " if where else "")
+            + f"a.{schema['field_alias_id']} > %s ORDER BY a.{schema['field_alias_id']} LIMIT %s"
+        )
+    
+    sql_export['api_domains'] = f"SELECT {domain_columns} FROM {schema['table_domains']} d WHERE d.{schema['field_domain_id']} > %s ORDER BY d.{schema['field_domain_id']} LIMIT %s"
+    sql_export['api_domains_by_admin'] = f"""
+            SELECT {domain_columns} FROM {schema['table_domains']} d
+            JOIN pymailadmin_domains_ownerships o ON o.domain_id = d.{schema['field_domain_id']} AND o.admin_user_id = %s
+            WHERE d.{schema['field_domain_id']} > %s ORDER BY d.{schema['field_domain_id']} LIMIT %s
+        """
+    
+    # Search (utils/search.py): prefix range scans on the email, source and
+    # destination indexes. Keyset pagination on (column, id): params are
+    # [admin_user_id,] range start, range end, last value, last id, limit
+    mailbox_columns = f"u.{schema['field_user_id']} AS id, u.{schema['field_user_domain_id']} AS domain_id, u.{schema['field_user_email']} AS email, u.{schema['field_user_active']} AS active"
+    
+    def search_query(table, columns, column, id_column, owned=''):
+        return (
+            f"SELECT {columns} FROM {table} {owned} "
+            f"WHERE {column} >= %s AND {column} < %s AND ({column} > %s OR {id_column} > %s) "
+            f"ORDER BY {column}, {id_column} LIMIT %s"
+        )
+    
+    sql_search = {}
+    
+    for suffix, owned in (('', False), ('_by_owner', True)):
+        sql_search[f'search_mailboxes{suffix}'] = search_query(
+            f"{schema['table_users']} u", mailbox_columns,
+            f"u.{schema['field_user_email']}", f"u.{schema['field_user_id']}",
+            owned_users if owned else ''
+        )
+        for field in ('source', 'destination'):
+            sql_search[f'search_aliases_by_{field}{suffix}'] = search_query(
+                f"{schema['table_aliases']} a", alias_columns,
+                f"a.{schema[f'field_alias_{field}']}", f"a.{schema['field_alias_id']}",
+                owned_aliases if owned else ''
+            )
+    
     # Merge all queries
-    return {**sql_domains, **sql_users, **sql_aliases}
-
-# Dynamic configuration loader
-dynamic_config = {
-    'SECRET_KEY': os.getenv('SECRET_KEY'),
-    'PRETTY_NAME': os.getenv('PRETTY_NAME', 'pymailadmin'),
-    'PYMAILADMIN_URL': os.getenv('PYMAILADMIN_URL', 'https://mailadmin.liberta.email'),
-    'LOGIN_MAX_ATTEMPTS': os.getenv('LOGIN_MAX_ATTEMPTS', 5),
-    'LOGIN_WINDOW_MINUTES': os.getenv('LOGIN_WINDOW_MINUTES', 15),
-    'LOGIN_BLOCK_MINUTES': os.getenv('LOGIN_BLOCK_MINUTES', 30),
-    'REGISTER_MAX_ATTEMPTS_PER_IP': os.getenv('REGISTER_MAX_ATTEMPTS_PER_IP', 3),
-    'REGISTER_WINDOW_MINUTES': os.getenv('REGISTER_WINDOW_MINUTES', 60),
-    'REGISTER_BLOCK_MINUTES': os.getenv('REGISTER_BLOCK_MINUTES', 60),
-    'POSTFIX_SEPARATOR': os.getenv('POSTFIX_SEPARATOR', '+'),
-    'DOVEADM_HTTP_API_SECRET_KEY': os.getenv('DOVEADM_HTTP_API_SECRET_KEY', ''),
-    'DOVEADM_HTTP_API_URL': os.getenv('DOVEADM_HTTP_API_URL', ''),
-    'DOVEADM_HTTP_API_SOCKET': os.getenv('DOVEADM_HTTP_API_SOCKET', ''),
-    
-    'limits': {
-        'max_mailboxes_per_user': int(os.getenv('MAX_MAILBOXES_PER_USER', 3)),
-        'max_aliases_per_mailbox': int(os.getenv('MAX_ALIASES_PER_MAILBOX', 100))
-    },
-    
-    'security': {
-        'argon2id': {
-            'time_cost': int(os.getenv('ADMIN_HASH_TIME_COST', 3)),
-            'memory_cost': int(os.getenv('ADMIN_HASH_MEMORY_COST', 65536)),
-            'threads': int(os.getenv('ADMIN_HASH_PARALLELISM', 2))
-        },
-        'rate_limit': {
-            'login': {
-                'max_attempts': int(os.getenv('LOGIN_MAX_ATTEMPTS', 5)),
-                'window_minutes': int(os.getenv('LOGIN_WINDOW_MINUTES', 15)),
-                'block_minutes': int(os.getenv('LOGIN_BLOCK_MINUTES', 30))
+    return {**sql_domains, **sql_users, **sql_aliases, **sql_export, **sql_search}
+
+# SQL dialects
+def adapt_sql(queries, dialect, overrides=None):
+    """
+    Queries are written for MySQL/MariaDB. For another dialect, use the
+    hand-written override when there is one, else rewrite what differs.
+    Placeholders stay %s: the driver converts them.
+    """
+    if dialect == 'mysql':
+        return dict(queries)
+    
+    overrides = overrides or {}
+    adapted = {}
+    
+    for key, query in queries.items():
+        if key in overrides:
+            adapted[key] = overrides[key]
+        else:
+            adapted[key] = query.replace('NOW()', "datetime('now', 'localtime')").replace('INSERT IGNORE', 'INSERT OR IGNORE')
+    
+    return adapted
+
+# Dynamic configuration, from the environment and .env
+def build_dynamic_config():
+    return {
+        'SECRET_KEY': os.getenv('SECRET_KEY'),
+        'PRETTY_NAME': os.getenv('PRETTY_NAME', 'pymailadmin'),
+        'PYMAILADMIN_URL': os.getenv('PYMAILADMIN_URL', 'https://mailadmin.liberta.email').rstrip('/'),
+        'LOGIN_MAX_ATTEMPTS': env_int('LOGIN_MAX_ATTEMPTS', 5),
+        'LOGIN_WINDOW_MINUTES': env_int('LOGIN_WINDOW_MINUTES', 15),
+        'LOGIN_BLOCK_MINUTES': env_int('LOGIN_BLOCK_MINUTES', 30),
+        'REGISTER_MAX_ATTEMPTS_PER_IP': env_int('REGISTER_MAX_ATTEMPTS_PER_IP', 3),
+        'REGISTER_WINDOW_MINUTES': env_int('REGISTER_WINDOW_MINUTES', 60),
+        'REGISTER_BLOCK_MINUTES': env_int('REGISTER_BLOCK_MINUTES', 60),
+        'POSTFIX_SEPARATOR': os.getenv('POSTFIX_SEPARATOR', '+'),
+        'DOVEADM_HTTP_API_SECRET_KEY': os.getenv('DOVEADM_HTTP_API_SECRET_KEY', ''),
+        'DOVEADM_HTTP_API_URL': os.getenv('DOVEADM_HTTP_API_URL', ''),
+        'DOVEADM_HTTP_API_SOCKET': os.getenv('DOVEADM_HTTP_API_SOCKET', ''),
+    
+        'limits': {
+            'max_mailboxes_per_user': env_int('MAX_MAILBOXES_PER_USER', 3),
+            'max_aliases_per_mailbox': env_int('MAX_ALIASES_PER_MAILBOX', 100),
+            'max_bulk_aliases': env_int('MAX_BULK_ALIASES', 5000)
+        },
+    
+        'api': {
+            'page_size': env_int('API_PAGE_SIZE', 100),
+            'max_page_size': env_int('API_MAX_PAGE_SIZE', 1000),
+            'max_batch': env_int('API_MAX_BATCH', 1000),
+            'max_body_bytes': env_int('API_MAX_BODY_BYTES', 4 * 1024 * 1024)
+        },
+    
+        'search': {
+            'page_size': env_int('SEARCH_PAGE_SIZE', 50),
+            'autocomplete_limit': env_int('SEARCH_AUTOCOMPLETE_LIMIT', 10),
+            'min_length': env_int('SEARCH_MIN_LENGTH', 2)
+        },
+        
+        'moderation': {
+            'page_size': env_int('MODERATION_PAGE_SIZE', 50)
+        },
+        
+        'changes': {
+            'page_size': env_int('CHANGES_PAGE_SIZE', 500),
+            'longpoll_timeout': env_int('CHANGES_LONGPOLL_TIMEOUT', 25),
+            'poll_interval': env_int('CHANGES_POLL_INTERVAL', 1),
+            'retention_days': env_int('CHANGES_RETENTION_DAYS', 7),
+            'settle_seconds': env_int('CHANGES_SETTLE_SECONDS', 5)
+        },
+    
+        'mailbox_import': {
+            'batch_size': env_int('MAILBOX_IMPORT_BATCH_SIZE', 100),
+            'hash_workers': env_int('MAILBOX_IMPORT_HASH_WORKERS', 0),
+            'max_upload_bytes': env_int('MAILBOX_IMPORT_MAX_UPLOAD_BYTES', 2 * 1024 * 1024)
+        },
+    
+        'ownership_cache': {
+            'ttl_seconds': env_int('OWNERSHIP_CACHE_TTL', 30)
+        },
+    
+        'shared_cache': {
+            'dir': os.getenv('SHARED_CACHE_DIR', '/tmp/pymailadmin-cache'),
+            'ttl_seconds': env_int('SHARED_CACHE_TTL', 300),
+            'slots': env_int('SHARED_CACHE_SLOTS', 128),
+            'slot_bytes': env_int('SHARED_CACHE_SLOT_BYTES', 128 * 1024)
+        },
+    
+        'metrics': {
+            'enabled': os.getenv('METRICS_ENABLED', 'true').lower() in ('1', 'true', 'yes'),
+            'dir': os.getenv('METRICS_DIR', '/tmp/pymailadmin-metrics'),
+            'allowed_ips': [ip.strip() for ip in os.getenv('METRICS_ALLOWED_IPS', '127.0.0.1,::1').split(',') if ip.strip()],
+            'token': os.getenv('METRICS_TOKEN', '')
+        },
+    
+        'asgi': {
+            # 0: half of DB_POOL_SIZE (asgi.py, handler_threads)
+            'threads': env_int('ASGI_THREADS', 0),
+            'max_body_bytes': env_int('ASGI_MAX_BODY_BYTES', 10 * 1024 * 1024)
+        },
+    
+        'profiler': {
+            'enabled': os.getenv('PROFILE_ENABLED', 'false').lower() in ('1', 'true', 'yes'),
+            'sample_rate': env_int('PROFILE_SAMPLE_RATE', 0),
+            'dir': os.getenv('PROFILE_DIR', '/var/log/pymailadmin/profiles'),
+            'keep': env_int('PROFILE_KEEP', 200)
+        },
+    
+        'security': {
+            'argon2id': {
+                'time_cost': env_int('ADMIN_HASH_TIME_COST', 3),
+                'memory_cost': env_int('ADMIN_HASH_MEMORY_COST', 65536),
+                'threads': env_int('ADMIN_HASH_PARALLELISM', 2)
             },
-            'register': {
-                'max_attempts_per_ip': int(os.getenv('REGISTER_MAX_ATTEMPTS_PER_IP', 3)),
-                'window_minutes': int(os.getenv('REGISTER_WINDOW_MINUTES', 60)),
-                'block_minutes': int(os.getenv('REGISTER_BLOCK_MINUTES', 60))
-            }
-        }
-    },
-    
-    'mailbox_hash': {
-        'algorithm': os.getenv('DOVECOT_HASH', 'argon2id').lower(),
-        'prefix': os.getenv('DOVECOT_HASH_PREFIX') or determine_prefix(os.getenv('DOVECOT_HASH', 'argon2id')),
-        'argon2_time_cost': int(os.getenv('DOVECOT_ARGON2_TIME_COST', 3)),
-        'argon2_memory_cost': int(os.getenv('DOVECOT_ARGON2_MEMORY_COST', 65536)),
-        'argon2_parallelism': int(os.getenv('DOVECOT_ARGON2_PARALLELISM', 2)),
-        'bcrypt_rounds': int(os.getenv('DOVECOT_BCRYPT_ROUNDS', 12)),
-        'pbkdf2_rounds': int(os.getenv('DOVECOT_PBKDF2_ROUNDS', 480000)),
-    },
-    
-    'mail': {
-        'smtp_host': os.getenv('MAIL_SMTP_HOST'),
-        'smtp_port': int(os.getenv('MAIL_SMTP_PORT', 587)),
-        'smtp_username': os.getenv('MAIL_SMTP_USERNAME'),
-        'smtp_password': os.getenv('MAIL_SMTP_PASSWORD'),
-        'smtp_protocol': os.getenv('MAIL_SMTP_PROTOCOL', 'ssl'),
-        'smtp_auth': True,
-        'smtp_debug': 1,
-        'mailgun_api_url': os.getenv('MAILGUN_API_URL', 'https://api.mailgun.net/v3'),
-        'mailgun_api_key': os.getenv('MAILGUN_API_KEY', ''),
-        'mailgun_domain': os.getenv('MAILGUN_DOMAIN', ''),
-        'from_email': os.getenv('MAIL_FROM_EMAIL'),
-        'from_name': os.getenv('MAIL_FROM_NAME'),
-        'smtp_options': {
-            'ssl': {
-                'verify_peer': True,
-                'verify_peer_name': True,
-                'allow_self_signed': False
+            'rate_limit': {
+                'login': {
+                    'max_attempts': env_int('LOGIN_MAX_ATTEMPTS', 5),
+                    'window_minutes': env_int('LOGIN_WINDOW_MINUTES', 15),
+                    'block_minutes': env_int('LOGIN_BLOCK_MINUTES', 30)
+                },
+                'register': {
+                    'max_attempts_per_ip': env_int('REGISTER_MAX_ATTEMPTS_PER_IP', 3),
+                    'window_minutes': env_int('REGISTER_WINDOW_MINUTES', 60),
+                    'block_minutes': env_int('REGISTER_BLOCK_MINUTES', 60)
+                }
             }
         },
-        'smtp_timeout': 30,
-    },
+    
+        'mailbox_hash': {
+            'algorithm': os.getenv('DOVECOT_HASH', 'argon2id').lower(),
+            'prefix': os.getenv('DOVECOT_HASH_PREFIX') or determine_prefix(os.getenv('DOVECOT_HASH', 'argon2id')),
+            'argon2_time_cost': env_int('DOVECOT_ARGON2_TIME_COST', 3),
+            'argon2_memory_cost': env_int('DOVECOT_ARGON2_MEMORY_COST', 65536),
+            'argon2_parallelism': env_int('DOVECOT_ARGON2_PARALLELISM', 2),
+            'bcrypt_rounds': env_int('DOVECOT_BCRYPT_ROUNDS', 12),
+            'pbkdf2_rounds': env_int('DOVECOT_PBKDF2_ROUNDS', 480000),
+        },
+    
+        'mail': {
+            'smtp_host': os.getenv('MAIL_SMTP_HOST'),
+            'smtp_port': env_int('MAIL_SMTP_PORT', 587),
+            'smtp_username': os.getenv('MAIL_SMTP_USERNAME'),
+            'smtp_password': os.getenv('MAIL_SMTP_PASSWORD'),
+            'smtp_protocol': os.getenv('MAIL_SMTP_PROTOCOL', 'ssl'),
+            'smtp_auth': True,
+            'smtp_debug': 1,
+            'mailgun_api_url': os.getenv('MAILGUN_API_URL', 'https://api.mailgun.net/v3'),
+            'mailgun_api_key': os.getenv('MAILGUN_API_KEY', ''),
+            'mailgun_domain': os.getenv('MAILGUN_DOMAIN', ''),
+            'from_email': os.getenv('MAIL_FROM_EMAIL'),
+            'from_name': os.getenv('MAIL_FROM_NAME'),
+            'smtp_options': {
+                'ssl': {
+                    'verify_peer': True,
+                    'verify_peer_name': True,
+                    'allow_self_signed': False
+                }
+            },
+            'smtp_timeout': 30,
+        },
+
+        'db': {
+            'driver': os.getenv('DB_DRIVER', 'mysql').lower(),
+            'path': os.getenv('DB_PATH', ''),
+            'host': os.getenv('DB_HOST'),
+            'dbname': os.getenv('DB_NAME'),
+            'username': os.getenv('DB_USER'),
+            'password': os.getenv('DB_PASSWORD'),
+            'charset': os.getenv('DB_CHARSET', 'utf8mb4'),
+            'pool_size': env_int('DB_POOL_SIZE', 16),
+            'pool_timeout': env_int('DB_POOL_TIMEOUT', 10),
+            'slow_query_ms': env_int('DB_SLOW_QUERY_MS', 200),
+            'query_headers': os.getenv('DB_QUERY_HEADERS', 'true').lower() in ('1', 'true', 'yes')
+        },
+
+        'paths': {
+            'static_dir': os.getenv('STATIC_DIR', '/var/www/pymailadmin/static')
+        },
+        'css': {
+            'main_css': os.getenv('CSS_MAIN', 'main.css')
+        },
+
+        # Dovecot SQL requests — AUTO-GENERATED from schema
+        'sql_dovecot': None  # Will be populated by load_config()
+    }
 
-    'db': {
-        'host': os.getenv('DB_HOST'),
-        'dbname': os.getenv('DB_NAME'),
-        'username': os.getenv('DB_USER'),
-        'password': os.getenv('DB_PASSWORD'),
-        'charset': os.getenv('DB_CHARSET', 'utf8mb4')
-    },
+# Accepted values, see .env.example
+DB_DRIVERS = ('mysql', 'sqlite')
+HASH_ALGORITHMS = ('argon2id', 'argon2i', 'bcrypt', 'sha512-crypt', 'sha256-crypt', 'pbkdf2')
+SMTP_PROTOCOLS = ('ssl', 'tls', 'plain')
 
-    'paths': {
-        'static_dir': os.getenv('STATIC_DIR', '/var/www/pymailadmin/static')
-    },
-    'css': {
-        'main_css': os.getenv('CSS_MAIN', 'main.css')
-    },
+# Settings that must be >= 1 (the others may be 0)
+POSITIVE_SETTINGS = [
+    ('limits', 'max_mailboxes_per_user'), ('limits', 'max_aliases_per_mailbox'), ('limits', 'max_bulk_aliases'),
+    ('api', 'page_size'), ('api', 'max_page_size'), ('api', 'max_batch'), ('api', 'max_body_bytes'),
+    ('search', 'page_size'), ('search', 'autocomplete_limit'), ('search', 'min_length'),
+    ('moderation', 'page_size'),
+    ('shared_cache', 'slots'), ('shared_cache', 'slot_bytes'),
+    ('changes', 'page_size'), ('changes', 'longpoll_timeout'), ('changes', 'poll_interval'), ('changes', 'retention_days'),
+    ('mailbox_import', 'batch_size'), ('mailbox_import', 'max_upload_bytes'),
+    ('asgi', 'max_body_bytes'),
+    ('db', 'pool_timeout'),
+]
 
-    # Dovecot SQL requests — AUTO-GENERATED from schema
-    'sql_dovecot': None  # Will be populated by load_config()
-}
+def validate_config(full_config):
+    """Problems found in a built configuration, as messages"""
+    errors = []
 
-def load_config():
-    """Load complete configuration with auto-generated SQL queries"""
+    if full_config['db']['driver'] not in DB_DRIVERS:
+        errors.append(f"DB_DRIVER must be one of {', '.join(DB_DRIVERS)}")
+    if full_config['mailbox_hash']['algorithm'] not in HASH_ALGORITHMS:
+        errors.append(f"DOVECOT_HASH must be one of {', '.join(HASH_ALGORITHMS)}")
+    if full_config['mail']['smtp_protocol'] not in SMTP_PROTOCOLS:
+        errors.append(f"MAIL_SMTP_PROTOCOL must be one of {', '.join(SMTP_PROTOCOLS)}")
+    if not full_config['PYMAILADMIN_URL'].startswith(('http://', 'https://')):
+        errors.append("PYMAILADMIN_URL must start with http:// or https://")
+
+    for group, key in POSITIVE_SETTINGS:
+        if full_config[group][key] < 1:
+            errors.append(f"{group}.{key} must be at least 1")
+
+    for kind, limits in full_config['security']['rate_limit'].items():
+        for key, value in limits.items():
+            if value < 1:
+                errors.append(f"security.rate_limit.{kind}.{key} must be at least 1")
+
+    if full_config['api']['page_size'] > full_config['api']['max_page_size']:
+        errors.append("API_PAGE_SIZE must not exceed API_MAX_PAGE_SIZE")
+
+    # A streaming page holds two pooled connections at once
+    asgi_threads, pool_size = full_config['asgi']['threads'], full_config['db']['pool_size']
+    if asgi_threads < 0:
+        errors.append("asgi.threads must be at least 0")
+    elif asgi_threads and full_config['db']['driver'] == 'mysql' and pool_size > 0 and asgi_threads * 2 > pool_size:
+        errors.append("ASGI_THREADS must not exceed half of DB_POOL_SIZE (or leave it at 0)")
+
+    return errors
+
+def freeze(value):
+    """Read-only copy: dicts become mappingproxies, lists tuples"""
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    return value
+
+def load_config(reload_env=False):
+    """
+    Build, check and freeze the complete configuration, SQL queries
+    included. reload_env re-reads .env first. Raises ConfigError.
+    """
+    if reload_env:
+        load_env_file()
+
+    dynamic_config = build_dynamic_config()
     
-    required_env = [
-        'SECRET_KEY', 'MAIL_SMTP_HOST', 'MAIL_FROM_EMAIL',
-        'DB_HOST', 'DB_NAME', 'DB_USER', 'DB_PASSWORD'
-    ]
+    required_env = ['SECRET_KEY', 'MAIL_SMTP_HOST', 'MAIL_FROM_EMAIL']
+    
+    if dynamic_config['db']['driver'] == 'sqlite':
+        required_env += ['DB_PATH']
+    else:
+        required_env += ['DB_HOST', 'DB_NAME', 'DB_USER', 'DB_PASSWORD']
 
     missing = [var for var in required_env if not os.getenv(var)]
     if missing:
-        raise EnvironmentError(f"Error: Missing variables in .env : {', '.join(missing)}")
+        raise ConfigError(f"Error: Missing variables in .env : {', '.join(missing)}")
     
     # Load database schema configuration
     schema = load_db_schema()
@@ -215,10 +527,17 @@ def load_config():
     # Generate SQL queries based on schema
     sql_queries = generate_sql_queries(schema)
     
-    # Inject generated queries into dynamic_config
-    dynamic_config['sql_dovecot'] = sql_queries
+    # Inject generated queries into dynamic_config, in the database's dialect
+    dialect = dynamic_config['db']['driver']
+    overrides = config.get('sql_overrides', {}).get(dialect)
+    dynamic_config['sql'] = adapt_sql(config['sql'], dialect, overrides)
+    dynamic_config['sql_dovecot'] = adapt_sql(sql_queries, dialect, overrides)
     
     # Merge configurations
     full_config = {**config, **dynamic_config}
     
-    return full_config
+    errors = validate_config(full_config)
+    if errors:
+        raise ConfigError(f"Error: Invalid configuration: {'; '.join(errors)}")
+    
+    return freeze(full_config)
@@ -0,0 +1,18 @@
+# gunicorn.conf.py
+#
+# Loaded by pymailadmin.service (--config). The command line options there
+# take precedence over this file.
+#
+# With --preload the application, and its configuration, is loaded once in
+# the master and forked into the workers. On SIGHUP (systemctl reload) the
+# master starts new workers and stops the old ones once their requests are
+# done: re-read .env in the master first, or the new workers would inherit
+# the old configuration.
+
+def on_reload(server):
+    from libs import reload_config
+
+    if reload_config():
+        server.log.info("pymailadmin configuration reloaded")
+    else:
+        server.log.error("pymailadmin configuration invalid, kept the previous one (see error.log)")
@@ -1,58 +1,136 @@
 # handlers/html.py
 
 import os
-from libs import config, translations
+from libs import config, translations, register_reload_hook
+from i18n import CATALOGS, LANGUAGE_NAMES
+
+# Static parts of every page, compiled once per language
+_shells = {}
+
+def compile_shell(trans, lang_code):
+    """Pre-render everything in the page layout that does not depend on the request"""
+    css_path = config['css']['main_css']
+    pretty_name = config['PRETTY_NAME']
+
+    return {
+        'head': f"""<!DOCTYPE html>
+<html lang="{trans['html_lang']}">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1">
+    <meta name="color-scheme" content="light dark">
+    <link rel="stylesheet" href="/static/{css_path}">
+    <title>{pretty_name} - """,
+        'body_open': """</title>
+</head>
+<body>
+    <main class="container">
+""",
+        'title_open': "    <h1>",
+        'title_close': "</h1>\n",
+        'tail': """
+    </main>
+</body>
+</html>
+""",
+        'menu_open': f"""    <nav>
+        <ul>
+            <li><a href="/home">{trans["menu_dashboard_link"]}</a></li>
+""",
+        'menu_search': f"""            <li><a href="/search">{trans["menu_search_link"]}</a></li>
+""",
+        'menu_moderation': f"""            <li><a href="/moderate/pending">{trans["menu_moderation_link"]}</a></li>
+""",
+        'menu_import': f"""            <li><a href="/import">{trans["menu_import_link"]}</a></li>
+""",
+        'menu_logout': f"""            <li><a href="/logout">{trans["menu_logout_link"]}</a></li>
+""",
+        # Links to the other languages, see routes/language.py
+        'menu_languages': "".join(
+            f"""            <li><a href="/language?lang={code}" lang="{CATALOGS[code]['html_lang']}">{name}</a></li>
+"""
+            for code, name in LANGUAGE_NAMES.items() if code != lang_code
+        ),
+        'menu_close': """        </ul>
+    </nav>
+""",
+    }
+
+def compile_shells():
+    """Every language at once, swapped in whole (startup, configuration reload)"""
+    global _shells
+    _shells = {lang_code: compile_shell(trans, lang_code) for lang_code, trans in CATALOGS.items()}
+
+def get_shell(lang_code=None):
+    """Layout of the current request's language, or of lang_code"""
+    return _shells[lang_code or translations.language]
 
 def navigation_menu(admin_user_email, admin_role):
-    
+    shell = get_shell()
+    parts = [shell['menu_open']]
+
     if admin_user_email:
-        
+        parts.append(shell['menu_search'])
+
         if admin_role == 'super_admin':
-            admin_menu=f"""
-                <li><a href="/moderate/pending">{translations["menu_moderation_link"]}</a></li>
-            """
-        else:
-            admin_menu=""
-        
-        user_infos=f"""
-            {admin_menu}
-            <li>{admin_user_email}({admin_role})</li>
-            <li><a href="/logout">{translations["menu_logout_link"]}</a></li>
-        """
-    
-    else:
-        user_infos=""
-        
-    return f"""
-    <nav>
-        <ul>
-            <li><a href="/home">{translations["menu_dashboard_link"]}</a></li>
-            {user_infos}
-        </ul>
-    </nav>
+            parts.append(shell['menu_moderation'])
+            parts.append(shell['menu_import'])
+
+        parts.append(f"            <li>{admin_user_email}({admin_role})</li>\n")
+        parts.append(shell['menu_logout'])
+
+    parts.append(shell['menu_languages'])
+    parts.append(shell['menu_close'])
+    return "".join(parts)
+
+def page_chunks(title, content, admin_user_email=None, admin_role=None):
+    """
+    Yield the page as text chunks. `content` is either a string or an
+    iterable of strings (e.g. a generator rendering table rows).
     """
-    
+    shell = get_shell()
+
+    # Everything up to the content goes out as one chunk
+    yield "".join((
+        shell['head'], title, shell['body_open'],
+        navigation_menu(admin_user_email, admin_role),
+        shell['title_open'], title, shell['title_close'],
+    ))
+
+    if isinstance(content, str):
+        yield content
+    else:
+        yield from content
+
+    yield shell['tail']
+
 def html_template(title, content, admin_user_email=None, admin_role=None):
-    css_path = config['css']['main_css']
-    pretty_name = config['PRETTY_NAME']
-    menu = navigation_menu(admin_user_email, admin_role)
-    
-    return f"""
-    <!DOCTYPE html>
-    <html lang="{translations['html_lang']}">
-    <head>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1">
-        <meta name="color-scheme" content="light dark">
-        <link rel="stylesheet" href="/static/{css_path}">
-        <title>{pretty_name} - {title}</title>
-    </head>
-    <body>
-        <main class="container">
-            {menu}
-            <h1>{title}</h1>
-            {content}
-        </main>
-    </body>
-    </html>
+    return "".join(page_chunks(title, content, admin_user_email, admin_role))
+
+def html_stream(title, content, admin_user_email=None, admin_role=None, chunk_size=16384):
     """
+    Same as html_template, as a generator of byte chunks for a WSGI response.
+    The layout head is sent right away, then small fragments (table rows)
+    are grouped until chunk_size characters.
+    """
+    chunks = page_chunks(title, content, admin_user_email, admin_role)
+    yield next(chunks).encode()
+
+    buffer = []
+    buffered = 0
+
+    for fragment in chunks:
+        buffer.append(fragment)
+        buffered += len(fragment)
+
+        if buffered >= chunk_size:
+            yield "".join(buffer).encode()
+            buffer = []
+            buffered = 0
+
+    if buffer:
+        yield "".join(buffer).encode()
+
+# PRETTY_NAME and CSS_MAIN are part of the shells
+compile_shells()
+register_reload_hook(compile_shells)
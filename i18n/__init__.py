@@ -1,24 +1,182 @@
 # i18n/__init__.py
+#
+# Every locale module (i18n/xx_YY.py) is loaded once, at import, into an
+# immutable catalog: the default language's strings overlaid with the
+# locale's own, so a missing key never fails. Templates whose {placeholders}
+# differ from the default language's are replaced by the default string
+# when loaded rather than failing in .format() at request time.
+#
+# The language of a request is chosen by middleware/i18n.py and kept in a
+# context variable: `translations` (also exported by libs) reads from the
+# current request's catalog, so handlers keep using translations['key'].
 
-import os
+import contextvars
+import glob
 import importlib
+import logging
+import os
+import re
+import string
+from collections.abc import Mapping
+from functools import lru_cache
+from types import MappingProxyType
 
 # Languages directory
 I18N_DIR = os.path.dirname(__file__)
 
 # Default language
-DEFAULT_LANGUAGE = 'en-US'
+DEFAULT_LANGUAGE = 'en_US'
+
+LANGUAGE_FILE_RE = re.compile(r'^[a-z]{2,3}_[A-Z]{2}\.py$')
+
+# One Accept-Language entry: "fr-CH", "fr;q=0.9", "*;q=0.1"
+ACCEPT_LANGUAGE_RE = re.compile(r'^\s*([A-Za-z]{1,8}(?:-[A-Za-z0-9]{1,8})*|\*)\s*(?:;\s*q\s*=\s*([0-9.]+))?\s*$')
+
+def normalize_code(lang_code):
+    """'fr-fr', 'fr_FR' -> 'fr_FR'"""
+    language, _, region = (lang_code or '').replace('-', '_').partition('_')
+    return f"{language.lower()}_{region.upper()}" if region else language.lower()
 
 def load_language(lang_code):
-    
+    module = importlib.import_module(f'i18n.{lang_code}')
+    return getattr(module, 'translations', {}), getattr(module, 'language_name', lang_code)
+
+def available_languages():
+    return sorted(
+        os.path.basename(path)[:-3]
+        for path in glob.glob(os.path.join(I18N_DIR, '*.py'))
+        if LANGUAGE_FILE_RE.match(os.path.basename(path))
+    )
+
+def placeholders(text):
+    """Field names used by a .format() template, None if it is not one"""
     try:
-        module = importlib.import_module(f'i18n.{lang_code}')
-        return getattr(module, 'translations', {})
-    
-    except ImportError:
-        print(f"[i18n] Language not found: {lang_code}, fall back to {DEFAULT_LANGUAGE}")
-        return load_language(DEFAULT_LANGUAGE)
+        return {field for _, field, _, _ in string.Formatter().parse(text) if field is not None}
+    except (TypeError, ValueError):
+        return None
+
+def build_catalog(default, strings, lang_code):
+    catalog = dict(default)
+
+    for key, text in strings.items():
+        expected = placeholders(default[key]) if key in default else None
+        if expected is not None and placeholders(text) != expected:
+            logging.error(f"[i18n] {lang_code}: placeholders of '{key}' differ from {DEFAULT_LANGUAGE}, using the {DEFAULT_LANGUAGE} text")
+            continue
+        catalog[key] = text
+
+    return MappingProxyType(catalog)
+
+def load_catalogs():
+    """code -> catalog and code -> display name, for every locale module"""
+    default, default_name = load_language(DEFAULT_LANGUAGE)
+    catalogs = {DEFAULT_LANGUAGE: MappingProxyType(dict(default))}
+    names = {DEFAULT_LANGUAGE: default_name}
+
+    for lang_code in available_languages():
+        if lang_code == DEFAULT_LANGUAGE:
+            continue
+        try:
+            strings, names[lang_code] = load_language(lang_code)
+        except Exception as e:
+            logging.error(f"[i18n] Cannot load {lang_code}: {e}")
+            continue
+        catalogs[lang_code] = build_catalog(default, strings, lang_code)
+
+    return MappingProxyType(catalogs), MappingProxyType(names)
+
+CATALOGS, LANGUAGE_NAMES = load_catalogs()
+
+# Primary subtag -> first locale of that language ('fr' -> 'fr_FR')
+_PRIMARY = {}
+for _code in CATALOGS:
+    _PRIMARY.setdefault(_code.split('_')[0], _code)
+
+def configured_language():
+    """APP_LANGUAGE, when it names a loaded locale"""
+    lang_code = normalize_code(os.getenv('APP_LANGUAGE', DEFAULT_LANGUAGE))
+
+    if lang_code not in CATALOGS:
+        logging.error(f"[i18n] Language not found: {lang_code}, fall back to {DEFAULT_LANGUAGE}")
+        return DEFAULT_LANGUAGE
+
+    return lang_code
+
+APP_LANGUAGE = configured_language()
+
+def refresh_language():
+    """Follow APP_LANGUAGE after a configuration reload (hook registered by libs)"""
+    global APP_LANGUAGE
+    APP_LANGUAGE = configured_language()
+    negotiate.cache_clear()
+
+def match_language(lang_code):
+    """Loaded locale for a language tag, None if there is none"""
+    lang_code = normalize_code(lang_code)
+    if lang_code in CATALOGS:
+        return lang_code
+    return _PRIMARY.get(lang_code.split('_')[0])
+
+@lru_cache(maxsize=512)
+def negotiate(accept_language):
+    """Best loaded locale for an Accept-Language header, else APP_LANGUAGE"""
+    ranges = []
+
+    for position, entry in enumerate(accept_language.split(',')[:32]):
+        match = ACCEPT_LANGUAGE_RE.match(entry)
+        if not match:
+            continue
+        try:
+            quality = float(match.group(2)) if match.group(2) else 1.0
+        except ValueError:
+            continue
+        if quality > 0:
+            # Stable: equal qualities keep the header's order
+            ranges.append((-quality, position, match.group(1)))
+
+    for _, _, tag in sorted(ranges):
+        if tag == '*':
+            return APP_LANGUAGE
+        lang_code = match_language(tag)
+        if lang_code:
+            return lang_code
+
+    return APP_LANGUAGE
+
+# --- Current request's language ---
+# Unset outside requests: get_language() then follows APP_LANGUAGE
+_language = contextvars.ContextVar('pymailadmin_language', default=None)
+
+def set_language(lang_code):
+    """Use this loaded locale for the rest of the current request"""
+    _language.set(lang_code)
+
+def get_language():
+    return _language.get() or APP_LANGUAGE
+
+class Translations(Mapping):
+    """Read-only view of the current request's catalog"""
+
+    def __getitem__(self, key):
+        return CATALOGS[get_language()][key]
+
+    def get(self, key, default=None):
+        return CATALOGS[get_language()].get(key, default)
+
+    def __iter__(self):
+        return iter(CATALOGS[get_language()])
+
+    def __len__(self):
+        return len(CATALOGS[get_language()])
+
+    def __contains__(self, key):
+        return key in CATALOGS[get_language()]
+
+    @property
+    def language(self):
+        return get_language()
+
+translations = Translations()
 
 def get_translations():
-    lang = os.getenv('APP_LANGUAGE', DEFAULT_LANGUAGE)
-    return load_language(lang)
+    return translations
@@ -1,6 +1,9 @@
 # i18n/en_US.py
 # English (United States) translations for pymailadmin
 
+# Shown in the language menu and the setup wizard
+language_name = 'English (US)'
+
 translations = {
     # === app.py ===
     'page_not_found_title': 'Page Not Found',
@@ -13,6 +16,7 @@ translations = {
     'forbidden_access': 'Forbidden access',
     'not_found': 'Not Found',
     'internal_server_error': 'Internal Server Error',
+    'service_unavailable': 'Service temporarily unavailable, please try again shortly',
     
     # === routes/login.py ===
     'login_title': 'Admin Login',
@@ -167,7 +171,7 @@ translations = {
     
     # Mailbox limits
     'mailbox_limit_reached': 'Maximum number of mailboxes reached',
-    'mailbox_count_display': 'Your mailboxes: {count}/3',
+    'mailbox_count_display': 'Your mailboxes: {count}/{max}',
     'create_mailbox_btn': 'Create new mailbox',
     'create_mailbox_btn_disabled': 'Mailboxes limit reached',
     'error_mailbox_limit_exceeded': 'You cannot create more mailboxes.',
@@ -222,7 +226,7 @@ translations = {
     'btn_finish_setup': 'Finish Setup',
     'config_write_failed': 'Failed to write configuration. Please check file permissions.',
     'cron_script_title': 'pymailadmin connector cron script for Dovecot',
-    'cron_script_instructions': 'You may now connect <strong>to your Dovecot mail server</strong>, then:<br><ul><li>make sure you have python3 and python3-mysqldb installed</li><li>Copy this script somewhere on your Dovecot server, e.g. /opt/pymailadmin/pymailadmin-cron.py</li><li>Then create a crontab task as follows:</li><li><pre>*/2 * * * * /opt/pymailadmin/venv/bin/python /opt/pymailadmin/pymailadmin-cron.py</pre></li></ul>',
+    'cron_script_instructions': 'You may now connect <strong>to your Dovecot mail server</strong>, then:<br><ul><li>make sure you have python3 and python3-mysqldb installed</li><li>Copy this script somewhere on your Dovecot server, e.g. /opt/pymailadmin/pymailadmin-cron.py</li><li>Then create a crontab task as follows:</li><li><pre>*/2 * * * * /opt/pymailadmin/venv/bin/python /opt/pymailadmin/pymailadmin-cron.py</pre></li><li>Or, to apply changes within seconds, run it as a service with <code>--follow</code> instead of cron</li></ul>',
     'cron_script_footer': 'Installation complete! You can now proceed to use the admin panel.',
     'btn_copy_clipboard':'Copy to Clipboard',
     'goto_dashboard': 'Go to Admin Dashboard',
@@ -237,6 +241,7 @@ translations = {
     'domain_label': 'Domain',
     'quota_label': 'Quota (in GB)',
     'btn_create': 'My password has been saved somewhere safe. Create Mailbox',
+    'mailbox_created_title': 'Mailbox created',
     'mailbox_created': 'The new following mailbox has just been created successfully.',
     'all_fields_required': 'All required fields must be filled.',
     'invalid_domain': 'Invalid domain selected.',
@@ -253,6 +258,81 @@ translations = {
     'mailbox_creation_quota_hint': 'The maximum quota in GB, up to 5.',
     'mailbox_ongoing_creation_note': 'Your new encrypted mailbox is being created, please wait for it to activate.',
 
+    # === routes/mailbox_import.py ===
+    'import_title': 'Import mailboxes',
+    'import_form_hint': 'CSV file, one mailbox per line: email,password,quota (quota in GB, 1 to 5, optional). A first line "email,password,quota" is skipped. For thousands of mailboxes, prefer the command line: python3 -m scripts.import_mailboxes',
+    'import_file_label': 'CSV file',
+    'import_owner_label': 'Owner (admin email, optional)',
+    'import_owner_hint': 'The mailboxes count against this admin\'s limit and appear in their dashboard. Default: you.',
+    'btn_import': 'Import',
+    'import_no_file': 'No CSV file received.',
+    'import_file_too_large': 'The CSV file is too large.',
+    'import_unknown_owner': 'Unknown owner.',
+    'import_progress_hashed': 'Passwords hashed: {done}/{total}',
+    'import_progress_created': 'Mailboxes processed: {done}/{total}',
+    'import_summary': '{created} mailbox(es) created, {errors} line(s) rejected.',
+    'import_errors_title': 'Rejected lines',
+    'import_line_col': 'Line',
+    'import_error_col': 'Error',
+    'import_error_columns': 'Expected email,password,quota',
+    'import_error_email': 'Invalid email address',
+    'import_error_password': 'Password must be 12 to 64 characters, without %',
+    'import_error_quota': 'Quota must be a whole number from 1 to 5',
+    'import_error_duplicate': 'Email address already on a previous line',
+    'import_error_limit': 'Mailbox limit reached for this owner',
+    'import_error_database': 'Database error, mailbox not created',
+    'import_error_doveadm': 'Created, but Dovecot failed to initialize the mailbox',
+    'menu_import_link': 'Import',
+
+    # === routes/export.py ===
+    'export_invalid_request': 'Invalid export request.',
+    'export_label': 'Export:',
+    'export_mailboxes_csv': 'mailboxes (CSV)',
+    'export_aliases_csv': 'aliases (CSV)',
+    'export_all_jsonl': 'everything (JSON Lines)',
+
+    # === routes/alias_bulk.py ===
+    'alias_bulk_title': 'Bulk aliases',
+    'alias_bulk_link': 'Bulk aliases',
+    'alias_bulk_hint': 'Add or delete up to {max} aliases at once, or move all the aliases of a mailbox to another mailbox of the same domain.',
+    'alias_bulk_add': 'Add: one "alias destination@domain.tld" per line',
+    'alias_bulk_delete': 'Delete: one alias@domain.tld per line',
+    'alias_bulk_lines_hint': 'Alias names: lowercase letters, digits, underscore, dash; minimum 8 characters. Lines starting with # are ignored.',
+    'alias_bulk_rewrite': 'Move all aliases of a mailbox to another mailbox of the same domain:',
+    'alias_bulk_too_many': 'Too many lines: {max} at most.',
+    'alias_bulk_failed': 'Bulk alias operation failed, nothing was changed.',
+    'alias_bulk_errors_title': 'Rejected lines',
+    'alias_bulk_error_format': 'Expected "alias destination@domain.tld"',
+    'alias_bulk_error_source': 'Invalid alias name, or domain different from the destination',
+    'alias_bulk_error_rewrite_domain': 'Both mailboxes must be different and in the same domain',
+    'alias_bulk_summary_add': '{done} alias(es) added, {errors} line(s) rejected.',
+    'alias_bulk_summary_delete': '{done} alias(es) deleted, {errors} line(s) rejected.',
+    'alias_bulk_summary_rewrite': '{done} alias(es) moved, {errors} error(s).',
+    'btn_apply': 'Apply',
+
+    # === routes/search.py ===
+    'search_title': 'Search',
+    'menu_search_link': 'Search',
+    'search_title_mailboxes': 'Mailboxes',
+    'search_title_aliases': 'Aliases',
+    'search_title_destinations': 'Aliases by destination',
+    'search_no_results': 'No results.',
+    'search_more': 'Next results',
+    'search_too_short': 'Type at least {min} characters.',
+    'search_failed': 'Search failed.',
+    'btn_search': 'Search',
+
+    # === routes/moderation.py (bulk) ===
+    'moderation_select_col': 'Select',
+    'moderation_bulk_title': 'Selected registrations',
+    'moderation_bulk_hint': 'The checked domains are allowed to every selected registration.',
+    'approve_selected_btn': 'Accept selected',
+    'deny_selected_btn': 'Decline selected',
+    'moderation_no_pending': 'No pending registrations.',
+    'moderation_no_selection': 'No registration selected.',
+    'moderation_errors_title': 'Some registrations were not processed',
+    'moderation_back': 'Back to moderation',
+
     # Buttons / common
     'btn_yes': 'Yes',
     'btn_no': 'No',
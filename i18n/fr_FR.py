@@ -1,6 +1,9 @@
 # i18n/fr_FR.py
 # French (France) translations for pymailadmin
 
+# Shown in the language menu and the setup wizard
+language_name = 'Français'
+
 translations = {
     # === app.py ===
     'page_not_found_title': 'Page introuvable',
@@ -13,6 +16,7 @@ translations = {
     'forbidden_access': 'FAccès interdit',
     'not_found': 'Introuvable',
     'internal_server_error': 'Erreur interne du serveur',
+    'service_unavailable': 'Service temporairement indisponible, veuillez réessayer dans un instant',
     
     # === routes/login.py ===
     'login_title': 'Connexion Admin',
@@ -222,7 +226,7 @@ translations = {
     'btn_finish_setup': 'Finish Setup',
     'config_write_failed': 'Failed to write configuration. Please check file permissions.',
     'cron_script_title': 'pymailadmin connector cron script for Dovecot',
-    'cron_script_instructions': 'You may now connect <strong>to your Dovecot mail server</strong>, then:<br><ul><li>make sure you have python3 and python3-mysqldb installed</li><li>Copy this script somewhere on your Dovecot server, e.g. /opt/pymailadmin/pymailadmin-cron.py</li><li>Then create a crontab task as follows:</li><li><pre>*/2 * * * * /opt/pymailadmin/venv/bin/python /opt/pymailadmin/pymailadmin-cron.py</pre></li></ul>',
+    'cron_script_instructions': 'You may now connect <strong>to your Dovecot mail server</strong>, then:<br><ul><li>make sure you have python3 and python3-mysqldb installed</li><li>Copy this script somewhere on your Dovecot server, e.g. /opt/pymailadmin/pymailadmin-cron.py</li><li>Then create a crontab task as follows:</li><li><pre>*/2 * * * * /opt/pymailadmin/venv/bin/python /opt/pymailadmin/pymailadmin-cron.py</pre></li><li>Or, to apply changes within seconds, run it as a service with <code>--follow</code> instead of cron</li></ul>',
     'cron_script_footer': 'Installation complete! You can now proceed to use the admin panel.',
     'btn_copy_clipboard':'Copy to Clipboard',
     'goto_dashboard': 'Go to Admin Dashboard',
@@ -237,6 +241,7 @@ translations = {
     'domain_label': 'Domaine',
     'quota_label': 'Quota (en Go)',
     'btn_create': 'Mon mot de passe a été sauvegardé en lieu sûr. Créer la boite mail',
+    'mailbox_created_title': 'Boite mail créée',
     'mailbox_created': 'La nouvelle boite suivante vient d\'être créée avec succès.',
     'all_fields_required': 'Tous les champs requis doivent être renseignés.',
     'invalid_domain': 'Domaine sélectionné invalide.',
@@ -253,6 +258,81 @@ translations = {
     'mailbox_creation_quota_hint': 'Le quota maximal en Go, jusqu\'à 5.',
     'mailbox_ongoing_creation_note': 'Votr enouvelle boite mail chiffrée est en cours de création. Veuillez patienter pendant son actcivation.',
 
+    # === routes/mailbox_import.py ===
+    'import_title': 'Importer des boîtes mail',
+    'import_form_hint': 'Fichier CSV, une boîte par ligne : email,mot de passe,quota (quota en Go, de 1 à 5, facultatif). Une première ligne "email,password,quota" est ignorée. Pour des milliers de boîtes, préférez la ligne de commande : python3 -m scripts.import_mailboxes',
+    'import_file_label': 'Fichier CSV',
+    'import_owner_label': 'Propriétaire (email d\'un⋅e admin, facultatif)',
+    'import_owner_hint': 'Les boîtes comptent dans la limite de cet⋅te admin et apparaissent dans son tableau de bord. Par défaut : vous.',
+    'btn_import': 'Importer',
+    'import_no_file': 'Aucun fichier CSV reçu.',
+    'import_file_too_large': 'Le fichier CSV est trop volumineux.',
+    'import_unknown_owner': 'Propriétaire inconnu⋅e.',
+    'import_progress_hashed': 'Mots de passe hachés : {done}/{total}',
+    'import_progress_created': 'Boîtes traitées : {done}/{total}',
+    'import_summary': '{created} boîte(s) créée(s), {errors} ligne(s) rejetée(s).',
+    'import_errors_title': 'Lignes rejetées',
+    'import_line_col': 'Ligne',
+    'import_error_col': 'Erreur',
+    'import_error_columns': 'Attendu : email,mot de passe,quota',
+    'import_error_email': 'Adresse email invalide',
+    'import_error_password': 'Le mot de passe doit faire de 12 à 64 caractères, sans %',
+    'import_error_quota': 'Le quota doit être un nombre entier de 1 à 5',
+    'import_error_duplicate': 'Adresse email déjà présente sur une ligne précédente',
+    'import_error_limit': 'Limite de boîtes atteinte pour ce⋅tte propriétaire',
+    'import_error_database': 'Erreur de base de données, boîte non créée',
+    'import_error_doveadm': 'Créée, mais Dovecot n\'a pas pu initialiser la boîte',
+    'menu_import_link': 'Importer',
+
+    # === routes/export.py ===
+    'export_invalid_request': 'Demande d\'export invalide.',
+    'export_label': 'Exporter :',
+    'export_mailboxes_csv': 'boîtes (CSV)',
+    'export_aliases_csv': 'alias (CSV)',
+    'export_all_jsonl': 'tout (JSON Lines)',
+
+    # === routes/alias_bulk.py ===
+    'alias_bulk_title': 'Alias en masse',
+    'alias_bulk_link': 'Alias en masse',
+    'alias_bulk_hint': "Ajoutez ou supprimez jusqu'à {max} alias à la fois, ou déplacez tous les alias d'une boîte vers une autre boîte du même domaine.",
+    'alias_bulk_add': 'Ajouter : un « alias destination@domaine.tld » par ligne',
+    'alias_bulk_delete': 'Supprimer : un alias@domaine.tld par ligne',
+    'alias_bulk_lines_hint': 'Noms d\'alias : minuscules, chiffres, tiret bas, tiret ; 8 caractères minimum. Les lignes commençant par # sont ignorées.',
+    'alias_bulk_rewrite': "Déplacer tous les alias d'une boîte vers une autre boîte du même domaine :",
+    'alias_bulk_too_many': 'Trop de lignes : {max} au maximum.',
+    'alias_bulk_failed': "Échec de l'opération sur les alias, rien n'a été modifié.",
+    'alias_bulk_errors_title': 'Lignes rejetées',
+    'alias_bulk_error_format': 'Attendu : « alias destination@domaine.tld »',
+    'alias_bulk_error_source': "Nom d'alias invalide, ou domaine différent de la destination",
+    'alias_bulk_error_rewrite_domain': 'Les deux boîtes doivent être différentes et du même domaine',
+    'alias_bulk_summary_add': '{done} alias ajouté(s), {errors} ligne(s) rejetée(s).',
+    'alias_bulk_summary_delete': '{done} alias supprimé(s), {errors} ligne(s) rejetée(s).',
+    'alias_bulk_summary_rewrite': '{done} alias déplacé(s), {errors} erreur(s).',
+    'btn_apply': 'Appliquer',
+
+    # === routes/search.py ===
+    'search_title': 'Recherche',
+    'menu_search_link': 'Recherche',
+    'search_title_mailboxes': 'Boîtes mail',
+    'search_title_aliases': 'Alias',
+    'search_title_destinations': 'Alias par destination',
+    'search_no_results': 'Aucun résultat.',
+    'search_more': 'Résultats suivants',
+    'search_too_short': 'Saisissez au moins {min} caractères.',
+    'search_failed': 'La recherche a échoué.',
+    'btn_search': 'Rechercher',
+
+    # === routes/moderation.py (bulk) ===
+    'moderation_select_col': 'Sélection',
+    'moderation_bulk_title': 'Inscriptions sélectionnées',
+    'moderation_bulk_hint': 'Les domaines cochés sont autorisés pour chaque inscription sélectionnée.',
+    'approve_selected_btn': 'Accepter la sélection',
+    'deny_selected_btn': 'Refuser la sélection',
+    'moderation_no_pending': 'Aucune inscription en attente.',
+    'moderation_no_selection': 'Aucune inscription sélectionnée.',
+    'moderation_errors_title': 'Certaines inscriptions n\'ont pas été traitées',
+    'moderation_back': 'Retour à la modération',
+
     # Buttons / common
     'btn_yes': 'Oui',
     'btn_no': 'Non',
@@ -1,37 +1,80 @@
 # libs/__init__.py
 
+import logging
 import os
-from dotenv import load_dotenv
+from collections.abc import Mapping
 
-load_dotenv()
-
-# Import load_config and static config
+# Import load_config (config_loader applies .env when imported)
 from config_loader import load_config
-from config_data import config as static_config
 
-# Load merged config
-config = None
+# Current configuration: one frozen snapshot, replaced as a whole by
+# reload_config(), so a request never sees half of an old and half of a
+# new configuration. Read it through `config` rather than keeping values in
+# module globals, or they will not follow reloads.
+_snapshot = load_config()
+_reload_hooks = []
+
+class Config(Mapping):
+    """Read-only view of the current configuration snapshot"""
+
+    def __getitem__(self, key):
+        return _snapshot[key]
+
+    def get(self, key, default=None):
+        return _snapshot.get(key, default)
+
+    def __iter__(self):
+        return iter(_snapshot)
+
+    def __len__(self):
+        return len(_snapshot)
+
+    def __contains__(self, key):
+        return key in _snapshot
+
+config = Config()
 
 def get_config():
-    global config
-    if config is None:
-        dynamic_config = load_config()
-        config = {**static_config, **dynamic_config}
     return config
 
-# Expose config object
-config = get_config()
+def register_reload_hook(hook):
+    """Call hook() after each successful reload (to rebuild what derives from the configuration)"""
+    _reload_hooks.append(hook)
+
+def reload_config():
+    """
+    Re-read .env and swap in the new configuration if it is valid; else keep
+    the current one. Database, metrics and log settings need a restart.
+    """
+    global _snapshot
+
+    try:
+        snapshot = load_config(reload_env=True)
+    except Exception as e:
+        logging.error(f"Configuration not reloaded: {e}")
+        return False
+
+    _snapshot = snapshot
+
+    for hook in list(_reload_hooks):
+        try:
+            hook()
+        except Exception as e:
+            logging.error(f"Configuration reload hook {getattr(hook, '__name__', hook)} failed: {e}")
+
+    logging.warning("Configuration reloaded")
+    return True
 
 import time
 import secrets
 from datetime import datetime, timedelta
 from urllib.parse import parse_qs
-from config_loader import load_config
 from utils.db import execute_query, fetch_all
 from email.mime.text import MIMEText
 import smtplib
 from passlib.hash import argon2, bcrypt, sha512_crypt, sha256_crypt, pbkdf2_sha256
-from i18n import get_translations
+from i18n import get_translations, refresh_language
 translations = get_translations()
+register_reload_hook(refresh_language)
 
-__all__ = ['config', 'execute_query', 'fetch_all', 'parse_qs', 'datetime', 'timedelta', 'secrets', 'smtplib', 'argon2', 'translations']
+__all__ = ['config', 'reload_config', 'register_reload_hook', 'execute_query', 'fetch_all', 'parse_qs', 'datetime', 'timedelta', 'secrets', 'smtplib', 'argon2', 'translations']
@@ -0,0 +1,37 @@
+# middleware/i18n.py
+
+from i18n import CATALOGS, negotiate, set_language
+
+def request_language(environ):
+    """Session preference (/language), else Accept-Language, else APP_LANGUAGE"""
+    session = environ.get('session')
+    preferred = session.data.get('language') if session is not None else None
+
+    if preferred in CATALOGS:
+        return preferred
+
+    return negotiate(environ.get('HTTP_ACCEPT_LANGUAGE', ''))
+
+def I18nMiddleware(app):
+    """
+    Select the catalog `translations` reads from for this request. Must be
+    wrapped by SessionMiddleware to see the session preference.
+
+    The language is not reset when the handler returns: streamed bodies are
+    rendered afterwards, in the same thread (or ASGI context), and the next
+    request sets its own.
+    """
+
+    def middleware(environ, start_response):
+        lang_code = request_language(environ)
+        set_language(lang_code)
+
+        def custom_start_response(status, headers, exc_info=None):
+            if not environ.get('PATH_INFO', '').startswith('/static/'):
+                headers.append(('Content-Language', CATALOGS[lang_code]['html_lang']))
+                headers.append(('Vary', 'Accept-Language'))
+            return start_response(status, headers, exc_info)
+
+        return app(environ, custom_start_response)
+
+    return middleware
@@ -0,0 +1,103 @@
+# middleware/metrics.py
+
+import hmac
+import logging
+import time
+from libs import config
+from utils import metrics
+
+class ClosingIterator:
+    """Pass a WSGI response through and run `callback` once it is closed"""
+
+    def __init__(self, response, callback):
+        self.response = response
+        self.callback = callback
+
+    def __iter__(self):
+        return iter(self.response)
+
+    def close(self):
+        try:
+            if hasattr(self.response, 'close'):
+                self.response.close()
+        finally:
+            callback, self.callback = self.callback, None
+            if callback:
+                callback()
+
+def metrics_allowed(environ):
+    metrics_conf = config['metrics']
+    token = metrics_conf.get('token')
+
+    if token:
+        auth = environ.get('HTTP_AUTHORIZATION', '')
+        if auth.startswith('Bearer ') and hmac.compare_digest(auth[7:].strip(), token):
+            return True
+
+    # Requests coming through nginx carry the real client address
+    client_ip = environ.get('HTTP_X_REAL_IP') or environ.get('REMOTE_ADDR', '')
+    return client_ip in metrics_conf.get('allowed_ips', [])
+
+def metrics_handler(environ, start_response):
+    if not config['metrics'].get('enabled'):
+        start_response("404 Not Found", [("Content-Type", "text/plain")])
+        return [b"Not Found"]
+
+    if not metrics_allowed(environ):
+        start_response("403 Forbidden", [("Content-Type", "text/plain")])
+        return [b"Forbidden"]
+
+    try:
+        body = metrics.render(metrics.collect()).encode('utf-8')
+    except Exception as e:
+        logging.error(f"Error collecting metrics: {e}")
+        start_response("500 Internal Server Error", [("Content-Type", "text/plain")])
+        return [b"Internal Server Error"]
+
+    start_response("200 OK", [
+        ("Content-Type", "text/plain; version=0.0.4; charset=utf-8"),
+        ("Content-Length", str(len(body))),
+        ("Cache-Control", "no-store"),
+    ])
+    return [body]
+
+def MetricsMiddleware(app):
+    """
+    Count and time every request by route. Must be the outermost middleware:
+    /metrics is answered here, before any session is loaded, and the duration
+    runs until the (possibly streamed) response is closed.
+    """
+
+    def middleware(environ, start_response):
+        if environ.get('PATH_INFO', '').rstrip('/') == '/metrics':
+            return metrics_handler(environ, start_response)
+
+        if not config['metrics'].get('enabled'):
+            return app(environ, start_response)
+
+        started = time.perf_counter()
+        status_code = ['500']
+        metrics.add_gauge('pymailadmin_http_requests_in_flight', 1)
+
+        def custom_start_response(status, headers, exc_info=None):
+            status_code[0] = status.split(' ', 1)[0]
+            return start_response(status, headers, exc_info)
+
+        def finish():
+            # Set by app.py from the routing table, so unknown paths share one label
+            route = environ.get('pymailadmin.route', 'unmatched')
+            labels = {'route': route, 'method': environ.get('REQUEST_METHOD', 'GET'), 'status': status_code[0]}
+            metrics.inc('pymailadmin_http_requests_total', labels)
+            metrics.observe('pymailadmin_http_request_duration_seconds', time.perf_counter() - started, {'route': route})
+            metrics.add_gauge('pymailadmin_http_requests_in_flight', -1)
+            metrics.flush()
+
+        try:
+            response = app(environ, custom_start_response)
+        except Exception:
+            finish()
+            raise
+
+        return ClosingIterator(response, finish)
+
+    return middleware
@@ -0,0 +1,140 @@
+# middleware/profiler.py
+
+import cProfile
+import hashlib
+import hmac
+import logging
+import os
+import random
+import re
+import secrets
+import time
+from libs import config
+
+PROFILE_HEADER = 'HTTP_X_PYMAILADMIN_PROFILE'
+
+def profile_token(session_id, secret=None):
+    """Value of the X-Pymailadmin-Profile header for a session, see scripts/profile_summary.py sign"""
+    secret = secret or config['SECRET_KEY']
+    return hmac.new(secret.encode(), f"profile:{session_id}".encode(), hashlib.sha256).hexdigest()
+
+def profile_requested(environ):
+    """Signed header from a super_admin session"""
+    token = environ.get(PROFILE_HEADER)
+    session = environ.get('session')
+
+    if not token or session is None or not session.id:
+        return False
+
+    if session.data.get('role') != 'super_admin':
+        return False
+
+    return hmac.compare_digest(token, profile_token(session.id))
+
+def should_profile(environ):
+    profiler_conf = config['profiler']
+
+    if not profiler_conf.get('enabled'):
+        return False
+
+    if profile_requested(environ):
+        return True
+
+    sample_rate = profiler_conf.get('sample_rate', 0)
+    return sample_rate > 0 and random.randrange(sample_rate) == 0
+
+def prune_profiles(profile_dir, keep):
+    """Keep the `keep` most recent profiles"""
+    profiles = sorted(
+        (entry for entry in os.scandir(profile_dir) if entry.name.endswith('.prof')),
+        key=lambda entry: entry.stat().st_mtime,
+    )
+    for entry in profiles[:max(len(profiles) - keep, 0)]:
+        try:
+            os.remove(entry.path)
+        except OSError:
+            pass
+
+def save_profile(profile, environ, duration):
+    profiler_conf = config['profiler']
+    profile_dir = profiler_conf['dir']
+
+    route = environ.get('pymailadmin.route') or environ.get('PATH_INFO', '')
+    route = re.sub(r'[^A-Za-z0-9]+', '_', route).strip('_') or 'root'
+    filename = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{secrets.token_hex(2)}-{route}-{int(duration * 1000)}ms.prof"
+
+    try:
+        os.makedirs(profile_dir, exist_ok=True)
+        profile.dump_stats(os.path.join(profile_dir, filename))
+        prune_profiles(profile_dir, profiler_conf.get('keep', 200))
+    except Exception as e:
+        logging.error(f"Error saving profile {filename}: {e}")
+
+class ProfiledResponse:
+    """
+    Keep profiling while a streamed response is produced: the profiler is on
+    during each next(), off while the server writes to the socket.
+    """
+
+    def __init__(self, response, profile, environ, started):
+        self.response = response
+        self.iterator = iter(response)
+        self.profile = profile
+        self.environ = environ
+        self.started = started
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        self.profile.enable()
+        try:
+            return next(self.iterator)
+        finally:
+            self.profile.disable()
+
+    def close(self):
+        if self.profile is None:
+            return
+        try:
+            if hasattr(self.response, 'close'):
+                self.profile.enable()
+                try:
+                    self.response.close()
+                finally:
+                    self.profile.disable()
+        finally:
+            save_profile(self.profile, self.environ, time.perf_counter() - self.started)
+            self.profile = None
+
+def ProfilerMiddleware(app):
+    """
+    Opt-in cProfile of production requests: 1 in PROFILE_SAMPLE_RATE requests,
+    or any request from a super_admin session carrying a valid
+    X-Pymailadmin-Profile header. Must sit inside SessionMiddleware.
+    """
+
+    def middleware(environ, start_response):
+        if not should_profile(environ):
+            return app(environ, start_response)
+
+        profile = cProfile.Profile()
+        started = time.perf_counter()
+
+        try:
+            profile.enable()
+        except ValueError:
+            # Another profiler is already active in this thread
+            return app(environ, start_response)
+
+        try:
+            response = app(environ, start_response)
+        except Exception:
+            profile.disable()
+            save_profile(profile, environ, time.perf_counter() - started)
+            raise
+        profile.disable()
+
+        return ProfiledResponse(response, profile, environ, started)
+
+    return middleware
@@ -0,0 +1,37 @@
+# middleware/query_stats.py
+
+import logging
+from libs import config
+from utils.db import QueryStats, begin_query_stats, end_query_stats
+
+def query_stats_headers(stats):
+    total_ms = stats.total_time * 1000
+    return [
+        ('X-DB-Queries', str(stats.count)),
+        ('X-DB-Time', f"{total_ms:.1f}ms"),
+        ('Server-Timing', f'db;dur={total_ms:.1f};desc="{stats.count} queries"'),
+    ]
+
+def QueryStatsMiddleware(app):
+    """
+    Collect every statement run while handling a request and report them in
+    response headers. Must wrap SessionMiddleware so that session load/save
+    are counted. Rows streamed after the response started are not included.
+    """
+
+    def middleware(environ, start_response):
+        stats = QueryStats()
+        environ['pymailadmin.query_stats'] = stats
+        token = begin_query_stats(stats)
+
+        def custom_start_response(status, headers, exc_info=None):
+            if config['db'].get('query_headers'):
+                headers.extend(query_stats_headers(stats))
+            return start_response(status, headers, exc_info)
+
+        try:
+            return app(environ, custom_start_response)
+        finally:
+            end_query_stats(token)
+
+    return middleware
@@ -9,6 +9,7 @@ import secrets
 import logging
 
 from libs import config, fetch_all, execute_query, parse_qs
+from utils.db import PoolTimeout
 
 class DateTimeEncoder(json.JSONEncoder):
     def default(self, obj):
@@ -68,6 +69,10 @@ def SessionMiddleware(app, secret=None):
         secret = config.get('SECRET_KEY', 'your-default-secret-key')
 
     def middleware(environ, start_response):
+        # The API authenticates each request with its key: no session row
+        if environ.get('PATH_INFO', '').startswith('/api/'):
+            return app(environ, start_response)
+
         cookies = {}
         if 'HTTP_COOKIE' in environ:
             for cookie in environ['HTTP_COOKIE'].split(';'):
@@ -86,10 +91,13 @@ def SessionMiddleware(app, secret=None):
         environ['session'] = session
 
         def custom_start_response(status, headers, exc_info=None):
-            session.save()
-            signed_sid = sign_session_id(session.id, secret)
-            secure_flag = "; Secure" if environ.get('wsgi.url_scheme') == 'https' else ""
-            headers.append(('Set-Cookie', f'session_id={signed_sid}; Path=/; HttpOnly;{secure_flag}'))
+            # Answered 503 once the pool ran dry: don't wait on it again to save
+            stats = environ.get('pymailadmin.query_stats')
+            if stats is None or not stats.pool_timeouts:
+                session.save()
+                signed_sid = sign_session_id(session.id, secret)
+                secure_flag = "; Secure" if environ.get('wsgi.url_scheme') == 'https' else ""
+                headers.append(('Set-Cookie', f'session_id={signed_sid}; Path=/; HttpOnly;{secure_flag}'))
             return start_response(status, headers, exc_info)
 
         try:
@@ -98,6 +106,9 @@ def SessionMiddleware(app, secret=None):
                 logging.error("SessionMiddleware: app returned None")
                 return [b"Internal Server Error: app returned None"]
             return response
+        except PoolTimeout:
+            # Answered 503 by UnavailableMiddleware
+            raise
         except Exception as e:
             logging.error(f"SessionMiddleware unexpected error: {e}", exc_info=True)
             return [b"Internal Server Error"]
@@ -0,0 +1,48 @@
+# middleware/unavailable.py
+
+import logging
+import sys
+from libs import config, translations
+from utils.db import PoolTimeout
+
+def UnavailableMiddleware(app):
+    """
+    Answer 503 when a database connection couldn't be had in time, rather
+    than a page built on missing rows or a write that didn't happen. Must
+    wrap SessionMiddleware (the session is read before any handler runs) and
+    sit inside QueryStatsMiddleware, whose stats count the timeouts: handlers
+    that catch every exception and answer on their own are overridden too.
+    A response already streaming can only be cut short.
+    """
+
+    def unavailable(environ, start_response, exc_info=None):
+        logging.error(f"No database connection in time, answering 503 for {environ.get('PATH_INFO', '')}")
+        retry_after = max(1, int(config['db'].get('pool_timeout', 10)))
+        return start_response("503 Service Unavailable", [
+            ("Content-Type", "text/html"),
+            ("Retry-After", str(retry_after))
+        ], exc_info)
+
+    def middleware(environ, start_response):
+        stats = environ.get('pymailadmin.query_stats')
+        replaced = []
+
+        def custom_start_response(status, headers, exc_info=None):
+            if stats is not None and stats.pool_timeouts:
+                replaced.append(True)
+                return unavailable(environ, start_response, exc_info)
+            return start_response(status, headers, exc_info)
+
+        try:
+            response = app(environ, custom_start_response)
+        except PoolTimeout:
+            unavailable(environ, start_response, sys.exc_info())
+            return [translations['service_unavailable'].encode('utf-8')]
+
+        if replaced:
+            if hasattr(response, 'close'):
+                response.close()
+            return [translations['service_unavailable'].encode('utf-8')]
+        return response
+
+    return middleware
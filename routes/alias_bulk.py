@@ -0,0 +1,127 @@
+# routes/alias_bulk.py
+
+from libs import config, translations, parse_qs
+from utils.alias_bulk import BulkAliases
+from handlers.html import html_template
+import html
+import logging
+
+OPERATIONS = ('add', 'delete', 'rewrite')
+
+# Bytes of form data per allowed line
+BYTES_PER_LINE = 512
+
+def render_form(session, admin_user_email, admin_role, operation='add', lines='', old_destination='', new_destination=''):
+    checked = {op: ' checked' if op == operation else '' for op in OPERATIONS}
+    form_html = f"""
+        <p>{translations['alias_bulk_hint'].format(max=config['limits']['max_bulk_aliases'])}</p>
+        <form method="POST" action="/aliases/bulk">
+            <input type="hidden" name="csrf_token" value="{session.get_csrf_token()}">
+
+            <label><input type="radio" name="operation" value="add"{checked['add']}> {translations['alias_bulk_add']}</label><br>
+            <label><input type="radio" name="operation" value="delete"{checked['delete']}> {translations['alias_bulk_delete']}</label><br>
+            <small>{translations['alias_bulk_lines_hint']}</small><br>
+            <textarea name="lines" rows="15" cols="70" spellcheck="false">{html.escape(lines)}</textarea><br><br>
+
+            <label><input type="radio" name="operation" value="rewrite"{checked['rewrite']}> {translations['alias_bulk_rewrite']}</label><br>
+            <input type="email" name="old_destination" value="{html.escape(old_destination)}" placeholder="old@domain.tld"> →
+            <input type="email" name="new_destination" value="{html.escape(new_destination)}" placeholder="new@domain.tld"><br><br>
+
+            <button type="submit">{translations['btn_apply']}</button>
+            <a href="/home"><button type="button">{translations['btn_cancel']}</button></a>
+        </form>
+    """
+    return html_template(translations['alias_bulk_title'], form_html, admin_user_email=admin_user_email, admin_role=admin_role)
+
+def render_report(bulk, operation, admin_user_email, admin_role):
+    rows = "".join(
+        f"<tr><td>{error.line or ''}</td><td>{html.escape(error.value)}</td><td>{error.message}</td></tr>\n"
+        for error in bulk.errors
+    )
+    errors_html = ""
+    if bulk.errors:
+        errors_html = f"""
+    <h2>{translations['alias_bulk_errors_title']}</h2>
+    <table>
+        <thead>
+            <tr>
+                <th>{translations['import_line_col']}</th>
+                <th>{translations['alias_source_col']}</th>
+                <th>{translations['import_error_col']}</th>
+            </tr>
+        </thead>
+        <tbody>
+        {rows}
+        </tbody>
+    </table>
+    """
+    content = f"""
+    <p><strong>{translations[f'alias_bulk_summary_{operation}'].format(done=bulk.done, errors=len(bulk.errors))}</strong></p>
+    {errors_html}
+    <p><a href="/aliases/bulk">{translations['alias_bulk_title']}</a> | <a href="/home">&larr;</a></p>
+    """
+    return html_template(translations['alias_bulk_title'], content, admin_user_email=admin_user_email, admin_role=admin_role)
+
+def bulk_aliases_handler(environ, start_response):
+    """
+    GET /aliases/bulk: the form.
+    POST /aliases/bulk: operation=add (lines "source destination"),
+    delete (lines of aliases) or rewrite (old_destination -> new_destination),
+    then a report of the rejected lines.
+    """
+    session = environ.get('session', None)
+    if not session or not session.data.get('logged_in'):
+        start_response("302 Found", [("Location", "/login")])
+        return [b""]
+
+    admin_user_id = session.data['id']
+    admin_user_email = session.data.get('email', '')
+    admin_role = session.data.get('role', 'user')
+
+    if environ['REQUEST_METHOD'] == 'GET':
+        start_response("200 OK", [("Content-Type", "text/html")])
+        return [render_form(session, admin_user_email, admin_role).encode()]
+
+    elif environ['REQUEST_METHOD'] == 'POST':
+        content_length = int(environ.get('CONTENT_LENGTH') or 0)
+        if content_length > config['limits']['max_bulk_aliases'] * BYTES_PER_LINE:
+            start_response("413 Request Entity Too Large", [("Content-Type", "text/html")])
+            return [translations['alias_bulk_too_many'].format(max=config['limits']['max_bulk_aliases']).encode('utf-8')]
+
+        data = parse_qs(environ['wsgi.input'].read(content_length).decode('utf-8', 'replace'))
+        csrf_token = data.get('csrf_token', [''])[0]
+
+        if not session.validate_csrf_token(csrf_token):
+            start_response("403 Forbidden", [("Content-Type", "text/html")])
+            return [translations['csrf_invalid'].encode('utf-8')]
+
+        operation = data.get('operation', [''])[0]
+        if operation not in OPERATIONS:
+            start_response("400 Bad Request", [("Content-Type", "text/html")])
+            return [b"Bad request"]
+
+        lines = data.get('lines', [''])[0]
+        old_destination = data.get('old_destination', [''])[0]
+        new_destination = data.get('new_destination', [''])[0]
+        bulk = BulkAliases(admin_user_id, admin_role)
+
+        try:
+            if operation == 'rewrite':
+                bulk.rewrite(old_destination, new_destination)
+            else:
+                getattr(bulk, operation)(lines)
+        except ValueError as e:
+            start_response("400 Bad Request", [("Content-Type", "text/html")])
+            return [str(e).encode('utf-8')]
+        except Exception as e:
+            logging.error(f"Error in bulk alias {operation}: {e}")
+            start_response("500 Internal Server Error", [("Content-Type", "text/html")])
+            return [translations['alias_bulk_failed'].encode('utf-8')]
+
+        logging.info(f"Bulk alias {operation} by {admin_user_email}: {bulk.done} done, {len(bulk.errors)} rejected")
+
+        start_response("200 OK", [("Content-Type", "text/html"), ("Cache-Control", "no-store")])
+        return [render_report(bulk, operation, admin_user_email, admin_role).encode()]
+
+    start_response("405 Method Not Allowed", [("Content-Type", "text/html")])
+    return [translations['method_not_allowed'].encode('utf-8')]
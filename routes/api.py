@@ -0,0 +1,337 @@
+# routes/api.py
+#
+# JSON API for provisioning scripts, version 1. Every request carries
+# "Authorization: Bearer <key>" (python3 -m scripts.api_keys create ...) and
+# acts as that key's admin: same role, same ownerships, same limits as the
+# web pages. No session, no CSRF token.
+#
+#   GET    /api/v1/domains                    ?cursor=&limit=
+#   GET    /api/v1/mailboxes                  ?domain=&cursor=&limit=
+#   POST   /api/v1/mailboxes                  {"email", "password", "quota"}
+#   POST   /api/v1/mailboxes/batch            {"items": [...], "owner": "admin@..."}
+#   GET    /api/v1/aliases                    ?domain=&cursor=&limit=
+#   POST   /api/v1/aliases                    {"source", "destination"}
+#   DELETE /api/v1/aliases                    ?source=
+#   POST   /api/v1/aliases/batch              {"add": [{"source", "destination"}], "delete": ["source"]}
+#   GET    /api/v1/registrations              ?cursor=&limit=
+#   POST   /api/v1/registrations/batch        {"approve": [{"email", "allowed_domains"}], "deny": ["email"]}
+#   GET    /api/v1/changes                    ?cursor=|consumer=&limit=&wait=
+#   POST   /api/v1/changes/ack                {"consumer", "cursor"}
+#
+# Listings return {"items": [...], "next_cursor": id or null}. Batches are
+# checked and written in bulk (utils/mailbox_import.py, utils/alias_bulk.py)
+# and return what was done plus {"index", "value", "error"} per rejected item.
+#
+# The change feed (super_admin keys only) reads after ?cursor=, or after the
+# cursor acknowledged by ?consumer=, and always returns a next_cursor: the
+# last id read, or the same cursor when nothing changed. With ?wait=N it
+# long-polls, answering as soon as a change is logged or after N seconds.
+
+from libs import config, translations, fetch_all, parse_qs
+from utils.api_keys import authenticate
+from utils.changes import wait_for_changes, changes_since, acknowledge, cursor_of
+from utils.alias_bulk import BulkAliases
+from utils.export import export_query
+from utils.mailbox_import import MailboxImport
+from utils.moderation import approve_registrations, deny_registrations, send_approval_emails, domain_ids
+import json
+import logging
+
+API_PREFIX = '/api/v1'
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+def api_endpoint(*methods):
+    """
+    Wrap fn(environ, admin) -> (status, payload) into a WSGI handler:
+    method check, key authentication, JSON encoding of the payload or error.
+    """
+    def decorator(fn):
+        def handler(environ, start_response):
+            try:
+                if environ['REQUEST_METHOD'] not in methods:
+                    raise ApiError("405 Method Not Allowed", translations['method_not_allowed'])
+
+                admin = authenticate(environ)
+                if admin is None:
+                    raise ApiError("401 Unauthorized", "Missing or invalid API key")
+
+                status, payload = fn(environ, admin)
+
+            except ApiError as e:
+                status, payload = e.status, {'error': e.message}
+
+            except Exception as e:
+                logging.error(f"API error on {environ.get('PATH_INFO')}: {e}", exc_info=True)
+                status, payload = "500 Internal Server Error", {'error': "Internal server error"}
+
+            body = json.dumps(payload, default=str, ensure_ascii=False).encode('utf-8')
+            start_response(status, [
+                ("Content-Type", "application/json; charset=utf-8"),
+                ("Cache-Control", "no-store"),
+            ])
+            return [body]
+
+        return handler
+    return decorator
+
+# --- Request helpers ---
+def read_json(environ):
+    content_length = int(environ.get('CONTENT_LENGTH') or 0)
+    if content_length > config['api']['max_body_bytes']:
+        raise ApiError("413 Request Entity Too Large", "Request body too large")
+
+    try:
+        data = json.loads(environ['wsgi.input'].read(content_length) or b'{}')
+    except ValueError:
+        raise ApiError("400 Bad Request", "Invalid JSON body")
+
+    if not isinstance(data, dict):
+        raise ApiError("400 Bad Request", "The JSON body must be an object")
+    return data
+
+def json_list(data, key):
+    items = data.get(key, [])
+    if not isinstance(items, list):
+        raise ApiError("400 Bad Request", f'"{key}" must be an array')
+    if len(items) > config['api']['max_batch']:
+        raise ApiError("413 Request Entity Too Large", f"At most {config['api']['max_batch']} items per batch")
+    return items
+
+def query_params(environ):
+    return parse_qs(environ.get('QUERY_STRING', ''))
+
+def int_param(params, name, default=None):
+    value = params.get(name, [''])[0]
+    if not value:
+        return default
+    if not value.isdigit():
+        raise ApiError("400 Bad Request", f'"{name}" must be a positive integer')
+    return int(value)
+
+def owner_filter(admin):
+    return None if admin['role'] == 'super_admin' else admin['id']
+
+def line_errors(errors, value_key='value'):
+    return [{'index': e.line, 'value': getattr(e, value_key), 'error': e.message} for e in errors]
+
+def single_result(errors, status, payload):
+    """Outcome of a one-item write done through the batch code"""
+    if errors:
+        raise ApiError("422 Unprocessable Entity", errors[0].message)
+    return status, payload
+
+# --- Listings ---
+def fetch_page(query, params, args):
+    """
+    One page of a keyset-paginated query (params end with cursor, limit):
+    ?cursor= is the last ID of the previous page, ?limit= the page size.
+    """
+    api_conf = config['api']
+    cursor = int_param(args, 'cursor', 0)
+    limit = min(int_param(args, 'limit') or api_conf['page_size'], api_conf['max_page_size'])
+
+    # One extra row tells whether there is a next page
+    rows = fetch_all(query, tuple(params) + (cursor, limit + 1))
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = rows[-1]['id']
+
+    return "200 OK", {'items': rows, 'next_cursor': next_cursor}
+
+def list_page(environ, admin, kind):
+    """Domains, mailboxes or aliases the admin owns (everything for super_admin)"""
+    args = query_params(environ)
+    domain_id = int_param(args, 'domain') if kind != 'domains' else None
+    query, params = export_query(kind, owner_filter(admin), domain_id, prefix='api')
+    return fetch_page(query, params, args)
+
+@api_endpoint('GET')
+def domains_handler(environ, admin):
+    return list_page(environ, admin, 'domains')
+
+# --- Mailboxes ---
+def mailbox_import_for(admin, data):
+    """MailboxImport owned by the key's admin, or by "owner" for a super_admin"""
+    owner_id, owner_role = admin['id'], admin['role']
+    owner_email = data.get('owner')
+
+    if owner_email:
+        if admin['role'] != 'super_admin':
+            raise ApiError("403 Forbidden", translations['forbidden_access'])
+        owner = fetch_all(config['sql']['select_admin_user_by_email'], (owner_email,))
+        if not owner:
+            raise ApiError("422 Unprocessable Entity", translations['import_unknown_owner'])
+        owner_id, owner_role = owner[0]['id'], owner[0]['role']
+
+    return MailboxImport(owner_id, owner_role)
+
+def mailbox_fields(item):
+    if not isinstance(item, dict):
+        return ['']
+    quota = item.get('quota', '')
+    return [str(item.get('email', '')), str(item.get('password', '')), str(quota) if quota != '' else '']
+
+def create_mailboxes(importer, items):
+    importer.load_rows((index, mailbox_fields(item)) for index, item in enumerate(items))
+    for _ in importer.run():
+        pass
+    return importer
+
+@api_endpoint('GET', 'POST')
+def mailboxes_handler(environ, admin):
+    if environ['REQUEST_METHOD'] == 'GET':
+        return list_page(environ, admin, 'mailboxes')
+
+    data = read_json(environ)
+    importer = create_mailboxes(mailbox_import_for(admin, data), [data])
+    return single_result(importer.errors, "201 Created", {'email': importer.created[0] if importer.created else None})
+
+@api_endpoint('POST')
+def mailboxes_batch_handler(environ, admin):
+    data = read_json(environ)
+    importer = create_mailboxes(mailbox_import_for(admin, data), json_list(data, 'items'))
+    logging.info(f"API mailbox batch by {admin['email']}: {len(importer.created)} created, {len(importer.errors)} rejected")
+    return "200 OK", {'created': importer.created, 'errors': line_errors(importer.errors, 'email')}
+
+# --- Aliases ---
+def alias_pairs(items):
+    return [
+        (index, str(item.get('source', '')), str(item.get('destination', '')))
+        if isinstance(item, dict) else (index, '', '')
+        for index, item in enumerate(items)
+    ]
+
+@api_endpoint('GET', 'POST', 'DELETE')
+def aliases_handler(environ, admin):
+    method = environ['REQUEST_METHOD']
+
+    if method == 'GET':
+        return list_page(environ, admin, 'aliases')
+
+    bulk = BulkAliases(admin['id'], admin['role'])
+
+    if method == 'DELETE':
+        source = query_params(environ).get('source', [''])[0]
+        bulk.delete_sources([(0, source)])
+        return single_result(bulk.errors, "200 OK", {'deleted': bulk.done})
+
+    data = read_json(environ)
+    bulk.add_pairs(alias_pairs([data]))
+    return single_result(bulk.errors, "201 Created", {'added': bulk.done})
+
+@api_endpoint('POST')
+def aliases_batch_handler(environ, admin):
+    data = read_json(environ)
+    to_add = alias_pairs(json_list(data, 'add'))
+    to_delete = [(index, str(source)) for index, source in enumerate(json_list(data, 'delete'))]
+
+    try:
+        deletion = BulkAliases(admin['id'], admin['role']).delete_sources(to_delete)
+        addition = BulkAliases(admin['id'], admin['role']).add_pairs(to_add)
+    except ValueError as e:
+        raise ApiError("413 Request Entity Too Large", str(e))
+
+    logging.info(f"API alias batch by {admin['email']}: {deletion.done} deleted, {addition.done} added")
+    return "200 OK", {
+        'deleted': deletion.done,
+        'added': addition.done,
+        'errors': {'delete': line_errors(deletion.errors), 'add': line_errors(addition.errors)},
+    }
+
+# --- Moderation ---
+def require_moderator(admin):
+    if admin['role'] not in ('admin', 'super_admin'):
+        raise ApiError("403 Forbidden", translations['forbidden_access'])
+
+@api_endpoint('GET')
+def registrations_handler(environ, admin):
+    require_moderator(admin)
+    return fetch_page(config['sql']['select_pending_registrations_page'], (), query_params(environ))
+
+@api_endpoint('POST')
+def registrations_batch_handler(environ, admin):
+    require_moderator(admin)
+    data = read_json(environ)
+    errors = []
+
+    # Registrations sharing the same allowed domains are approved together
+    groups = {}
+    for index, item in enumerate(json_list(data, 'approve')):
+        email = str(item.get('email', '')).strip() if isinstance(item, dict) else ''
+        allowed_domains = item.get('allowed_domains', []) if isinstance(item, dict) else []
+        domains = tuple(domain_ids(allowed_domains if isinstance(allowed_domains, list) else []))
+        groups.setdefault(domains, []).append((index, email))
+
+    approved, indexes = [], {}
+    for domains, items in groups.items():
+        done, failed = approve_registrations([email for _, email in items], domains, admin['id'], admin['role'])
+        approved += done
+        indexes.update((email, index) for index, email in items if email in done)
+        errors += [
+            {'index': index, 'value': email, 'error': translations[failed.get(email, 'user_not_found')]}
+            for index, email in items
+            if email not in done
+        ]
+
+    # One SMTP connection for every approval mail
+    unsent = set(send_approval_emails(approved))
+    errors += [{'index': indexes[email], 'value': email, 'error': translations['email_sent_failed']} for email in approved if email in unsent]
+
+    denied = deny_registrations(str(email) for email in json_list(data, 'deny'))
+
+    logging.info(f"API moderation by {admin['email']}: {len(approved)} approved, {len(denied)} denied")
+    return "200 OK", {'approved': approved, 'denied': denied, 'errors': errors}
+
+# --- Change feed ---
+def require_super_admin(admin):
+    if admin['role'] != 'super_admin':
+        raise ApiError("403 Forbidden", translations['forbidden_access'])
+
+@api_endpoint('GET')
+def changes_handler(environ, admin):
+    require_super_admin(admin)
+    args = query_params(environ)
+    cursor = int_param(args, 'cursor')
+    if cursor is None:
+        consumer = args.get('consumer', [''])[0]
+        cursor = cursor_of(consumer) if consumer else 0
+    limit = min(int_param(args, 'limit') or config['changes']['page_size'], config['changes']['page_size'])
+    wait = int_param(args, 'wait', 0)
+
+    items = wait_for_changes(cursor, wait, limit) if wait else changes_since(cursor, limit)
+    return "200 OK", {'items': items, 'next_cursor': items[-1]['id'] if items else cursor}
+
+@api_endpoint('POST')
+def changes_ack_handler(environ, admin):
+    require_super_admin(admin)
+    data = read_json(environ)
+    consumer = str(data.get('consumer', '')).strip()
+    cursor = data.get('cursor')
+
+    if not consumer or len(consumer) > 64:
+        raise ApiError("400 Bad Request", '"consumer" must be a name of 1 to 64 characters')
+    if not isinstance(cursor, int) or isinstance(cursor, bool) or cursor < 0:
+        raise ApiError("400 Bad Request", '"cursor" must be a positive integer')
+
+    acknowledge(consumer, cursor)
+    return "200 OK", {'consumer': consumer, 'cursor': cursor}
+
+# Path -> handler, merged into app.ROUTES
+API_ROUTES = {
+    f'{API_PREFIX}/domains': domains_handler,
+    f'{API_PREFIX}/mailboxes': mailboxes_handler,
+    f'{API_PREFIX}/mailboxes/batch': mailboxes_batch_handler,
+    f'{API_PREFIX}/aliases': aliases_handler,
+    f'{API_PREFIX}/aliases/batch': aliases_batch_handler,
+    f'{API_PREFIX}/registrations': registrations_handler,
+    f'{API_PREFIX}/registrations/batch': registrations_batch_handler,
+    f'{API_PREFIX}/changes': changes_handler,
+    f'{API_PREFIX}/changes/ack': changes_ack_handler,
+}
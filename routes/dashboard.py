@@ -1,12 +1,25 @@
 # routes/dashboard.py
 
-from libs import config, fetch_all, parse_qs
-from handlers.html import html_template
-from i18n.en_US import translations
+from libs import config, fetch_all, parse_qs, translations
+from utils.db import iter_rows
+from handlers.html import html_template, html_stream
 from utils.limits import can_create_mailbox
-from utils.alias_limits import can_create_alias, get_alias_count
+from utils.alias_limits import can_create_alias
+from utils.ownership import get_owned_user_ids, get_owned_domain_ids, is_owner
+from utils.reference_data import all_domains, domain_name as cached_domain_name
+from utils.versions import GLOBAL_SCOPE, domain_scope, admin_scope, compute_etag, not_modified, cache_headers
 import logging
 
+def page_etag(environ, scopes, session):
+    """ETag for a dashboard page: change tokens plus everything else rendered in it"""
+    limits = config.get('limits', {})
+    return compute_etag(
+        scopes,
+        session.data.get('id'), session.data.get('role'), session.data.get('email'),
+        translations.language, environ.get('QUERY_STRING', ''),
+        limits.get('max_mailboxes_per_user'), limits.get('max_aliases_per_mailbox'),
+    )
+
 def home_handler(environ, start_response):
     """Main dashboard - displays list of domains"""
     session = environ.get('session', None)
@@ -17,19 +30,24 @@ def home_handler(environ, start_response):
     admin_user_id = session.data['id']
     admin_role = session.data.get('role', 'user')
     admin_user_email = session.data.get('email', '')
+    
+    # Conditional GET: answer 304 before running the listing queries
+    scopes = [GLOBAL_SCOPE] if admin_role == 'super_admin' else [admin_scope(admin_user_id)]
+    etag = page_etag(environ, scopes, session)
+    cached = not_modified(environ, start_response, etag)
+    
+    if cached is not None:
+        return cached
         
     # Get domains
     try:
         if admin_role == 'super_admin':
             # Get all domains for superadmin
-            domains = fetch_all(config['sql_dovecot']['select_all_domains'], ())
+            domains = all_domains()
             
         else:
             # Get allowed domains only for users/admins
-            allowed_domain_rows = fetch_all(config['sql']['select_domains_by_admin_user'], (admin_user_id,))
-            allowed_domain_ids = [row['domain_id'] for row in allowed_domain_rows] if allowed_domain_rows else []
-            
-            if not allowed_domain_ids:
+            if not get_owned_domain_ids(admin_user_id):
                 domains = []
             
             else:
@@ -40,7 +58,7 @@ def home_handler(environ, start_response):
         domains = []
     
     # Build domain list with mailbox counts
-    domain_rows = ""
+    domain_rows = []
     
     for domain in domains:
         domain_id = domain['id']
@@ -56,8 +74,7 @@ def home_handler(environ, start_response):
             
             else:
                 # Regular users see only their owned mailboxes
-                owned_ids_result = fetch_all(config['sql']['select_user_ids_by_owner'], (admin_user_id,))
-                owned_ids = [row['user_id'] for row in owned_ids_result] if owned_ids_result else []
+                owned_ids = get_owned_user_ids(admin_user_id)
                 
                 if owned_ids:
                     users_in_domain = fetch_all(
@@ -74,12 +91,12 @@ def home_handler(environ, start_response):
             logging.error(f"Error counting mailboxes for domain {domain_name}: {e}")
             mailbox_count = 0
         
-        domain_rows += f"""
+        domain_rows.append(f"""
         <tr>
             <td><a href="/domain?id={domain_id}">{domain_name}</a></td>
             <td>{mailbox_count}</td>
         </tr>
-        """
+        """)
     
     # Mailbox counter (only for non-super_admin)
     if admin_role != 'super_admin':
@@ -101,11 +118,22 @@ def home_handler(environ, start_response):
         counter_html = ""
         create_btn = ""
     
+    export_links = f"""
+    <p>
+        {translations['export_label']}
+        <a href="/export?kind=mailboxes&amp;format=csv">{translations['export_mailboxes_csv']}</a> |
+        <a href="/export?kind=aliases&amp;format=csv">{translations['export_aliases_csv']}</a> |
+        <a href="/export?kind=domains,mailboxes,aliases&amp;format=jsonl">{translations['export_all_jsonl']}</a>
+    </p>
+    <p><a href="/aliases/bulk">{translations['alias_bulk_link']}</a></p>
+    """
+    
     content = f"""
     <h2>{translations['domains_list_title']}</h2>
     
     {counter_html}
     {create_btn}
+    {export_links}
     
     <table>
         <thead>
@@ -115,14 +143,14 @@ def home_handler(environ, start_response):
             </tr>
         </thead>
         <tbody>
-            {domain_rows if domain_rows else f'<tr><td colspan="2">{translations["no_domains"]}</td></tr>'}
+            {"".join(domain_rows) if domain_rows else f'<tr><td colspan="2">{translations["no_domains"]}</td></tr>'}
         </tbody>
     </table>
     
     """
     
     body = html_template(translations['dashboard_title'], content, admin_user_email=admin_user_email, admin_role=admin_role)
-    start_response("200 OK", [("Content-Type", "text/html")])
+    start_response("200 OK", [("Content-Type", "text/html")] + cache_headers(etag))
     return [body.encode()]
 
 
@@ -147,85 +175,91 @@ def domain_handler(environ, start_response):
     admin_role = session.data.get('role', 'user')
     admin_user_email = session.data.get('email', '')
     
+    # Conditional GET: answer 304 before running the listing queries
+    scopes = [domain_scope(int(domain_id))]
+    
+    if admin_role != 'super_admin':
+        scopes.append(admin_scope(admin_user_id))
+    
+    etag = page_etag(environ, scopes, session)
+    cached = not_modified(environ, start_response, etag)
+    
+    if cached is not None:
+        return cached
+    
     # Get domain info
     try:
-        domain = fetch_all(config['sql_dovecot']['select_domain_by_id'], (int(domain_id),))
+        domain_name = cached_domain_name(domain_id)
     
-        if not domain:
+        if domain_name is None:
             start_response("404 Not Found", [("Content-Type", "text/html")])
             return [b"Domain not found"]
     
-        domain_name = domain[0]['domain']
-    
     except Exception as e:
         logging.error(f"Error fetching domain: {e}")
         start_response("500 Internal Server Error", [("Content-Type", "text/html")])
         return [b"Error loading domain"]
     
-    # Get mailboxes in this domain
-    try:
-        
-        if admin_role == 'super_admin':
-            # Super admin sees all mailboxes
-            users_data = fetch_all(
-                config['sql_dovecot']['select_users_by_domain'], 
-                (int(domain_id),)
-            )
-        
-        else:
-            # Regular users see only their owned mailboxes
-            owned_ids_result = fetch_all(config['sql']['select_user_ids_by_owner'], (admin_user_id,))
-            owned_ids = [row['user_id'] for row in owned_ids_result] if owned_ids_result else []
-            
-            if owned_ids:
-                users_in_domain = fetch_all(
-                    config['sql_dovecot']['select_users_by_domain'], 
-                    (int(domain_id),)
-                )
-                users_data = [u for u in users_in_domain if u['id'] in owned_ids]
-            
-            else:
-                users_data = []
-                
-    except Exception as e:
-        logging.error(f"Error fetching mailboxes: {e}")
-        users_data = []
-    
-    # Build mailbox rows
-    rows = ""
+    # Ownership filter (None for super_admin, who sees all mailboxes)
+    if admin_role == 'super_admin':
+        owned_ids = None
     
-    for user in users_data:
-        email = user['email']
-        user_id = user['id']
-        
-        # Get alias count for this mailbox
-        alias_count = get_alias_count(email)
+    else:
+        try:
+            owned_ids = get_owned_user_ids(admin_user_id)
         
-        # Actions column (only for non-super_admin)
-        if admin_role == 'super_admin':
-            actions = f'<a href="/mailbox?id={user_id}">{translations["btn_view"]}</a>'
-    
-        else:
-            # Check if can add alias
-            can_add_alias, _, max_aliases = can_create_alias(email)
-            
-            if email in creation_emails or email in rekey_emails or email in deletion_emails:
-                actions = f"<em>{translations['pending']}</em>"
+        except Exception as e:
+            logging.error(f"Error fetching owned mailboxes: {e}")
+            owned_ids = set()
     
-            else:
-                actions = f'<a href="/mailbox?id={user_id}">{translations["btn_manage"]}</a>'
+    # Mailbox rows are rendered while the server-side cursor streams them, alias
+    # counts included: no other query (nor connection) while the stream is open
+    def render_rows():
+        found = False
         
-        rows += f"""
+        try:
+            if owned_ids is None or owned_ids:
+                for user in iter_rows(config['sql_dovecot']['select_users_with_alias_counts_by_domain'], (int(domain_id),)):
+                    
+                    if owned_ids is not None and user['id'] not in owned_ids:
+                        continue
+                    
+                    found = True
+                    email = user['email']
+                    user_id = user['id']
+                    alias_count = user['alias_count']
+                    
+                    if admin_role == 'super_admin':
+                        actions = f'<a href="/mailbox?id={user_id}">{translations["btn_view"]}</a>'
+                    
+                    else:
+                        actions = f'<a href="/mailbox?id={user_id}">{translations["btn_manage"]}</a>'
+                    
+                    yield f"""
         <tr>
             <td>{email}</td>
             <td>{alias_count}</td>
             <td>{actions}</td>
         </tr>
         """
+        
+        except Exception as e:
+            logging.error(f"Error fetching mailboxes: {e}")
+        
+        if not found:
+            yield f'<tr><td colspan="3">{translations["no_mailboxes"]}</td></tr>'
     
-    content = f"""
+    def render_content():
+        yield f"""
     <h2>{domain_name}</h2>
     
+    <p>
+        {translations['export_label']}
+        <a href="/export?kind=mailboxes&amp;format=csv&amp;domain={domain_id}">{translations['export_mailboxes_csv']}</a> |
+        <a href="/export?kind=aliases&amp;format=csv&amp;domain={domain_id}">{translations['export_aliases_csv']}</a> |
+        <a href="/export?kind=mailboxes,aliases&amp;format=jsonl&amp;domain={domain_id}">{translations['export_all_jsonl']}</a>
+    </p>
+    
     <table>
         <thead>
             <tr>
@@ -235,14 +269,15 @@ def domain_handler(environ, start_response):
             </tr>
         </thead>
         <tbody>
-            {rows if rows else f'<tr><td colspan="3">{translations["no_mailboxes"]}</td></tr>'}
+    """
+        yield from render_rows()
+        yield """
         </tbody>
     </table>
     """
     
-    body = html_template(translations['domain_mailboxes_title'].format(domain=domain_name), content, admin_user_email=admin_user_email, admin_role=admin_role)
-    start_response("200 OK", [("Content-Type", "text/html")])
-    return [body.encode()]
+    start_response("200 OK", [("Content-Type", "text/html")] + cache_headers(etag))
+    return html_stream(translations['domain_mailboxes_title'].format(domain=domain_name), render_content(), admin_user_email=admin_user_email, admin_role=admin_role)
 
 
 def mailbox_handler(environ, start_response):
@@ -270,9 +305,7 @@ def mailbox_handler(environ, start_response):
     if admin_role != 'super_admin':
         
         try:
-            is_owner = fetch_all(config['sql']['is_owner'], (admin_user_id, int(user_id)))
-            
-            if not is_owner:
+            if not is_owner(admin_user_id, int(user_id)):
                 start_response("403 Forbidden", [("Content-Type", "text/html")])
                 return [translations['ownership_required'].encode('utf-8')]
         
@@ -292,49 +325,57 @@ def mailbox_handler(environ, start_response):
         email = user[0]['email']
         domain_id = user[0]['domain_id']
         
+        # Conditional GET: answer 304 before running the alias queries
+        scopes = [domain_scope(domain_id)]
+        
+        if admin_role != 'super_admin':
+            scopes.append(admin_scope(admin_user_id))
+        
+        etag = page_etag(environ, scopes, session)
+        cached = not_modified(environ, start_response, etag)
+        
+        if cached is not None:
+            return cached
+        
         # Get domain name
-        domain = fetch_all(config['sql_dovecot']['select_domain_by_id'], (domain_id,))
-        domain_name = domain[0]['domain'] if domain else "Unknown"
+        domain_name = cached_domain_name(domain_id) or "Unknown"
         
     except Exception as e:
         logging.error(f"Error fetching mailbox: {e}")
         start_response("500 Internal Server Error", [("Content-Type", "text/html")])
         return [b"Error loading mailbox"]
     
-    # Get aliases for this mailbox
-    try:
-        aliases = fetch_all(
-            config['sql_dovecot']['select_alias_by_mailbox'], 
-            (domain_id, email)
-        )
-    
-    except Exception as e:
-        logging.error(f"Error fetching aliases: {e}")
-        aliases = []
-    
     # Get alias count and check limit
-    alias_count = len(aliases)
-    can_add_alias, _, max_aliases = can_create_alias(email)
-    
-    # Build alias rows
-    alias_rows = ""
+    can_add_alias, alias_count, max_aliases = can_create_alias(email)
     
-    for alias in aliases:
+    # Alias rows are rendered while the server-side cursor streams them
+    def render_alias_rows():
+        found = False
         
-        # Actions (only for non-super_admin)
-        if admin_role == 'super_admin':
-            actions = ""
-        
-        else:
-            actions = f'<a href="/editalias?id={alias["id"]}">{translations["btn_modify"]}</a>'
-        
-        alias_rows += f"""
+        try:
+            for alias in iter_rows(config['sql_dovecot']['select_alias_by_mailbox'], (domain_id, email)):
+                found = True
+                
+                # Actions (only for non-super_admin)
+                if admin_role == 'super_admin':
+                    actions = ""
+                
+                else:
+                    actions = f'<a href="/editalias?id={alias["id"]}">{translations["btn_modify"]}</a>'
+                
+                yield f"""
         <tr>
             <td>{alias['source']}</td>
             <td>{alias['destination']}</td>
             <td>{actions}</td>
         </tr>
         """
+        
+        except Exception as e:
+            logging.error(f"Error fetching aliases: {e}")
+        
+        if not found:
+            yield f'<tr><td colspan="{"3" if admin_role != "super_admin" else "2"}">{translations["no_aliases"]}</td></tr>'
     
     # Add alias button (only for non-super_admin)
     if admin_role != 'super_admin':
@@ -361,7 +402,8 @@ def mailbox_handler(environ, start_response):
     else:
         actions_section = ""
     
-    content = f"""
+    def render_content():
+        yield f"""
     <h2>{translations['mailbox_details_title']}</h2>
     
     <p><a href="/domain?id={domain_id}">{translations['back_to_domain']}</a></p>
@@ -386,11 +428,12 @@ def mailbox_handler(environ, start_response):
             </tr>
         </thead>
         <tbody>
-            {alias_rows if alias_rows else f'<tr><td colspan="{"3" if admin_role != "super_admin" else "2"}">{translations["no_aliases"]}</td></tr>'}
+    """
+        yield from render_alias_rows()
+        yield """
         </tbody>
     </table>
     """
     
-    body = html_template(translations['mailbox_details_title'], content, admin_user_email=admin_user_email, admin_role=admin_role)
-    start_response("200 OK", [("Content-Type", "text/html")])
-    return [body.encode()]
+    start_response("200 OK", [("Content-Type", "text/html")] + cache_headers(etag))
+    return html_stream(translations['mailbox_details_title'], render_content(), admin_user_email=admin_user_email, admin_role=admin_role)
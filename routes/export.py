@@ -0,0 +1,55 @@
+# routes/export.py
+
+from libs import translations, parse_qs
+from utils.export import KINDS, FORMATS, export_chunks
+from datetime import date
+import logging
+
+def export_handler(environ, start_response):
+    """
+    GET /export?kind=mailboxes&format=csv[&domain=ID]
+    kind: domains, mailboxes, aliases, or a comma-separated list (jsonl only).
+    Without domain, everything the admin owns (everything for super_admin).
+    """
+    session = environ.get('session', None)
+    if not session or not session.data.get('logged_in'):
+        start_response("302 Found", [("Location", "/login")])
+        return [b""]
+
+    admin_user_id = session.data['id']
+    admin_role = session.data.get('role', 'user')
+
+    params = parse_qs(environ.get('QUERY_STRING', ''))
+    fmt = params.get('format', ['csv'])[0]
+    kinds = [k for k in params.get('kind', ['mailboxes'])[0].split(',') if k]
+    domain_id = params.get('domain', [''])[0]
+
+    if (fmt not in FORMATS or not kinds or any(k not in KINDS for k in kinds)
+            or (fmt == 'csv' and len(kinds) != 1)
+            or (domain_id and (not domain_id.isdigit() or 'domains' in kinds))):
+        start_response("400 Bad Request", [("Content-Type", "text/html")])
+        return [translations['export_invalid_request'].encode('utf-8')]
+
+    owner_filter = None if admin_role == 'super_admin' else admin_user_id
+    domain_filter = int(domain_id) if domain_id else None
+
+    filename = f"pymailadmin-{'-'.join(kinds)}-{domain_id or 'all'}-{date.today().isoformat()}.{fmt}"
+    chunks = export_chunks(kinds, fmt, admin_user_id=owner_filter, domain_id=domain_filter)
+
+    def stream():
+        # Past the headers an error can only cut the file short: log it
+        try:
+            yield from chunks
+        except Exception as e:
+            logging.error(f"Export {filename} for admin {admin_user_id} interrupted: {e}")
+        finally:
+            chunks.close()
+
+    logging.info(f"Export {filename} by admin {admin_user_id}")
+    start_response("200 OK", [
+        ("Content-Type", FORMATS[fmt]),
+        ("Content-Disposition", f'attachment; filename="{filename}"'),
+        ("Cache-Control", "no-store"),
+        ("X-Accel-Buffering", "no"),
+    ])
+    return stream()
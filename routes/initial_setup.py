@@ -2,6 +2,7 @@ from passlib.hash import argon2
 from utils.db import fetch_all, execute_query
 from handlers.html import html_template
 from libs import parse_qs, config
+from utils.reference_data import invalidate_admins
 import importlib
 import logging
 import os
@@ -145,11 +146,10 @@ def generate_cron_script(data):
 
 def _preserve_all_data(data):
     excluded = ['csrf_token', 'step']
-    hidden_fields = ""
-    for key, value in data.items():
-        if key not in excluded:
-            hidden_fields += f'<input type="hidden" name="{key}" value="{value}">\n'
-    return hidden_fields
+    return "".join(
+        f'<input type="hidden" name="{key}" value="{value}">\n'
+        for key, value in data.items() if key not in excluded
+    )
 
 def config_wizard_page(session, step=1, error_msg=None, data=None, locale='en-US'):
     token = session.get_csrf_token()
@@ -329,7 +329,7 @@ def config_wizard_page(session, step=1, error_msg=None, data=None, locale='en-US
         cron_script = generate_cron_script(data)
         content = f"""
         <h2>{trans.get('cron_script_title','pymailadmin connector cron script for Dovecot')}</h2>
-        <p>{trans.get('cron_script_instructions','You may now connect <strong>to your Dovecot mail server</strong>, then:<br><ul><li>make sure you have python3 and python3-mysqldb installed</li><li>Copy this script somewhere on your Dovecot server, e.g. /opt/pymailadmin/scripts/pymailadmin-cron.py</li><li>Then create a crontab task as follows:<br><pre>*/2 * * * * root /usr/bin/python3 /opt/pymailadmin/scripts/pymailadmin-cron.py</pre></li></ul>')}</p>
+        <p>{trans.get('cron_script_instructions','You may now connect <strong>to your Dovecot mail server</strong>, then:<br><ul><li>make sure you have python3 and python3-mysqldb installed</li><li>Copy this script somewhere on your Dovecot server, e.g. /opt/pymailadmin/scripts/pymailadmin-cron.py</li><li>Then create a crontab task as follows:<br><pre>*/2 * * * * root /usr/bin/python3 /opt/pymailadmin/scripts/pymailadmin-cron.py</pre></li><li>Or, to apply changes within seconds, run it as a service with <code>--follow</code> instead of cron</li></ul>')}</p>
         <textarea id="cron_script" readonly style="width: 100%; height: 600px; font-family: monospace; white-space: pre-wrap;">{cron_script}</textarea>
         <button onclick="copyCronScript()" style="margin-top:10px; padding: 10px 20px;">{trans.get('btn_copy_clipboard','Copy to Clipboard')}</button>
         <p>{trans.get('cron_script_footer','Installation complete!')}</p>
@@ -417,6 +417,7 @@ def config_wizard_handler(environ, start_response):
                 ).hash(password)
                 execute_query(config['sql']['insert_admin_user'], (email, password_hash))
                 execute_query(config['sql']['update_admin_role_and_activate'], ('super_admin', email))
+                invalidate_admins()
                 
                 user = fetch_all(config['sql']['select_admin_user_by_email'], (email,))
                 if user:
@@ -0,0 +1,23 @@
+# routes/language.py
+
+from urllib.parse import urlsplit
+from libs import parse_qs
+from i18n import match_language
+
+def language_handler(environ, start_response):
+    """/language?lang=fr_FR: remember the language in the session, back to the previous page"""
+    session = environ.get('session')
+    params = parse_qs(environ.get('QUERY_STRING', ''))
+    lang_code = match_language(params.get('lang', [''])[0])
+
+    if session is not None and lang_code:
+        session.data['language'] = lang_code
+
+    # Only the path of the referring page: never redirect off-site
+    referer = urlsplit(environ.get('HTTP_REFERER', ''))
+    location = referer.path if referer.path.startswith('/') and not referer.path.startswith('//') else '/login'
+    if referer.query and location != '/login':
+        location = f"{location}?{referer.query}"
+
+    start_response("302 Found", [("Location", location)])
+    return [b""]
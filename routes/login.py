@@ -1,13 +1,25 @@
 # routes/login.py
+#
+# POST /login runs the cheap checks first (body size, CSRF token, email
+# syntax) so that malformed requests cost no query and no hash. Then one
+# query reads the user and the client's rate limit row together, and the
+# attempt is counted before its hash is verified. Unknown emails are
+# verified against a dummy hash: a miss costs the same argon2 work as a
+# wrong password and does not tell whether the account exists.
 
-from passlib.hash import argon2
-from utils.security import get_client_ip, check_rate_limit
-from utils.db import fetch_all, execute_query
+from utils.security import get_client_ip, login_state, blocked_for, reserve_login_attempt, verify_admin_password, dummy_admin_hash
+from utils.db import execute_query
 from handlers.html import html_template
-from libs import translations, parse_qs, config
+from libs import translations, parse_qs, config, datetime
 from utils.check_super_admin_exists import check_super_admin_exists
 import logging
 
+# A login form is a few hundred bytes
+MAX_LOGIN_BODY = 4096
+
+# Longer passwords are refused before hashing
+MAX_PASSWORD_LENGTH = 1024
+
 def reset_rate_limit(key):
     
     try:
@@ -51,71 +63,74 @@ def login_handler(environ, start_response):
         start_response("302 Found", [("Location", "/home")])
         return [b""]
     
-    session.save()
-
+    # The session (and its CSRF token) is saved when the response starts
     if environ['REQUEST_METHOD'] == 'GET':
-        session.get_csrf_token()
         start_response("200 OK", [("Content-Type", "text/html")])
         return [login_page(session).encode()]
 
-    elif environ['REQUEST_METHOD'] == 'POST':
-        content_length = int(environ.get('CONTENT_LENGTH', 0))
-        post_data = environ['wsgi.input'].read(content_length).decode('utf-8')
-        data = parse_qs(post_data)
-        csrf_token = data.get('csrf_token', [''])[0]
-        
-        if not session.validate_csrf_token(csrf_token):
-            start_response("403 Forbidden", [("Content-Type", "text/html")])
-            return [b"Invalid CSRF token"]
-        
-        email = data.get('email', [''])[0].strip()
-        password = data.get('password', [''])[0]
-        
-        # Rate limiting
-        if not session.data.get('logged_in'):
-            ip = get_client_ip(environ)
-            rl_config = config['security']['rate_limit']['login']
-            success, _, retry_after = check_rate_limit(
-                f"ip:{ip}",
-                rl_config['max_attempts'],
-                rl_config['window_minutes'],
-                rl_config['block_minutes']
-            )
-            
-            if not success:
-                start_response("429 Too Many Requests", [
-                    ("Content-Type", "text/html"),
-                    ("Retry-After", str(retry_after))
-                ])
-                return [translations['too_many_attempts'].encode('utf-8')]
-
-        # CSRF validation
-        if not session.validate_csrf_token(csrf_token):
-            start_response("403 Forbidden", [("Content-Type", "text/html")])
-            return [translations['csrf_invalid'].encode('utf-8')]
-
-        # Email validation
-        if not email or '@' not in email or '.' not in email:
-            start_response("400 Bad Request", [("Content-Type", "text/html")])
-            return [login_page(session, translations['invalid_email']).encode()]
+    if environ['REQUEST_METHOD'] != 'POST':
+        start_response("405 Method Not Allowed", [("Content-Type", "text/html")])
+        return [translations['method_not_allowed'].encode('utf-8')]
 
-        # Authenticate user
-        user = fetch_all(config['sql']['select_admin_user_by_email'], (email,))
-        
-        if user and argon2.verify(password, user[0]['password_hash']):
-            
-            # Reset rate limit after successful login
-            ip = get_client_ip(environ)
-            reset_rate_limit(f"ip:{ip}")
-            
-            session.data['logged_in'] = True
-            session.data['email'] = email
-            session.data['role'] = user[0]['role']
-            session.data['id'] = user[0]['id']
-            
-            start_response("302 Found", [("Location", "/home")])
-            return [b""]
-        
-        else:
-            start_response("401 Unauthorized", [("Content-Type", "text/html")])
-            return [login_page(session, translations['invalid_credentials']).encode()]
+    content_length = int(environ.get('CONTENT_LENGTH') or 0)
+    
+    if content_length > MAX_LOGIN_BODY:
+        start_response("413 Request Entity Too Large", [("Content-Type", "text/html")])
+        return [b"Request body too large"]
+    
+    post_data = environ['wsgi.input'].read(content_length).decode('utf-8', errors='replace')
+    data = parse_qs(post_data)
+    
+    # CSRF validation
+    if not session.validate_csrf_token(data.get('csrf_token', [''])[0]):
+        start_response("403 Forbidden", [("Content-Type", "text/html")])
+        return [translations['csrf_invalid'].encode('utf-8')]
+    
+    email = data.get('email', [''])[0].strip()
+    password = data.get('password', [''])[0]
+    
+    # Email validation
+    if not email or '@' not in email or '.' not in email:
+        start_response("400 Bad Request", [("Content-Type", "text/html")])
+        return [login_page(session, translations['invalid_email']).encode()]
+    
+    if not password or len(password) > MAX_PASSWORD_LENGTH:
+        start_response("401 Unauthorized", [("Content-Type", "text/html")])
+        return [login_page(session, translations['invalid_credentials']).encode()]
+    
+    # User and rate limit state, in one query
+    key = f"ip:{get_client_ip(environ)}"
+    rl_config = config['security']['rate_limit']['login']
+    now = datetime.now()
+    state = login_state(email, key)
+    
+    # Counted before the hash: concurrent guesses can't all pass as "not blocked"
+    retry_after = blocked_for(state, now) or reserve_login_attempt(key, state, rl_config['max_attempts'], rl_config['window_minutes'], rl_config['block_minutes'], now)
+    if retry_after:
+        start_response("429 Too Many Requests", [
+            ("Content-Type", "text/html"),
+            ("Retry-After", str(retry_after))
+        ])
+        return [translations['too_many_attempts'].encode('utf-8')]
+    
+    # Authenticate user, unknown ones against the dummy hash
+    if state['id'] is not None:
+        authenticated = verify_admin_password(password, state['password_hash'])
+    else:
+        verify_admin_password(password, dummy_admin_hash())
+        authenticated = False
+    
+    if not authenticated:
+        start_response("401 Unauthorized", [("Content-Type", "text/html")])
+        return [login_page(session, translations['invalid_credentials']).encode()]
+    
+    # The attempt was counted: reset the rate limit after a successful login
+    reset_rate_limit(key)
+    
+    session.data['logged_in'] = True
+    session.data['email'] = email
+    session.data['role'] = state['role']
+    session.data['id'] = state['id']
+    
+    start_response("302 Found", [("Location", "/home")])
+    return [b""]
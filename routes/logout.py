@@ -1,7 +1,11 @@
 def logout_handler(environ, start_response):
     session = environ.get('session')
     if session:
+        # Keep the language chosen with /language
+        language = session.data.get('language')
         session.data.clear()
+        if language:
+            session.data['language'] = language
         session.save()
     start_response("302 Found", [("Location", "/login")])
     return [b""]
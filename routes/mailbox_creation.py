@@ -1,10 +1,14 @@
 # routes/mailbox_creation.py
 
-from libs import config, parse_qs, datetime, timedelta, translations, argon2, bcrypt, sha512_crypt, sha256_crypt, pbkdf2_sha256
-import base64, secrets
-import hashlib
-from utils.db import fetch_all, execute_query
+from libs import config, parse_qs, datetime, timedelta, translations
+from utils.db import fetch_all, transaction
+from utils.changes import record_change
+from utils.counters import seed_mailbox_counts, adjust_mailbox_counts
 from utils.limits import can_create_mailbox
+from utils.mailbox_hash import hash_mailbox_password
+from utils.ownership import get_owned_domain_ids, owns_domain, invalidate_ownership
+from utils.reference_data import all_domains, domain_name
+from utils.versions import bump_versions, domain_scope, admin_scope
 from utils.doveadm_api import doveadm_create_mailbox, doveadm_rekey_mailbox_generate
 from handlers.html import html_template
 import time
@@ -29,14 +33,11 @@ def create_mailbox_handler(environ, start_response):
         try:
             if admin_role == 'super_admin':
                 # Get all domains for superadmin
-                domains = fetch_all(config['sql_dovecot']['select_all_domains'], ())
+                domains = all_domains()
                 
             else:
                 # Get allowed domains only for users/admins
-                allowed_domain_rows = fetch_all(config['sql']['select_domains_by_admin_user'], (admin_user_id,))
-                allowed_domain_ids = [row['domain_id'] for row in allowed_domain_rows] if allowed_domain_rows else []
-                
-                if not allowed_domain_ids:
+                if not get_owned_domain_ids(admin_user_id):
                     domains = []
                 
                 else:
@@ -54,7 +55,7 @@ def create_mailbox_handler(environ, start_response):
             warning = f'<p style="color: red; font-weight: bold;">{translations["mailbox_limit_reached"]}</p>'
             form_disabled = 'disabled'
         else:
-            warning = f'<p>{translations["mailbox_count_display"].format(count=current_count)}</p>'
+            warning = f'<p>{translations["mailbox_count_display"].format(count=current_count, max=max_count)}</p>'
             form_disabled = ''
         
         # Generate form
@@ -188,13 +189,17 @@ def create_mailbox_handler(environ, start_response):
             start_response("400 Bad Request", [("Content-Type", "text/html")])
             return [translations['all_fields_required'].encode('utf-8')]
         
-        # Get domain ID
-        domain = fetch_all(config['sql_dovecot']['select_domain_by_id'], (domain_id,))
-        if not domain:
+        # Get domain ID, which must be one of the allowed domains
+        if admin_role != 'super_admin' and (not domain_id.isdigit() or not owns_domain(admin_user_id, domain_id)):
+            start_response("400 Bad Request", [("Content-Type", "text/html")])
+            return [translations['invalid_domain'].encode('utf-8')]
+        
+        domain = domain_name(domain_id) if domain_id.isdigit() else None
+        if domain is None:
             start_response("400 Bad Request", [("Content-Type", "text/html")])
             return [translations['invalid_domain'].encode('utf-8')]
         
-        email = f"{local_part}@{domain[0]['domain']}"
+        email = f"{local_part}@{domain}"
         
         # Check if email exists
         existing = fetch_all(config['sql_dovecot']['select_user_by_email'], (email,))
@@ -204,66 +209,22 @@ def create_mailbox_handler(environ, start_response):
         
         # Hash password
         try:
-            alg = config['mailbox_hash']['algorithm']
-            prefix = config['mailbox_hash']['prefix']
+            crypt_value = hash_mailbox_password(password, config['mailbox_hash'])
             
-            # Argon2 hashing
-            if alg in ['argon2id', 'argon2i']:
-                
-                if alg == 'argon2id':
-                    argon2_type = 'ID'
-                
-                if alg == 'argon2i':
-                    argon2_type = 'I'
-                
-                # Generate unique salt
-                salt_bytes = secrets.token_bytes(16)
-                
-                # Salted-hash the password
-                hash_obj = argon2.using(
-                    type=argon2_type,
-                    salt=salt_bytes,
-                    time_cost=config['mailbox_hash']['argon2_time_cost'],
-                    memory_cost=config['mailbox_hash']['argon2_memory_cost'],
-                    parallelism=config['mailbox_hash']['argon2_parallelism']
+            # Insert mailbox, its ownership and the owner's counter together
+            with transaction() as tx:
+                seed_mailbox_counts(tx, [admin_user_id])
+                user_id = tx.execute(
+                    config['sql_dovecot']['insert_user'], 
+                    (domain_id, email, crypt_value, quota, 1)  # active=1
                 )
-                hashed = hash_obj.hash(password)
-                
-                # Extract passlib hash ("$argon2id$v=...$...$salt$hash")
-                parts = hashed.split('$')
-                salt_part = parts[-2]
-                hash_part = parts[-1]
-                
-                # Dovecot-style format
-                crypt_value = f"{prefix}${salt_part}${hash_part}"
-            
-            # Other algos hashing
-            elif alg == 'bcrypt':
-                crypt_value = prefix + bcrypt.using(rounds=config['mailbox_hash']['bcrypt_rounds']).hash(password)
-            
-            elif alg == 'sha512-crypt':
-                crypt_value = prefix + sha512_crypt.hash(password)
-            
-            elif alg == 'sha256-crypt':
-                crypt_value = prefix + sha256_crypt.hash(password)
-            
-            elif alg == 'pbkdf2':
-                crypt_value = prefix + pbkdf2_sha256.using(rounds=config['mailbox_hash']['pbkdf2_rounds']).hash(password)
-            
-            else:
-                raise ValueError("Unsupported hash algorithm")
+                tx.execute(config['sql']['add_ownership'], (admin_user_id, user_id, 1))  # is_primary=1 (unimplemented)
+                adjust_mailbox_counts(tx, {admin_user_id: 1})
+                record_change(tx, 'mailbox', 'create', email)
             
-            # Insert mailbox
-            user_id = execute_query(
-                config['sql_dovecot']['insert_user'], 
-                (domain_id, email, crypt_value, quota, 1)  # active=1
-            )
+            invalidate_ownership(admin_user_id)
             
-            # Add ownership
-            execute_query(
-                config['sql']['add_ownership'],
-                (admin_user_id, user_id, 1)  # is_primary=1 (unimplemented)
-            )
+            bump_versions(domain_scope(domain_id), admin_scope(admin_user_id))
             
             # Trigger doveadm:
             try:
@@ -0,0 +1,143 @@
+# routes/mailbox_import.py
+
+from libs import config, translations
+from utils.db import fetch_all
+from utils.mailbox_import import MailboxImport
+from handlers.html import html_template, page_chunks
+from email.parser import BytesParser
+from email.policy import HTTP
+import html
+import logging
+
+def parse_multipart(environ, max_bytes):
+    """Fields of a multipart/form-data body as {name: bytes}, None if too large"""
+    content_length = int(environ.get('CONTENT_LENGTH') or 0)
+    if content_length > max_bytes:
+        return None
+
+    body = environ['wsgi.input'].read(content_length)
+    content_type = environ.get('CONTENT_TYPE', '')
+    message = BytesParser(policy=HTTP).parsebytes(f"Content-Type: {content_type}\r\n\r\n".encode('latin-1') + body)
+
+    fields = {}
+    if message.is_multipart():
+        for part in message.iter_parts():
+            name = part.get_param('name', header='content-disposition')
+            if name:
+                fields[name] = part.get_payload(decode=True) or b""
+    return fields
+
+def render_import(importer, admin_user_email, admin_role):
+    """Page streamed while the import runs: one progress line per batch, then the report"""
+    def render_content():
+        yield "<ul>\n"
+        for stage, done, total in importer.run():
+            yield f"<li>{translations[f'import_progress_{stage}'].format(done=done, total=total)}</li>\n"
+        yield "</ul>\n"
+
+        yield f"<p><strong>{translations['import_summary'].format(created=len(importer.created), errors=len(importer.errors))}</strong></p>\n"
+
+        if importer.errors:
+            yield f"""
+    <h2>{translations['import_errors_title']}</h2>
+    <table>
+        <thead>
+            <tr>
+                <th>{translations['import_line_col']}</th>
+                <th>{translations['email_col']}</th>
+                <th>{translations['import_error_col']}</th>
+            </tr>
+        </thead>
+        <tbody>
+    """
+            for error in importer.errors:
+                yield f"<tr><td>{error.line}</td><td>{html.escape(error.email)}</td><td>{error.message}</td></tr>\n"
+            yield """
+        </tbody>
+    </table>
+    """
+        yield '<p><a href="/home">&larr;</a></p>\n'
+
+    # One chunk per fragment: progress lines must not wait in a buffer
+    for chunk in page_chunks(translations['import_title'], render_content(), admin_user_email=admin_user_email, admin_role=admin_role):
+        yield chunk.encode()
+
+def import_mailboxes_handler(environ, start_response):
+    session = environ.get('session', None)
+    if not session or not session.data.get('logged_in'):
+        start_response("302 Found", [("Location", "/login")])
+        return [b""]
+
+    if session.data.get('role') != 'super_admin':
+        start_response("403 Forbidden", [("Content-Type", "text/html")])
+        return [translations['forbidden_access'].encode('utf-8')]
+
+    admin_user_id = session.data['id']
+    admin_user_email = session.data.get('email', '')
+    admin_role = session.data.get('role', 'user')
+
+    if environ['REQUEST_METHOD'] == 'GET':
+        form_html = f"""
+            <p>{translations['import_form_hint']}</p>
+            <form method="POST" action="/import" enctype="multipart/form-data">
+                <input type="hidden" name="csrf_token" value="{session.get_csrf_token()}">
+
+                <label for="csv_file">{translations['import_file_label']}</label><br>
+                <input type="file" id="csv_file" name="csv_file" accept=".csv,text/csv" required><br><br>
+
+                <label for="owner_email">{translations['import_owner_label']}</label><br>
+                <input type="email" id="owner_email" name="owner_email" placeholder="{admin_user_email}"><br>
+                <small>{translations['import_owner_hint']}</small><br><br>
+
+                <button type="submit">{translations['btn_import']}</button>
+                <a href="/home"><button type="button">{translations['btn_cancel']}</button></a>
+            </form>
+        """
+        body = html_template(translations['import_title'], form_html, admin_user_email=admin_user_email, admin_role=admin_role)
+        start_response("200 OK", [("Content-Type", "text/html")])
+        return [body.encode()]
+
+    elif environ['REQUEST_METHOD'] == 'POST':
+        fields = parse_multipart(environ, config['mailbox_import']['max_upload_bytes'])
+
+        if fields is None:
+            start_response("413 Request Entity Too Large", [("Content-Type", "text/html")])
+            return [translations['import_file_too_large'].encode('utf-8')]
+
+        # Validate CSRF token
+        csrf_token = fields.get('csrf_token', b"").decode('utf-8', 'replace')
+
+        if not session.validate_csrf_token(csrf_token):
+            start_response("403 Forbidden", [("Content-Type", "text/html")])
+            return [translations['csrf_invalid'].encode('utf-8')]
+
+        csv_text = fields.get('csv_file', b"").decode('utf-8-sig', 'replace')
+        if not csv_text.strip():
+            start_response("400 Bad Request", [("Content-Type", "text/html")])
+            return [translations['import_no_file'].encode('utf-8')]
+
+        # Mailboxes go to the given admin, or to the super_admin importing them
+        owner_email = fields.get('owner_email', b"").decode('utf-8', 'replace').strip()
+        owner_id, owner_role = admin_user_id, admin_role
+
+        if owner_email:
+            owner = fetch_all(config['sql']['select_admin_user_by_email'], (owner_email,))
+            if not owner:
+                start_response("400 Bad Request", [("Content-Type", "text/html")])
+                return [translations['import_unknown_owner'].encode('utf-8')]
+            owner_id, owner_role = owner[0]['id'], owner[0]['role']
+
+        try:
+            importer = MailboxImport(owner_id, owner_role).load(csv_text)
+        except Exception as e:
+            logging.error(f"Error checking mailbox import: {e}")
+            start_response("500 Internal Server Error", [("Content-Type", "text/html")])
+            return [translations['mailbox_creation_failed'].encode('utf-8')]
+
+        logging.info(f"Mailbox import by {admin_user_email} for admin {owner_id}: {len(importer.rows)} valid rows, {len(importer.errors)} rejected")
+
+        start_response("200 OK", [("Content-Type", "text/html"), ("Cache-Control", "no-store")])
+        return render_import(importer, admin_user_email, admin_role)
+
+    start_response("405 Method Not Allowed", [("Content-Type", "text/html")])
+    return [translations['method_not_allowed'].encode('utf-8')]
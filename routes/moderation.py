@@ -1,34 +1,26 @@
 # routes/moderation.py
 
 from utils.db import fetch_all, execute_query
-from utils.email import send_email
+from utils.email import send_emails
+from utils.reference_data import superadmin_emails
+from utils.moderation import approve_registrations, deny_registrations, send_approval_emails, moderation_domains
 from handlers.html import html_template
 from libs import translations, config, parse_qs
+import html
 import logging
-import secrets
-
-PYMAILADMIN_URL = config['PYMAILADMIN_URL']
-PRETTY_NAME = config['PRETTY_NAME']
 
 def notify_admin_for_approval(email, role, reason):
-    admins = fetch_all(config['sql']['select_superadmins_for_moderation'], ())
+    admins = superadmin_emails()
     
     if not admins:
         return
     
-    approve_url = f"{PYMAILADMIN_URL}/moderate/approve?email={email}"
-    deny_url = f"{PYMAILADMIN_URL}/moderate/deny?email={email}"
-    body_template = translations['email_moderation_body']
-    body = body_template.format(email=email, reason=reason, approve_url=approve_url, deny_url=deny_url)
-    subject = f"[{PRETTY_NAME}] {translations['email_moderation_subject']}"
+    moderation_pending_url = f"{config['PYMAILADMIN_URL']}/moderate/pending"
+    body = translations['email_moderation_body'].format(email=email, reason=reason, moderation_pending_url=moderation_pending_url)
+    subject = f"[{config['PRETTY_NAME']}] {translations['email_moderation_subject']}"
     
-    # Notify each superadmin by mail
-    for admin in admins:
-        send_email(
-            to_email=admin['email'],
-            subject=translations['email_moderation_subject'],
-            body=body
-        )
+    # Notify every superadmin over one SMTP connection
+    send_emails((admin_email, subject, body) for admin_email in admins)
 
 def confirm_registration_handler(environ, start_response):
     query_string = environ.get('QUERY_STRING', '')
@@ -59,103 +51,126 @@ def confirm_registration_handler(environ, start_response):
         start_response("500 Internal Server Error", [("Content-Type", "text/html")])
         return [translations['internal_server_error'].encode('utf-8')]
 
-def approve_registration_handler(environ, start_response):
-    
-    if environ['REQUEST_METHOD'] != 'POST':
-        start_response("405 Method Not Allowed", [("Content-Type", "text/html")])
-        return [translations['method_not_allowed'].encode('utf-8')]
-
+def moderator_session(environ, start_response):
+    """The session of a logged-in admin or super_admin, else None after a 403"""
     session = environ.get('session')
     
     if not session or not session.data.get('logged_in') or session.data.get('role') not in ['admin', 'super_admin']:
         start_response("403 Forbidden", [("Content-Type", "text/html")])
-        return [translations['forbidden_access'].encode('utf-8')]
+        return None
+    
+    return session
 
-    content_length = int(environ.get('CONTENT_LENGTH', 0))
+def read_moderation_form(environ, session, start_response):
+    """
+    POSTed form of /moderate/approve and /moderate/deny: (emails, data),
+    or None once an error response has been started.
+    """
+    content_length = int(environ.get('CONTENT_LENGTH', 0) or 0)
     post_data = environ['wsgi.input'].read(content_length).decode('utf-8')
     data = parse_qs(post_data)
-    email = data.get('email', [''])[0].strip()
-    csrf_token = data.get('csrf_token', [''])[0]
-    allowed_domains = data.get('allowed_domains', [])
-
-    if not session.validate_csrf_token(csrf_token):
-        start_response("403 Forbidden", [("Content-Type", "text/html")])
-        return [translations['csrf_invalid'].encode('utf-8')]
-
-    reg = fetch_all(config['sql']['select_admin_registration_by_email_unconfirmed'], (email,))
     
-    if not reg:
-        start_response("404 Not Found", [("Content-Type", "text/html")])
-        return [translations['user_not_found'].encode('utf-8')]
-
-    reg = reg[0]
+    if not session.validate_csrf_token(data.get('csrf_token', [''])[0]):
+        start_response("403 Forbidden", [("Content-Type", "text/html")])
+        return None, 'csrf_invalid'
     
-    try:
-        # Insert new mailbox
-        execute_query(config['sql']['insert_user_from_registration'], (email, reg['password_hash'], 'user'))
-        
-        ### Trigger doveadm here
-        
-        # Get user ID
-        user_row = fetch_all(config['sql']['select_admin_user_by_email'], (email,))
-        
-        if not user_row:
-            raise ValueError("User newly inserted not found")
-        
-        user_id = user_row[0]['id']
-        
-        # Insert allowed domains for new user
-        for domain_id_str in allowed_domains:
-            
-            try:
-                domain_id = int(domain_id_str)
-                execute_query(config['sql']['insert_allowed_domains_for_user'], (user_id, domain_id))
-            
-            # No domains? OK then
-            except ValueError:
-                pass
-        
-        # Then cleanup registration
-        execute_query(config['sql']['delete_registration_by_email'], (email,))
+    emails = list(dict.fromkeys(e.strip() for e in data.get('email', []) if e.strip()))
     
-    except Exception as e:
-        logging.error(f"Erreur: {e}")
-        start_response("500 Internal Server Error", [("Content-Type", "text/html")])
-        return [translations['approval_failed'].encode('utf-8')]
+    if not emails:
+        start_response("400 Bad Request", [("Content-Type", "text/html")])
+        return None, 'moderation_no_selection'
     
-    # Send confirmed registration mail
-    login_url = f"{PYMAILADMIN_URL}/login"
-    email_body = translations['email_confirmed_registration_body'].format(login_url=login_url)
-    subject = f"[{PRETTY_NAME}] {translations['email_confirmed_registration_subject']}"
+    return (emails, data), None
+
+def moderation_errors_page(errors, session):
+    """Registrations left in the queue, with the reason"""
+    rows = "".join(
+        f"<tr><td>{html.escape(email)}</td><td>{translations[error]}</td></tr>\n"
+        for email, error in errors.items()
+    )
+    content = f"""
+    <h2>{translations['moderation_errors_title']}</h2>
+    <table>
+        <thead><tr>
+            <th>{translations['moderation_email_col']}</th>
+            <th>{translations['import_error_col']}</th>
+        </tr></thead>
+        <tbody>
+        {rows}
+        </tbody>
+    </table>
+    <p><a href="/moderate/pending">{translations['moderation_back']}</a></p>
+    """
+    return html_template(translations['moderation_title'], content, admin_user_email=session.data.get('email', ''), admin_role=session.data.get('role', 'user'))
+
+def approve_registration_handler(environ, start_response):
+    """
+    POST /moderate/approve: approve the checked registrations (one or many),
+    each allowed on the checked domains the moderator may grant.
+    """
+    if environ['REQUEST_METHOD'] != 'POST':
+        # Links in older notification mails
+        start_response("302 Found", [("Location", "/moderate/pending")])
+        return [b""]
+
+    session = moderator_session(environ, start_response)
+    if session is None:
+        return [translations['forbidden_access'].encode('utf-8')]
+
+    form, error = read_moderation_form(environ, session, start_response)
+    if form is None:
+        return [translations[error].encode('utf-8')]
+    emails, data = form
+
+    # Checked domains the moderator may not grant are dropped
+    approved, errors = approve_registrations(emails, data.get('allowed_domains', []), session.data.get('id'), session.data.get('role'))
     
-    if not send_email(email, subject, email_body):
-        start_response("500 Internal Server Error", [("Content-Type", "text/html")])
-        return [translations['email_sent_failed'].encode('utf-8')]
+    # Send confirmed registration mails
+    for email in send_approval_emails(approved):
+        errors[email] = 'email_sent_failed'
 
-    start_response("302 Found", [("Location", "/moderate/pending")])
-    return [b""]
+    if approved:
+        logging.info(f"Moderation by {session.data.get('email', '')}: {len(approved)} approved")
+
+    if not errors:
+        start_response("302 Found", [("Location", "/moderate/pending")])
+        return [b""]
+
+    status = "404 Not Found" if all(e == 'user_not_found' for e in errors.values()) else "500 Internal Server Error"
+    start_response(status, [("Content-Type", "text/html")])
+    return [moderation_errors_page(errors, session).encode('utf-8')]
 
 def deny_registration_handler(environ, start_response):
-    session = environ.get('session', None)
-    
-    if not session or not session.data.get('logged_in') or session.data.get('role') not in ['admin', 'super_admin']:
-        start_response("403 Forbidden", [("Content-Type", "text/html")])
+    """POST /moderate/deny: silently drop the checked registrations"""
+    if environ['REQUEST_METHOD'] != 'POST':
+        start_response("302 Found", [("Location", "/moderate/pending")])
+        return [b""]
+
+    session = moderator_session(environ, start_response)
+    if session is None:
         return [translations['forbidden_access'].encode('utf-8')]
     
-    query_string = environ.get('QUERY_STRING', '')
-    params = parse_qs(query_string)
-    email = params.get('email', [''])[0].strip()
-    
-    if not email:
-        start_response("400 Bad Request", [("Content-Type", "text/html")])
-        return [translations['missing_email'].encode('utf-8')]
+    form, error = read_moderation_form(environ, session, start_response)
+    if form is None:
+        return [translations[error].encode('utf-8')]
+    emails, _ = form
     
-    # Don't send any mail, just refuse registration silently and cleanup
-    execute_query(config['sql']['delete_registration_by_email'], (email,))
+    try:
+        deny_registrations(emails)
+    except Exception as e:
+        logging.error(f"Error denying registrations of {', '.join(emails)}: {e}")
+        start_response("500 Internal Server Error", [("Content-Type", "text/html")])
+        return [translations['internal_server_error'].encode('utf-8')]
+
+    logging.info(f"Moderation by {session.data.get('email', '')}: {len(emails)} denied")
     start_response("302 Found", [("Location", "/moderate/pending")])
     return [b""]
 
 def moderation_queue_handler(environ, start_response):
+    """
+    GET /moderate/pending[?cursor=id]: one page of confirmed registrations.
+    The domains a moderator may grant are read once per page, not per row.
+    """
     session = environ.get('session', None)
     
     if not session or not session.data.get('logged_in'):
@@ -168,23 +183,40 @@ def moderation_queue_handler(environ, start_response):
     
     admin_user_email = session.data.get('email', '')
     admin_role = session.data.get('role', 'user')
-    pending = fetch_all(config['sql']['select_pending_registrations'], ())
-    rows = ""
-    
-    for p in pending:
-        
-        # Build domains list as checkboxes
-        domains_checkboxes = ""
-        
-        for domain in domains:
-            domains_checkboxes += f"""
-                <label><input type="checkbox" name="allowed_domains" value="{domain["id"]}"> {domain["domain"]}</label><br>
-            """
-                
+    
+    params = parse_qs(environ.get('QUERY_STRING', ''))
+    cursor = params.get('cursor', ['0'])[0]
+    cursor = int(cursor) if cursor.isdigit() else 0
+    page_size = config['moderation']['page_size']
+    
+    try:
+        domains = moderation_domains(session.data.get('id'), admin_role)
+        pending = fetch_all(config['sql']['select_pending_registrations_page'], (cursor, page_size + 1))
+    except Exception as e:
+        logging.error(f"Error loading the moderation queue: {e}")
+        start_response("500 Internal Server Error", [("Content-Type", "text/html")])
+        return [translations['internal_server_error'].encode('utf-8')]
+    
+    next_cursor = None
+    if len(pending) > page_size:
+        pending = pending[:page_size]
+        next_cursor = pending[-1]['id']
+    
+    csrf_token = session.get_csrf_token()
+    
+    # Same domain checkboxes for every row: built once
+    domains_checkboxes = "".join(
+        f"""
+                <label><input type="checkbox" name="allowed_domains" value="{domain["id"]}"> {domain["domain"]}</label><br>"""
+        for domain in domains
+    )
+    
+    def render_row(p):
+        email = html.escape(p['email'])
         approve = f"""
             <form method="POST" action="/moderate/approve">
-                <input type="hidden" name="email" value="{p['email']}">
-                <input type="hidden" name="csrf_token" value="{session.get_csrf_token()}">
+                <input type="hidden" name="email" value="{email}">
+                <input type="hidden" name="csrf_token" value="{csrf_token}">
                 <fieldset>
                     <legend>{translations["allowed_domains"]}</legend>
                     {domains_checkboxes}
@@ -192,28 +224,48 @@ def moderation_queue_handler(environ, start_response):
                 <button type="submit">{translations["approve_btn"]}</button>
             </form>
         """
-        
         deny = f"""
             <form method="POST" action="/moderate/deny">
-                <input type="hidden" name="email" value="{p['email']}">
-                <input type="hidden" name="csrf_token" value="{session.get_csrf_token()}">
+                <input type="hidden" name="email" value="{email}">
+                <input type="hidden" name="csrf_token" value="{csrf_token}">
                 <button type="submit">{translations["deny_btn"]}</button>
             </form>
         """
-        
-        rows += f"<tr><td>{p['email']}</td><td>{p['reason']}</td><td>{approve} {deny}</td></tr>"
+        select = f'<input type="checkbox" name="email" value="{email}" form="bulk">'
+        return f"<tr><td>{select}</td><td>{email}</td><td>{html.escape(p['reason'] or '')}</td><td>{approve} {deny}</td></tr>\n"
     
-    table = f"""
+    if not pending:
+        content = f"<p>{translations['moderation_no_pending']}</p>"
+    else:
+        content = f"""
     <table>
         <thead><tr>
+            <th>{translations['moderation_select_col']}</th>
             <th>{translations['moderation_email_col']}</th>
             <th>{translations['moderation_reason_col']}</th>
             <th>{translations['moderation_actions_col']}</th>
         </tr></thead>
-        <tbody>{rows}</tbody>
+        <tbody>
+        {"".join(render_row(p) for p in pending)}
+        </tbody>
     </table>
+    
+    <h2>{translations['moderation_bulk_title']}</h2>
+    <form id="bulk" method="POST" action="/moderate/approve">
+        <input type="hidden" name="csrf_token" value="{csrf_token}">
+        <fieldset>
+            <legend>{translations["allowed_domains"]}</legend>
+            {domains_checkboxes}
+        </fieldset>
+        <p>{translations['moderation_bulk_hint']}</p>
+        <button type="submit" formaction="/moderate/approve">{translations['approve_selected_btn']}</button>
+        <button type="submit" formaction="/moderate/deny">{translations['deny_selected_btn']}</button>
+    </form>
     """
     
-    body = html_template(translations['moderation_title'], table, admin_user_email=admin_user_email, admin_role=admin_role)
+    if next_cursor is not None:
+        content += f'<p><a href="/moderate/pending?cursor={next_cursor}">{translations["btn_next"]}</a></p>'
+    
+    body = html_template(translations['moderation_title'], content, admin_user_email=admin_user_email, admin_role=admin_role)
     start_response("200 OK", [("Content-Type", "text/html")])
-    return [body.encode()]
+    return [body.encode('utf-8')]
@@ -9,9 +9,6 @@ import secrets
 from passlib.hash import argon2
 import logging
 
-PYMAILADMIN_URL = config['PYMAILADMIN_URL']
-PRETTY_NAME = config['PRETTY_NAME']
-
 def register_handler(environ, start_response):
     session = environ['session']
     if session.data.get('logged_in'):
@@ -86,9 +83,9 @@ def register_handler(environ, start_response):
             return [translations['internal_server_error'].encode('utf-8')]
 
         # Send confirmation mail
-        confirm_url = f"{PYMAILADMIN_URL}/register/confirm?hash={confirmation_hash}"
+        confirm_url = f"{config['PYMAILADMIN_URL']}/register/confirm?hash={confirmation_hash}"
         email_body = translations['email_confirm_body'].format(confirm_url=confirm_url)
-        subject = f"[{PRETTY_NAME}] {translations['email_confirm_subject']}"
+        subject = f"[{config['PRETTY_NAME']}] {translations['email_confirm_subject']}"
         
         if not send_email(email, subject, email_body):
             start_response("500 Internal Server Error", [("Content-Type", "text/html")])
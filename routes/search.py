@@ -0,0 +1,181 @@
+# routes/search.py
+
+from libs import config, translations, parse_qs
+from utils.search import KINDS, normalize, search, suggest
+from utils.versions import GLOBAL_SCOPE, admin_scope, not_modified, cache_headers
+from handlers.html import html_template
+from routes.dashboard import page_etag
+from urllib.parse import urlencode
+import html
+import json
+import logging
+
+def search_scope(session):
+    """(owner filter, change token scopes) for the logged-in admin"""
+    if session.data.get('role') == 'super_admin':
+        return None, [GLOBAL_SCOPE]
+    return session.data['id'], [admin_scope(session.data['id'])]
+
+def cursor_params(params):
+    """after/after_id from the query string, (None, 0) on the first page"""
+    after = params.get('after', [None])[0]
+    after_id = params.get('after_id', ['0'])[0]
+    return after, int(after_id) if after_id.isdigit() else 0
+
+def render_rows(kind, rows):
+    if kind == 'mailboxes':
+        return "".join(
+            f'<tr><td><a href="/mailbox?id={row["id"]}">{html.escape(row["email"])}</a></td></tr>\n'
+            for row in rows
+        )
+    return "".join(
+        f'<tr><td>{html.escape(row["source"])}</td><td>{html.escape(row["destination"])}</td>'
+        f'<td><a href="/editalias?id={row["id"]}">{translations["btn_modify"]}</a></td></tr>\n'
+        for row in rows
+    )
+
+def render_section(kind, prefix, rows, cursor):
+    if kind == 'mailboxes':
+        head = f"<th>{translations['email_col']}</th>"
+    else:
+        head = f"<th>{translations['alias_source_col']}</th><th>{translations['destination_label']}</th><th></th>"
+
+    if not rows:
+        body = f"<p>{translations['search_no_results']}</p>"
+    else:
+        body = f"""
+    <table>
+        <thead><tr>{head}</tr></thead>
+        <tbody>
+        {render_rows(kind, rows)}
+        </tbody>
+    </table>
+    """
+
+    more = ""
+    if cursor is not None:
+        query = urlencode({'q': prefix, 'kind': kind, 'after': cursor[0], 'after_id': cursor[1]})
+        more = f'<p><a href="/search?{html.escape(query)}">{translations["search_more"]}</a></p>'
+
+    return f"<h2>{translations[f'search_title_{kind}']}</h2>\n{body}\n{more}\n"
+
+def search_handler(environ, start_response):
+    """
+    GET /search?q=prefix: mailboxes, aliases and aliases by destination
+    starting with prefix, first page of each.
+    GET /search?q=prefix&kind=aliases&after=...&after_id=...: next pages of one kind.
+    """
+    session = environ.get('session', None)
+    if not session or not session.data.get('logged_in'):
+        start_response("302 Found", [("Location", "/login")])
+        return [b""]
+
+    admin_user_email = session.data.get('email', '')
+    admin_role = session.data.get('role', 'user')
+    owner_filter, scopes = search_scope(session)
+
+    params = parse_qs(environ.get('QUERY_STRING', ''))
+    raw_term = params.get('q', [''])[0]
+    prefix = normalize(raw_term)
+    kind = params.get('kind', [''])[0]
+
+    if kind and kind not in KINDS:
+        start_response("400 Bad Request", [("Content-Type", "text/html")])
+        return [b"Bad request"]
+
+    etag = page_etag(environ, scopes, session)
+    cached = not_modified(environ, start_response, etag)
+    if cached is not None:
+        return cached
+
+    form_html = f"""
+    <form method="GET" action="/search">
+        <input type="search" name="q" value="{html.escape(raw_term)}" list="search-suggestions" autocomplete="off" autofocus required>
+        <datalist id="search-suggestions"></datalist>
+        <button type="submit">{translations['btn_search']}</button>
+    </form>
+    """
+
+    results_html = ""
+    if raw_term and prefix is None:
+        results_html = f"<p>{translations['search_too_short'].format(min=config['search']['min_length'])}</p>"
+
+    elif prefix is not None:
+        after, after_id = cursor_params(params)
+        try:
+            for section in ([kind] if kind else KINDS):
+                if kind:
+                    rows, cursor = search(section, prefix, owner_filter, after, after_id)
+                else:
+                    rows, cursor = search(section, prefix, owner_filter)
+                results_html += render_section(section, prefix, rows, cursor)
+        except Exception as e:
+            logging.error(f"Error searching {prefix!r}: {e}")
+            start_response("500 Internal Server Error", [("Content-Type", "text/html")])
+            return [translations['search_failed'].encode('utf-8')]
+
+    script_js = """
+    <script>
+    document.addEventListener('DOMContentLoaded', function() {
+        const input = document.querySelector('input[name="q"]');
+        const list = document.getElementById('search-suggestions');
+        let timer = null;
+
+        input.addEventListener('input', function() {
+            clearTimeout(timer);
+            timer = setTimeout(function() {
+                fetch('/search/autocomplete?q=' + encodeURIComponent(input.value.trim()), {credentials: 'same-origin'})
+                    .then(function(response) { return response.ok ? response.json() : {results: []}; })
+                    .then(function(data) {
+                        list.replaceChildren(...data.results.map(function(result) {
+                            const option = document.createElement('option');
+                            option.value = result.value;
+                            return option;
+                        }));
+                    });
+            }, 150);
+        });
+    });
+    </script>
+    """
+
+    body = html_template(translations['search_title'], form_html + results_html + script_js, admin_user_email=admin_user_email, admin_role=admin_role)
+    start_response("200 OK", [("Content-Type", "text/html")] + cache_headers(etag))
+    return [body.encode()]
+
+def autocomplete_handler(environ, start_response):
+    """
+    GET /search/autocomplete?q=prefix[&limit=N]
+    {"q": prefix, "results": [{"type": "mailbox"|"alias", "value", "id"[, "destination"]}]}
+    """
+    session = environ.get('session', None)
+    if not session or not session.data.get('logged_in'):
+        start_response("401 Unauthorized", [("Content-Type", "application/json")])
+        return [b'{"error": "unauthorized"}']
+
+    owner_filter, scopes = search_scope(session)
+
+    params = parse_qs(environ.get('QUERY_STRING', ''))
+    prefix = normalize(params.get('q', [''])[0])
+    limit = params.get('limit', [''])[0]
+    max_limit = config['search']['autocomplete_limit']
+    limit = min(int(limit), max_limit) if limit.isdigit() and int(limit) > 0 else max_limit
+
+    # Same prefix typed again: 304 from the change tokens, no search query
+    etag = page_etag(environ, scopes, session)
+    cached = not_modified(environ, start_response, etag)
+    if cached is not None:
+        return cached
+
+    results = []
+    if prefix is not None:
+        try:
+            results = suggest(prefix, owner_filter, limit)
+        except Exception as e:
+            logging.error(f"Error in autocomplete for {prefix!r}: {e}")
+            start_response("500 Internal Server Error", [("Content-Type", "application/json")])
+            return [b'{"error": "search failed"}']
+
+    payload = json.dumps({'q': prefix or '', 'results': results}, ensure_ascii=False)
+    start_response("200 OK", [("Content-Type", "application/json; charset=utf-8")] + cache_headers(etag))
+    return [payload.encode('utf-8')]
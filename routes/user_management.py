@@ -3,13 +3,16 @@
 import time
 import logging
 import datetime
-from utils.db import fetch_all, execute_query
+from utils.db import fetch_all, execute_query, transaction
 from handlers.html import html_template
-from libs import config, parse_qs, argon2, bcrypt, sha512_crypt, sha256_crypt, pbkdf2_sha256
+from libs import config, parse_qs, argon2, bcrypt, sha512_crypt, sha256_crypt, pbkdf2_sha256, translations
 from utils.alias_limits import can_create_alias
+from utils.changes import record_change
+from utils.counters import seed_alias_counts, adjust_alias_counts
 from utils.email import send_email
+from utils.ownership import is_owner
+from utils.versions import bump_versions, domain_scope, admin_scope
 from utils.doveadm_api import doveadm_create_mailbox, doveadm_rekey_mailbox_generate, doveadm_rekey_mailbox_password, doveadm_delete_user, doveadm_delete_mailbox
-from i18n.en_US import translations
 
 def verify_dovecot_password(stored_hash, password):
     """Verify current mailbox password"""
@@ -17,6 +20,10 @@ def verify_dovecot_password(stored_hash, password):
         alg = config['mailbox_hash']['algorithm']
         prefix = config['mailbox_hash']['prefix']
         
+        # Dovecot stores "{SCHEME}hash", passlib only knows the hash part
+        if stored_hash.startswith(prefix):
+            stored_hash = stored_hash[len(prefix):]
+        
         if alg in ['argon2id', 'argon2i']:
             return argon2.verify(password, stored_hash)
         
@@ -37,6 +44,11 @@ def verify_dovecot_password(stored_hash, password):
     except:
         return False
 
+def enable_mailbox(email):
+    with transaction() as tx:
+        tx.execute(config['sql_dovecot']['enable_user'], (email,))
+        record_change(tx, 'mailbox', 'enable', email)
+
 # --- Aliases management ---
 def edit_alias_handler(environ, start_response):
     session = environ.get('session', None)
@@ -165,10 +177,46 @@ def edit_alias_handler(environ, start_response):
 
         domain_part = destination.split('@', 1)[1]
         source = f"{source_raw}@{domain_part}"
+        
+        alias = fetch_all(config['sql_dovecot']['select_alias_by_id'], (int(alias_id),))
+        
+        if not alias:
+            start_response("404 Not Found", [("Content-Type", "text/html")])
+            return [translations['alias_not_found'].encode('utf-8')]
+        
+        old_destination = alias[0]['destination']
+
+        # The alias stays in its domain (its domain_id is not rewritten)
+        if domain_part.lower() != alias[0]['source'].split('@', 1)[-1].lower():
+            start_response("400 Bad Request", [("Content-Type", "text/html")])
+            return [translations['invalid_domain'].encode('utf-8')]
+
+        # Check ownership of the current and the new destination mailbox (skip for super_admin)
+        if session.data.get('role') != 'super_admin':
+            for mailbox in dict.fromkeys((old_destination, destination)):
+                user = fetch_all(config['sql_dovecot']['select_user_by_email'], (mailbox,))
+
+                if not user or not is_owner(session.data['id'], user[0]['id']):
+                    start_response("403 Forbidden", [("Content-Type", "text/html")])
+                    return [translations['ownership_required'].encode('utf-8')]
 
         # Update aliases in database
         try:
-            execute_query(config['sql_dovecot']['update_alias'], (source, destination, int(alias_id)))
+            with transaction() as tx:
+                seed_alias_counts(tx, [old_destination, destination])
+                tx.execute(config['sql_dovecot']['update_alias'], (source, destination, int(alias_id)))
+                
+                if old_destination != destination:
+                    adjust_alias_counts(tx, {old_destination: -1, destination: 1})
+                
+                # Renamed: the old address is gone, the new one appears
+                if alias[0]['source'] != source:
+                    record_change(tx, 'alias', 'delete', alias[0]['source'])
+                    record_change(tx, 'alias', 'create', source)
+                else:
+                    record_change(tx, 'alias', 'update', source)
+            
+            bump_versions(domain_scope(alias[0]['domain_id']), admin_scope(session.data['id']))
             start_response("302 Found", [("Location", "/home")])
             return [b""]
         
@@ -324,9 +372,20 @@ def add_alias_handler(environ, start_response):
         
         domain_id = user[0]['domain_id']
         
+        # Check ownership of the destination mailbox (skip for super_admin)
+        if session.data.get('role') != 'super_admin' and not is_owner(session.data['id'], user[0]['id']):
+            start_response("403 Forbidden", [("Content-Type", "text/html")])
+            return [translations['ownership_required'].encode('utf-8')]
+        
         # insert new alias
         try:
-            execute_query(config['sql_dovecot']['insert_alias'], (domain_id, source, destination))
+            with transaction() as tx:
+                seed_alias_counts(tx, [destination])
+                tx.execute(config['sql_dovecot']['insert_alias'], (domain_id, source, destination))
+                adjust_alias_counts(tx, {destination: 1})
+                record_change(tx, 'alias', 'create', source)
+            
+            bump_versions(domain_scope(domain_id), admin_scope(session.data['id']))
             start_response("302 Found", [("Location", "/home")])
             return [b""]
         
@@ -418,7 +477,7 @@ def edit_user_handler(environ, start_response):
         # Get user_id and check ownership
         user_id = int(user_id)
         admin_user_id = session.data['id']
-        if not fetch_all(config['sql']['is_owner'], (admin_user_id, user_id)):
+        if not is_owner(admin_user_id, user_id):
             start_response("403 Forbidden", [("Content-Type", "text/html")])
             return [translations['ownership_required'].encode('utf-8')]
         
@@ -483,11 +542,13 @@ def edit_user_handler(environ, start_response):
                     raise ValueError("Unsupported hash algorithm for Dovecot mailbox passwords.")
                 
                 crypt_value = prefix + password_hash
-                execute_query(config['sql_dovecot']['update_user_password'], (crypt_value, int(user_id)))
-                
-                # Disable user
                 email = user[0]['email']
-                execute_query(config['sql_dovecot']['disable_user'], (email,))
+                
+                # New password and disable user while the keys are re-encrypted
+                with transaction() as tx:
+                    tx.execute(config['sql_dovecot']['update_user_password'], (crypt_value, int(user_id)))
+                    tx.execute(config['sql_dovecot']['disable_user'], (email,))
+                    record_change(tx, 'mailbox', 'disable', email)
                 
                 # Everything seems OK here, let's update Dovecot.
                 # Trigger doveadm:
@@ -498,19 +559,20 @@ def edit_user_handler(environ, start_response):
                     logging.error(f"Failed to edit mailbox in Dovecot for {email}: {err}")
                     
                     # Re-enable user when modify has failed:
-                    execute_query(config['sql_dovecot']['enable_user'], (email,))
+                    enable_mailbox(email)
                     
                     start_response("500 Internal Server Error", [("Content-Type", "text/html")])
                     return [translations['mailbox_edit_failed'].encode('utf-8')]
                 
                 # Re-enable user:
-                execute_query(config['sql_dovecot']['enable_user'], (email,))
+                enable_mailbox(email)
+                bump_versions(domain_scope(user[0]['domain_id']), admin_scope(admin_user_id))
                 
                 # Send password change notification to admin
                 subject = f"[{config['PRETTY_NAME']}] {translations['notify_password_changed_subject']}"
                 body = f"""
                     {translations['notify_password_changed_body']}
-                    {translations['notify_password_changed_date']} {datetime.now().strftime('%Y-%m-%d %H:%M')}
+                    {translations['notify_password_changed_date']} {datetime.datetime.now().strftime('%Y-%m-%d %H:%M')}
                     {translations['notify_password_changed_admin']}
                 """
                 
@@ -610,7 +672,7 @@ def delete_user_handler(environ, start_response):
         user_id = int(user_id)
         admin_user_id = session.data['id']
     
-        if not fetch_all(config['sql']['is_owner'], (admin_user_id, user_id)):
+        if not is_owner(admin_user_id, user_id):
             start_response("403 Forbidden", [("Content-Type", "text/html")])
             return [translations['ownership_required'].encode('utf-8')]
         
@@ -624,12 +686,16 @@ def delete_user_handler(environ, start_response):
         
         try:
             # Disable user
-            execute_query(config['sql_dovecot']['disable_user'], (email,))
+            with transaction() as tx:
+                tx.execute(config['sql_dovecot']['disable_user'], (email,))
+                record_change(tx, 'mailbox', 'delete', email)
 
             ### Trigger doveadm
             doveadm_delete_mailbox(email)
             doveadm_delete_user(email)
             
+            bump_versions(domain_scope(user[0]['domain_id']), admin_scope(admin_user_id))
+            
             # Redirect to confirmation message
             start_response("302 Found", [("Location", "/home")])
             return [b""]
@@ -33,7 +33,8 @@ CREATE TABLE `pymailadmin_admin_registrations` (
   `confirmed` tinyint(1) NOT NULL DEFAULT 0,
   PRIMARY KEY (`id`),
   UNIQUE KEY `uniq_email` (`email`(191)),
-  UNIQUE KEY `uniq_confirmation_hash` (`confirmation_hash`(191))
+  UNIQUE KEY `uniq_confirmation_hash` (`confirmation_hash`(191)),
+  INDEX `idx_pending` (`confirmed`, `expires_at`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
 -- Web admin users --
@@ -70,3 +71,51 @@ CREATE TABLE `pymailadmin_ownerships` (
     INDEX `idx_admin_user` (`admin_user_id`),
     INDEX `idx_user` (`user_id`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- Change tokens for conditional GET (ETag) --
+CREATE TABLE `pymailadmin_versions` (
+    `scope` varchar(64) NOT NULL,
+    `version` bigint NOT NULL DEFAULT 0,
+    PRIMARY KEY (`scope`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- API keys (/api/v1), stored as SHA-256 digests --
+CREATE TABLE `pymailadmin_api_keys` (
+    `id` INT AUTO_INCREMENT PRIMARY KEY,
+    `admin_user_id` INT NOT NULL,
+    `name` varchar(191) NOT NULL DEFAULT '',
+    `key_hash` char(64) NOT NULL,
+    `created_at` DATETIME DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE KEY `uniq_key_hash` (`key_hash`),
+    FOREIGN KEY (`admin_user_id`) REFERENCES `pymailadmin_admin_users`(`id`) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- Counters read by the limit checks (utils/counters.py) --
+-- Kept in step by the write paths, fixed by python3 -m scripts.reconcile_counters
+CREATE TABLE `pymailadmin_mailbox_counts` (
+    `admin_user_id` INT NOT NULL PRIMARY KEY,
+    `mailboxes` INT NOT NULL DEFAULT 0
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+CREATE TABLE `pymailadmin_alias_counts` (
+    `destination` varchar(255) NOT NULL PRIMARY KEY,
+    `aliases` INT NOT NULL DEFAULT 0
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- Change feed read by the Dovecot connector (scripts/pymailadmin-cron.py) --
+-- Append-only: written with the change, pruned by python3 -m scripts.prune_changes
+CREATE TABLE `pymailadmin_changes` (
+    `id` BIGINT UNSIGNED AUTO_INCREMENT PRIMARY KEY,
+    `entity` varchar(16) NOT NULL,
+    `action` varchar(16) NOT NULL,
+    `object` varchar(255) NOT NULL,
+    `created_at` DATETIME DEFAULT CURRENT_TIMESTAMP,
+    INDEX `idx_created_at` (`created_at`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- Last change acknowledged by each connector --
+CREATE TABLE `pymailadmin_change_cursors` (
+    `consumer` varchar(64) NOT NULL PRIMARY KEY,
+    `last_id` BIGINT UNSIGNED NOT NULL DEFAULT 0,
+    `updated_at` DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
@@ -0,0 +1,137 @@
+-- schema.sqlite.sql
+-- pymailadmin tables structure for DB_DRIVER=sqlite
+--
+-- sqlite3 /var/lib/pymailadmin/pymailadmin.db < schema.sqlite.sql
+--
+-- Unlike schema.sql, this also creates minimal Dovecot tables (default
+-- names from .env.example), for tests, benchmarks and single-node installs
+-- where Dovecot reads the same file through its sqlite driver.
+-- DATETIME columns must keep that declared type: the driver converts them.
+
+PRAGMA journal_mode = WAL;
+
+-- Dovecot tables --
+CREATE TABLE IF NOT EXISTS `domain` (
+    `id` INTEGER PRIMARY KEY AUTOINCREMENT,
+    `domain` VARCHAR(255) NOT NULL UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS `users` (
+    `id` INTEGER PRIMARY KEY AUTOINCREMENT,
+    `domain_id` INTEGER NOT NULL REFERENCES `domain`(`id`) ON DELETE CASCADE,
+    `email` VARCHAR(255) NOT NULL UNIQUE,
+    `crypt` VARCHAR(255) NOT NULL,
+    `quota` INTEGER NOT NULL DEFAULT 0,
+    `active` TINYINT NOT NULL DEFAULT 1
+);
+CREATE INDEX IF NOT EXISTS `idx_users_domain` ON `users` (`domain_id`);
+
+CREATE TABLE IF NOT EXISTS `alias` (
+    `id` INTEGER PRIMARY KEY AUTOINCREMENT,
+    `domain_id` INTEGER NOT NULL REFERENCES `domain`(`id`) ON DELETE CASCADE,
+    `source` VARCHAR(255) NOT NULL,
+    `destination` VARCHAR(255) NOT NULL
+);
+CREATE INDEX IF NOT EXISTS `idx_alias_destination` ON `alias` (`destination`, `domain_id`);
+CREATE INDEX IF NOT EXISTS `idx_alias_source` ON `alias` (`source`);
+
+-- Sessions and cookies --
+CREATE TABLE IF NOT EXISTS `pymailadmin_sessions` (
+    `id` VARCHAR(128) NOT NULL PRIMARY KEY,
+    `data` TEXT NOT NULL,
+    `expires_at` DATETIME NOT NULL
+);
+CREATE INDEX IF NOT EXISTS `idx_sessions_expires` ON `pymailadmin_sessions` (`expires_at`);
+
+-- Rate limiting --
+CREATE TABLE IF NOT EXISTS `pymailadmin_rate_limits` (
+    `id` INTEGER PRIMARY KEY AUTOINCREMENT,
+    `key` VARCHAR(64) NOT NULL UNIQUE,
+    `attempts` INTEGER NOT NULL DEFAULT 0,
+    `last_attempt` DATETIME NOT NULL,
+    `blocked_until` DATETIME DEFAULT NULL
+);
+CREATE INDEX IF NOT EXISTS `idx_rate_limits_blocked` ON `pymailadmin_rate_limits` (`blocked_until`);
+
+-- Web admin registration --
+CREATE TABLE IF NOT EXISTS `pymailadmin_admin_registrations` (
+    `id` INTEGER PRIMARY KEY AUTOINCREMENT,
+    `email` VARCHAR(191) NOT NULL UNIQUE,
+    `password_hash` VARCHAR(255) NOT NULL,
+    `reason` TEXT NOT NULL,
+    `confirmation_hash` VARCHAR(191) NOT NULL UNIQUE,
+    `expires_at` DATETIME NOT NULL,
+    `confirmed` TINYINT NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS `idx_registrations_pending` ON `pymailadmin_admin_registrations` (`confirmed`, `expires_at`);
+
+-- Web admin users --
+CREATE TABLE IF NOT EXISTS `pymailadmin_admin_users` (
+    `id` INTEGER PRIMARY KEY AUTOINCREMENT,
+    `email` VARCHAR(191) NOT NULL UNIQUE,
+    `password_hash` VARCHAR(255) NOT NULL,
+    `role` VARCHAR(16) NOT NULL DEFAULT 'user' CHECK (`role` IN ('user', 'admin', 'super_admin')),
+    `active` TINYINT NOT NULL DEFAULT 0
+);
+
+-- Domains ownerships --
+CREATE TABLE IF NOT EXISTS `pymailadmin_domains_ownerships` (
+    `id` INTEGER PRIMARY KEY AUTOINCREMENT,
+    `admin_user_id` INTEGER NOT NULL REFERENCES `pymailadmin_admin_users`(`id`) ON DELETE CASCADE,
+    `domain_id` INTEGER NOT NULL REFERENCES `domain`(`id`) ON DELETE CASCADE,
+    UNIQUE (`admin_user_id`, `domain_id`)
+);
+
+-- Mailboxes ownerships --
+CREATE TABLE IF NOT EXISTS `pymailadmin_ownerships` (
+    `id` INTEGER PRIMARY KEY AUTOINCREMENT,
+    `admin_user_id` INTEGER NOT NULL REFERENCES `pymailadmin_admin_users`(`id`) ON DELETE CASCADE,
+    `user_id` INTEGER NOT NULL REFERENCES `users`(`id`) ON DELETE CASCADE,
+    `is_primary` TINYINT DEFAULT 0,
+    `created_at` DATETIME DEFAULT (datetime('now', 'localtime')),
+    UNIQUE (`admin_user_id`, `user_id`)
+);
+CREATE INDEX IF NOT EXISTS `idx_ownerships_user` ON `pymailadmin_ownerships` (`user_id`);
+
+-- Change tokens for conditional GET (ETag) --
+CREATE TABLE IF NOT EXISTS `pymailadmin_versions` (
+    `scope` VARCHAR(64) NOT NULL PRIMARY KEY,
+    `version` BIGINT NOT NULL DEFAULT 0
+);
+
+-- API keys (/api/v1), stored as SHA-256 digests --
+CREATE TABLE IF NOT EXISTS `pymailadmin_api_keys` (
+    `id` INTEGER PRIMARY KEY AUTOINCREMENT,
+    `admin_user_id` INTEGER NOT NULL REFERENCES `pymailadmin_admin_users`(`id`) ON DELETE CASCADE,
+    `name` VARCHAR(191) NOT NULL DEFAULT '',
+    `key_hash` CHAR(64) NOT NULL UNIQUE,
+    `created_at` DATETIME DEFAULT (datetime('now', 'localtime'))
+);
+
+-- Counters read by the limit checks (utils/counters.py) --
+CREATE TABLE IF NOT EXISTS `pymailadmin_mailbox_counts` (
+    `admin_user_id` INTEGER NOT NULL PRIMARY KEY,
+    `mailboxes` INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS `pymailadmin_alias_counts` (
+    `destination` VARCHAR(255) NOT NULL PRIMARY KEY,
+    `aliases` INTEGER NOT NULL DEFAULT 0
+);
+
+-- Change feed read by the Dovecot connector (scripts/pymailadmin-cron.py) --
+CREATE TABLE IF NOT EXISTS `pymailadmin_changes` (
+    `id` INTEGER PRIMARY KEY AUTOINCREMENT,
+    `entity` VARCHAR(16) NOT NULL,
+    `action` VARCHAR(16) NOT NULL,
+    `object` VARCHAR(255) NOT NULL,
+    `created_at` DATETIME DEFAULT (datetime('now', 'localtime'))
+);
+CREATE INDEX IF NOT EXISTS `idx_changes_created_at` ON `pymailadmin_changes` (`created_at`);
+
+-- Last change acknowledged by each connector --
+CREATE TABLE IF NOT EXISTS `pymailadmin_change_cursors` (
+    `consumer` VARCHAR(64) NOT NULL PRIMARY KEY,
+    `last_id` INTEGER NOT NULL DEFAULT 0,
+    `updated_at` DATETIME DEFAULT (datetime('now', 'localtime'))
+);
@@ -0,0 +1,51 @@
+# scripts/api_keys.py
+#
+# Keys for the JSON API (/api/v1). A key acts as its admin: same role,
+# same ownerships, same limits. It is printed once, only its SHA-256 is
+# stored.
+#
+# From the pymailadmin directory:
+#   python3 -m scripts.api_keys create --admin admin@example.org --name provisioning
+#   python3 -m scripts.api_keys list
+#   python3 -m scripts.api_keys revoke 3
+
+import argparse
+import sys
+
+from libs import config, fetch_all
+from utils.api_keys import create_api_key, list_api_keys, revoke_api_key
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage API keys")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    create = commands.add_parser('create', help="Create a key and print it")
+    create.add_argument('--admin', required=True, help="Email of the admin the key acts as")
+    create.add_argument('--name', default='', help="What the key is for")
+
+    commands.add_parser('list', help="List keys (without the keys themselves)")
+
+    revoke = commands.add_parser('revoke', help="Delete a key")
+    revoke.add_argument('id', type=int, help="Key ID, see list")
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'create':
+        admin = fetch_all(config['sql']['select_admin_user_by_email'], (args.admin,))
+        if not admin:
+            print(f"Unknown admin: {args.admin}", file=sys.stderr)
+            return 1
+        print(create_api_key(admin[0]['id'], args.name))
+        print("Store this key now: it cannot be shown again.", file=sys.stderr)
+
+    elif args.command == 'list':
+        for key in list_api_keys():
+            print(f"{key['id']}\t{key['email']}\t{key['created_at']}\t{key['name']}")
+
+    elif args.command == 'revoke':
+        revoke_api_key(args.id)
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
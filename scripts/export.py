@@ -0,0 +1,57 @@
+# scripts/export.py
+#
+# Streaming export of domains, mailboxes and aliases, for audits, backups
+# and migrations (same data and formats as the /export route).
+#
+# From the pymailadmin directory:
+#   python3 -m scripts.export --kind mailboxes > mailboxes.csv
+#   python3 -m scripts.export --kind domains,mailboxes,aliases --format jsonl --output all.jsonl
+#   python3 -m scripts.export --kind aliases --domain 12 --admin admin@example.org
+#
+# Without --admin, everything is exported, as for a super_admin.
+
+import argparse
+import sys
+
+from libs import config, fetch_all
+from utils.export import KINDS, FORMATS, export_chunks
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export domains, mailboxes and aliases as CSV or JSON Lines")
+    parser.add_argument('--kind', default='mailboxes', help=f"Comma-separated: {', '.join(KINDS)} (one only for CSV)")
+    parser.add_argument('--format', choices=sorted(FORMATS), default='csv', help="Output format")
+    parser.add_argument('--domain', type=int, help="Only this domain ID (mailboxes and aliases)")
+    parser.add_argument('--admin', help="Only what this admin (email) owns")
+    parser.add_argument('--output', help="Write to this file instead of stdout")
+    args = parser.parse_args(argv)
+
+    kinds = [k.strip() for k in args.kind.split(',') if k.strip()]
+    unknown = [k for k in kinds if k not in KINDS]
+    if unknown:
+        parser.error(f"Unknown kinds: {', '.join(unknown)}")
+
+    admin_user_id = None
+    if args.admin:
+        admin = fetch_all(config['sql']['select_admin_user_by_email'], (args.admin,))
+        if not admin:
+            print(f"Unknown admin: {args.admin}", file=sys.stderr)
+            return 1
+        if admin[0]['role'] != 'super_admin':
+            admin_user_id = admin[0]['id']
+
+    try:
+        chunks = export_chunks(kinds, args.format, admin_user_id=admin_user_id, domain_id=args.domain)
+        output = open(args.output, 'wb') if args.output else sys.stdout.buffer
+        try:
+            for chunk in chunks:
+                output.write(chunk)
+        finally:
+            if args.output:
+                output.close()
+    except ValueError as e:
+        parser.error(str(e))
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
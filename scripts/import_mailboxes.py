@@ -0,0 +1,64 @@
+# scripts/import_mailboxes.py
+#
+# Bulk mailbox creation from a CSV file of email,password,quota lines
+# (quota in GB, optional), owned by an existing admin.
+#
+# From the pymailadmin directory:
+#   python3 -m scripts.import_mailboxes --owner admin@example.org mailboxes.csv
+#   python3 -m scripts.import_mailboxes --owner admin@example.org --check mailboxes.csv
+#   python3 -m scripts.import_mailboxes --owner admin@example.org --errors rejected.csv -
+#
+# Rows are checked like the creation form does, including the owner's
+# MAX_MAILBOXES_PER_USER; rejected rows are reported with their line number.
+
+import argparse
+import csv
+import sys
+
+from libs import config, fetch_all
+from utils.mailbox_import import MailboxImport
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Create mailboxes from a CSV file (email,password,quota)")
+    parser.add_argument('file', help="CSV file, - for stdin")
+    parser.add_argument('--owner', required=True, help="Email of the admin owning the new mailboxes")
+    parser.add_argument('--batch-size', type=int, default=None, help="Mailboxes per transaction and doveadm request (default: MAILBOX_IMPORT_BATCH_SIZE)")
+    parser.add_argument('--workers', type=int, default=None, help="Hashing processes, 0 for one per CPU (default: MAILBOX_IMPORT_HASH_WORKERS)")
+    parser.add_argument('--check', action='store_true', help="Only check the rows, create nothing")
+    parser.add_argument('--errors', help="Write rejected rows (line,email,error) to this CSV file")
+    args = parser.parse_args(argv)
+
+    owner = fetch_all(config['sql']['select_admin_user_by_email'], (args.owner,))
+    if not owner:
+        print(f"Unknown admin: {args.owner}", file=sys.stderr)
+        return 1
+
+    if args.file == '-':
+        text = sys.stdin.read()
+    else:
+        with open(args.file, encoding='utf-8-sig') as f:
+            text = f.read()
+
+    importer = MailboxImport(owner[0]['id'], owner[0]['role'], batch_size=args.batch_size, hash_workers=args.workers)
+    importer.load(text)
+    print(f"{len(importer.rows)} rows to create, {len(importer.errors)} rejected", file=sys.stderr)
+
+    if not args.check:
+        for stage, done, total in importer.run():
+            print(f"\r{stage}: {done}/{total}", end='', file=sys.stderr, flush=True)
+        print(file=sys.stderr)
+        print(f"{len(importer.created)} mailboxes created, {len(importer.errors)} rows rejected", file=sys.stderr)
+
+    for error in importer.errors:
+        print(f"line {error.line}: {error.email}: {error.message}", file=sys.stderr)
+
+    if args.errors:
+        with open(args.errors, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['line', 'email', 'error'])
+            writer.writerows(importer.errors)
+
+    return 1 if importer.errors else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
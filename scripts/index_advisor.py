@@ -0,0 +1,170 @@
+# scripts/index_advisor.py
+#
+# Index advisor for the hot query paths.
+#
+# Runs EXPLAIN on every query generated by config_loader.generate_sql_queries
+# and on config_data['sql'], reports full table/index scans, then checks the
+# composite indexes our hot paths need on the (configurable) Dovecot tables.
+#
+# From the pymailadmin directory:
+#   python3 -m scripts.index_advisor            # report only
+#   python3 -m scripts.index_advisor --apply    # also create missing indexes
+#   python3 -m scripts.index_advisor --json
+
+import argparse
+import json
+import logging
+import sys
+
+from libs import config, fetch_all, execute_query
+from config_loader import load_db_schema, generate_sql_queries
+
+# Value bound to every %s: a string compares fine against both int and
+# varchar columns without defeating index use
+EXPLAIN_PARAM = '0'
+
+class _Placeholders(dict):
+    """Leave unknown {placeholders} (IN lists...) as a single bound parameter"""
+    def __missing__(self, key):
+        return '%s'
+
+def recommended_indexes(schema):
+    """(table, columns, queries served) for the hot paths"""
+    return [
+        (schema['table_aliases'], [schema['field_alias_destination'], schema['field_alias_domain_id']],
+            ['seed_alias_count', 'select_alias_by_mailbox', 'select_alias_sources_by_destination_in_domain']),
+        (schema['table_aliases'], [schema['field_alias_source']],
+            ['select_alias_by_source']),
+        (schema['table_users'], [schema['field_user_domain_id']],
+            ['select_users_by_domain', 'select_users_with_alias_counts_by_domain']),
+        ('pymailadmin_admin_registrations', ['confirmed', 'expires_at'],
+            ['select_pending_registrations', 'select_pending_registrations_page']),
+    ]
+
+def collect_queries(schema):
+    queries = {}
+    for name, query in generate_sql_queries(schema).items():
+        queries[f"sql_dovecot.{name}"] = query
+    for name, query in config['sql'].items():
+        queries[f"sql.{name}"] = query
+    return queries
+
+def explain_query(query, schema):
+    """EXPLAIN one statement, return its plan rows (None when not explainable)"""
+    statement = " ".join(query.format_map(_Placeholders(schema)).split())
+    
+    if statement.split(' ', 1)[0].upper() not in ('SELECT', 'UPDATE', 'DELETE'):
+        return None
+    
+    params = tuple([EXPLAIN_PARAM] * statement.count('%s'))
+    return fetch_all(f"EXPLAIN {statement}", params)
+
+def find_full_scans(queries, schema):
+    findings = []
+    
+    for name, query in sorted(queries.items()):
+        try:
+            plan = explain_query(query, schema)
+        except Exception as e:
+            findings.append({'query': name, 'error': str(e)})
+            continue
+        
+        for row in plan or []:
+            scan_type = (row.get('type') or '').upper()
+            
+            # ALL: full table scan, INDEX: full index scan
+            if scan_type in ('ALL', 'INDEX'):
+                findings.append({
+                    'query': name,
+                    'table': row.get('table'),
+                    'type': scan_type,
+                    'rows': row.get('rows'),
+                    'possible_keys': row.get('possible_keys'),
+                })
+    
+    return findings
+
+def existing_index_prefixes(table):
+    """Column lists of every index on a table"""
+    indexes = {}
+    for row in fetch_all(config['sql']['select_table_indexes'], (table,)):
+        indexes.setdefault(row['index_name'], []).append(row['column_name'].lower())
+    return list(indexes.values())
+
+def index_name(table, columns):
+    return f"pma_idx_{table}_{'_'.join(columns)}"[:64]
+
+def find_missing_indexes(schema):
+    missing = []
+    
+    for table, columns, served in recommended_indexes(schema):
+        wanted = [c.lower() for c in columns]
+        
+        try:
+            existing = existing_index_prefixes(table)
+        except Exception as e:
+            logging.error(f"Error reading indexes of {table}: {e}")
+            continue
+        
+        # An index whose leftmost columns match serves the same lookups
+        if any(cols[:len(wanted)] == wanted for cols in existing):
+            continue
+        
+        column_list = ", ".join(f"`{c}`" for c in columns)
+        missing.append({
+            'table': table,
+            'columns': columns,
+            'queries': served,
+            'ddl': f"CREATE INDEX `{index_name(table, columns)}` ON `{table}` ({column_list})",
+        })
+    
+    return missing
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Report full scans and missing indexes for pymailadmin queries")
+    parser.add_argument('--apply', action='store_true', help="Create the missing indexes")
+    parser.add_argument('--json', action='store_true', help="Print the report as JSON")
+    args = parser.parse_args(argv)
+
+    if config['db'].get('driver') != 'mysql':
+        print("The index advisor reads MySQL/MariaDB EXPLAIN output: run it with DB_DRIVER=mysql", file=sys.stderr)
+        return 1
+
+    schema = load_db_schema()
+    scans = find_full_scans(collect_queries(schema), schema)
+    missing = find_missing_indexes(schema)
+    applied = []
+    
+    if args.apply:
+        for index in missing:
+            try:
+                execute_query(index['ddl'])
+                applied.append(index['ddl'])
+            except Exception as e:
+                logging.error(f"Failed: {index['ddl']} | {e}")
+
+    if args.json:
+        print(json.dumps({'full_scans': scans, 'missing_indexes': missing, 'applied': applied}, indent=2, default=str))
+        return 0
+
+    print("Full scans (EXPLAIN type ALL/index):")
+    for finding in scans:
+        if 'error' in finding:
+            print(f"  {finding['query']}: EXPLAIN failed: {finding['error']}")
+        else:
+            print(f"  {finding['query']}: {finding['type']} on {finding['table']} (~{finding['rows']} rows, possible keys: {finding['possible_keys']})")
+    if not scans:
+        print("  none")
+
+    print("\nMissing indexes:")
+    for index in missing:
+        print(f"  {index['ddl']};  -- {', '.join(index['queries'])}")
+    if not missing:
+        print("  none")
+
+    if args.apply:
+        print(f"\nApplied {len(applied)}/{len(missing)} indexes.")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
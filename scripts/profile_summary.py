@@ -0,0 +1,82 @@
+# scripts/profile_summary.py
+#
+# Summarize the request profiles written by middleware/profiler.py.
+#
+# From the pymailadmin directory:
+#   python3 -m scripts.profile_summary                    # hot functions, all profiles
+#   python3 -m scripts.profile_summary --route home --sort tottime --limit 40
+#   python3 -m scripts.profile_summary --list             # profiles, slowest first
+#   python3 -m scripts.profile_summary sign <session_id cookie value>
+#
+# `sign` prints the X-Pymailadmin-Profile header value that forces profiling
+# of the requests of that (super_admin) session.
+
+import argparse
+import glob
+import os
+import pstats
+import re
+import sys
+
+from libs import config
+from middleware.profiler import profile_token
+
+SORT_KEYS = ('cumulative', 'tottime', 'ncalls')
+
+def find_profiles(profile_dir, route=None):
+    paths = glob.glob(os.path.join(profile_dir, '*.prof'))
+    if route:
+        route = re.sub(r'[^A-Za-z0-9]+', '_', route).strip('_')
+        paths = [path for path in paths if f"-{route}-" in os.path.basename(path)]
+    return sorted(paths)
+
+def profile_duration_ms(path):
+    match = re.search(r'-(\d+)ms\.prof$', path)
+    return int(match.group(1)) if match else 0
+
+def summarize(paths, sort, limit):
+    stats = pstats.Stats(paths[0])
+    for path in paths[1:]:
+        try:
+            stats.add(path)
+        except Exception as e:
+            print(f"Skipping {path}: {e}", file=sys.stderr)
+    stats.strip_dirs().sort_stats(sort).print_stats(limit)
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+
+    if argv[:1] == ['sign']:
+        if len(argv) != 2:
+            print("Usage: python3 -m scripts.profile_summary sign <session_id cookie value>", file=sys.stderr)
+            return 1
+        # The cookie is "<session id>.<signature>"
+        session_id = argv[1].rsplit('.', 1)[0]
+        print(f"X-Pymailadmin-Profile: {profile_token(session_id)}")
+        return 0
+
+    parser = argparse.ArgumentParser(description="Hot functions across pymailadmin request profiles")
+    parser.add_argument('--dir', default=config['profiler']['dir'], help="Profile directory")
+    parser.add_argument('--route', help="Only profiles of this route (e.g. /home)")
+    parser.add_argument('--sort', choices=SORT_KEYS, default='cumulative', help="Sort key")
+    parser.add_argument('--limit', type=int, default=25, help="Number of functions to show")
+    parser.add_argument('--list', action='store_true', help="List profiles, slowest first")
+    args = parser.parse_args(argv)
+
+    paths = find_profiles(args.dir, args.route)
+    if not paths:
+        print(f"No profiles found in {args.dir}")
+        return 1
+
+    if args.list:
+        for path in sorted(paths, key=profile_duration_ms, reverse=True):
+            print(f"{profile_duration_ms(path):>8} ms  {os.path.basename(path)}")
+        return 0
+
+    durations = [profile_duration_ms(path) for path in paths]
+    print(f"{len(paths)} profiles, {sum(durations) / len(durations):.0f} ms average, {max(durations)} ms max\n")
+    summarize(paths, args.sort, args.limit)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
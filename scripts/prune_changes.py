@@ -0,0 +1,35 @@
+# scripts/prune_changes.py
+#
+# Delete the change feed rows (utils/changes.py) every connector has
+# acknowledged, once older than CHANGES_RETENTION_DAYS, and show where each
+# connector stands. Nothing is deleted until a connector acknowledged once.
+#
+# From the pymailadmin directory, e.g. from a nightly cron job:
+#   python3 -m scripts.prune_changes
+#   python3 -m scripts.prune_changes --status
+#   python3 -m scripts.prune_changes --retention-days 1
+
+import argparse
+import sys
+
+from utils.changes import cursors, last_change_id, prune_changes
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Prune the acknowledged change feed")
+    parser.add_argument('--status', action='store_true', help="Only show each connector's cursor and lag")
+    parser.add_argument('--retention-days', type=int, help="Override CHANGES_RETENTION_DAYS")
+    args = parser.parse_args(argv)
+
+    last_id = last_change_id()
+    for row in cursors():
+        print(f"{row['consumer']}\t{row['last_id']}\t{last_id - row['last_id']} behind\t{row['updated_at']}")
+
+    if args.status:
+        return 0
+
+    deleted = prune_changes(args.retention_days)
+    print(f"{deleted} change(s) pruned", file=sys.stderr)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+# scripts/pymailadmin-cron.py
+#
+# pymailadmin connector, run on the Dovecot server. The setup wizard fills in
+# the {PLACEHOLDERS} below (routes/initial_setup.py, generate_cron_script).
+#
+# pymailadmin logs every write on the mailboxes and aliases in an append-only
+# table, pymailadmin_changes. This connector reads the changes after its
+# cursor, applies them to Dovecot and acknowledges each page once applied, so
+# a run costs a primary key range read instead of a scan of the users table:
+#
+#   - mailbox created, updated or enabled: its auth cache entry is flushed
+#   - mailbox disabled or deleted: its entry is flushed and its sessions kicked
+#   - aliases: nothing to do for Dovecot, acknowledged only
+#
+# Several changes of one mailbox in a page are applied once, as the last one.
+# A page that fails is not acknowledged and is retried by the next run:
+# every action is safe to repeat.
+#
+# Modes:
+#   pymailadmin-cron.py                  poll: apply pending changes and exit (cron)
+#   pymailadmin-cron.py --follow         keep running, check for changes every --interval seconds
+#   PYMAILADMIN_API_KEY=pma_... pymailadmin-cron.py --longpoll https://mailadmin.example.org
+#                                        keep running, long-poll /api/v1/changes (super_admin key)
+#
+# The cursor is stored in pymailadmin_change_cursors under --consumer (the
+# host name by default), by the database or through the API.
+
+import argparse
+import json
+import logging
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.parse
+import urllib.request
+
+DB_HOST = "{DB_HOST}"
+DB_USER = "{DB_USER}"
+DB_PASSWORD = "{DB_PASSWORD}"
+DB_NAME = "{DB_NAME}"
+
+DOVEADM = "/usr/bin/doveadm"
+
+# Changes per page, and per acknowledgement
+PAGE_SIZE = 500
+
+# Changes are read once this many seconds old, as CHANGES_SETTLE_SECONDS on
+# the pymailadmin side: a write committed later than its id would be skipped
+SETTLE_SECONDS = 5
+
+# Longest server-side wait of a long-poll request, in seconds
+LONGPOLL_WAIT = 25
+
+KICK_ACTIONS = ('disable', 'delete')
+
+# --- Applying changes to Dovecot ---
+def doveadm(*args):
+    result = subprocess.run([DOVEADM, *args], capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"doveadm {' '.join(args)}: {result.stderr.strip() or result.returncode}")
+
+def apply_changes(changes):
+    """One page of changes, oldest first. Raises if Dovecot refused one."""
+    mailboxes = {}
+    for change in changes:
+        if change['entity'] == 'mailbox':
+            # Later changes of the same mailbox win
+            mailboxes.pop(change['object'], None)
+            mailboxes[change['object']] = change['action']
+
+    if not mailboxes:
+        return
+
+    doveadm('auth', 'cache', 'flush', *mailboxes)
+
+    for email, action in mailboxes.items():
+        if action in KICK_ACTIONS:
+            doveadm('kick', email)
+
+    logging.info(f"Applied {len(changes)} change(s): {len(mailboxes)} mailbox(es) flushed")
+
+# --- Poll: the database ---
+class DatabaseFeed:
+    def __init__(self, consumer):
+        import MySQLdb
+        import MySQLdb.cursors
+        self.consumer = consumer
+        self.connection = MySQLdb.connect(
+            host=DB_HOST, user=DB_USER, passwd=DB_PASSWORD, db=DB_NAME,
+            charset='utf8mb4', cursorclass=MySQLdb.cursors.DictCursor
+        )
+
+    def query(self, sql, params=()):
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+        finally:
+            cursor.close()
+        self.connection.commit()
+        return rows
+
+    def cursor(self):
+        rows = self.query("SELECT last_id FROM pymailadmin_change_cursors WHERE consumer = %s", (self.consumer,))
+        return rows[0]['last_id'] if rows else 0
+
+    def read(self, cursor, wait=0, interval=1):
+        """Changes after cursor; with wait, check MAX(id) every interval seconds until one shows up"""
+        deadline = time.monotonic() + wait
+        while wait and self.query(
+            "SELECT COALESCE(MAX(id), 0) AS last_id FROM pymailadmin_changes WHERE created_at <= NOW() - INTERVAL %s SECOND",
+            (SETTLE_SECONDS,)
+        )[0]['last_id'] <= cursor:
+            if time.monotonic() >= deadline:
+                return []
+            time.sleep(interval)
+
+        return self.query(
+            "SELECT id, entity, action, object FROM pymailadmin_changes "
+            "WHERE id > %s AND created_at <= NOW() - INTERVAL %s SECOND ORDER BY id LIMIT %s",
+            (cursor, SETTLE_SECONDS, PAGE_SIZE)
+        )
+
+    def ack(self, last_id):
+        self.query(
+            "INSERT INTO pymailadmin_change_cursors (consumer, last_id) VALUES (%s, %s) "
+            "ON DUPLICATE KEY UPDATE last_id = GREATEST(last_id, VALUES(last_id))",
+            (self.consumer, last_id)
+        )
+
+# --- Long-poll: the pymailadmin API ---
+class ApiFeed:
+    def __init__(self, consumer, base_url, api_key):
+        self.consumer = consumer
+        self.base_url = base_url.rstrip('/') + '/api/v1/changes'
+        self.api_key = api_key
+
+    def request(self, url, body=None, timeout=30):
+        headers = {'Authorization': f"Bearer {self.api_key}"}
+        if body is not None:
+            body = json.dumps(body).encode('utf-8')
+            headers['Content-Type'] = 'application/json'
+        with urllib.request.urlopen(urllib.request.Request(url, data=body, headers=headers), timeout=timeout) as response:
+            return json.loads(response.read())
+
+    def cursor(self):
+        # None: the first request resumes after this consumer's acknowledged cursor
+        return None
+
+    def read(self, cursor, wait=0, interval=1):
+        position = f"consumer={urllib.parse.quote(self.consumer)}" if cursor is None else f"cursor={cursor}"
+        data = self.request(f"{self.base_url}?{position}&limit={PAGE_SIZE}&wait={wait}", timeout=wait + 30)
+        return data['items']
+
+    def ack(self, last_id):
+        self.request(f"{self.base_url}/ack", {'consumer': self.consumer, 'cursor': last_id})
+
+def drain(feed, cursor, wait=0, interval=1):
+    """Apply and acknowledge pages until none is left. Returns the new cursor."""
+    while True:
+        changes = feed.read(cursor, wait, interval)
+        if not changes:
+            return cursor
+
+        apply_changes(changes)
+        cursor = changes[-1]['id']
+        feed.ack(cursor)
+
+        # Only the first read of a round waits
+        wait = 0
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply pymailadmin changes to Dovecot")
+    parser.add_argument('--consumer', default=socket.gethostname()[:64], help="Cursor name (default: host name)")
+    parser.add_argument('--follow', action='store_true', help="Keep running, polling the database")
+    parser.add_argument('--interval', type=float, default=1.0, help="Seconds between database checks with --follow")
+    parser.add_argument('--longpoll', metavar='URL', help="Keep running, long-polling the pymailadmin API at URL")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+
+    if args.longpoll:
+        api_key = os.environ.get('PYMAILADMIN_API_KEY', '')
+        if not api_key:
+            logging.error("--longpoll needs a super_admin API key in PYMAILADMIN_API_KEY")
+            return 1
+        feed = ApiFeed(args.consumer, args.longpoll, api_key)
+    else:
+        feed = DatabaseFeed(args.consumer)
+
+    cursor = feed.cursor()
+
+    if not (args.follow or args.longpoll):
+        try:
+            drain(feed, cursor)
+        except Exception as e:
+            logging.error(f"Pending changes not applied, retried next run: {e}")
+            return 1
+        return 0
+
+    while True:
+        try:
+            if args.longpoll:
+                cursor = drain(feed, cursor, wait=LONGPOLL_WAIT)
+            else:
+                cursor = drain(feed, cursor, wait=60, interval=args.interval)
+        except Exception as e:
+            logging.error(f"Changes after {cursor or 'the acknowledged cursor'} not applied, retrying: {e}")
+            time.sleep(5)
+            if not args.longpoll:
+                try:
+                    feed = DatabaseFeed(args.consumer)
+                except Exception as e:
+                    logging.error(f"Database unreachable: {e}")
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,67 @@
+# scripts/reconcile_counters.py
+#
+# Compare the limit counters (utils/counters.py) with real counts and fix
+# the ones that drifted, e.g. after mailboxes or aliases were written
+# directly in the Dovecot tables. Safe to run while pymailadmin serves:
+# a drifted counter is recomputed by the same query that first seeds it.
+#
+# From the pymailadmin directory, e.g. from a nightly cron job:
+#   python3 -m scripts.reconcile_counters
+#   python3 -m scripts.reconcile_counters --dry-run
+
+import argparse
+import sys
+
+from libs import config
+from utils.db import iter_rows, transaction
+
+# Counters fixed per transaction
+FIX_CHUNK = 500
+
+# name -> (true counts, stored counters, delete query, seed query)
+COUNTERS = {
+    'mailboxes': ('count_mailboxes_by_owner_all', 'select_all_mailbox_counts', 'delete_mailbox_count', 'seed_mailbox_count'),
+    'aliases': ('count_aliases_by_destination_all', 'select_all_alias_counts', 'delete_alias_count', 'seed_alias_count'),
+}
+
+def load_counts(query):
+    return {row['key']: row['count'] for row in iter_rows(query)}
+
+def find_drift(name):
+    """(key, stored, actual) of the stored counters that are wrong"""
+    count_query, stored_query, _, _ = COUNTERS[name]
+    actual = load_counts(config['sql_dovecot'][count_query])
+    stored = load_counts(config['sql'][stored_query])
+    return [(key, count, actual.get(key, 0)) for key, count in stored.items() if count != actual.get(key, 0)]
+
+def fix(name, keys):
+    """Drop the counters then seed them again from a real count"""
+    _, _, delete_query, seed_query = COUNTERS[name]
+    for start in range(0, len(keys), FIX_CHUNK):
+        chunk = keys[start:start + FIX_CHUNK]
+        with transaction() as tx:
+            tx.execute_many(config['sql'][delete_query], [(key,) for key in chunk])
+            tx.execute_many(config['sql_dovecot'][seed_query], [(key, key) for key in chunk])
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check and fix the mailbox and alias counters")
+    parser.add_argument('--dry-run', action='store_true', help="Report drift without fixing it")
+    args = parser.parse_args(argv)
+
+    total = 0
+    for name in COUNTERS:
+        drift = find_drift(name)
+        total += len(drift)
+
+        for key, stored, actual in drift:
+            print(f"{name}\t{key}\t{stored} -> {actual}")
+
+        if drift and not args.dry_run:
+            fix(name, [key for key, _, _ in drift])
+
+        print(f"{name}: {len(drift)} counter(s) {'drifted' if args.dry_run else 'fixed'}", file=sys.stderr)
+
+    return 1 if total and args.dry_run else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,247 @@
+# utils/alias_bulk.py
+#
+# Bulk alias management for routes/alias_bulk.py: add or delete hundreds of
+# aliases, or move every alias of a mailbox to another one in its domain.
+#
+# Each operation costs a fixed number of queries whatever the number of
+# lines: existing sources with one `source IN (...)` query, destinations
+# with one `email IN (...)`, max_aliases_per_mailbox with the counter rows
+# (utils/counters.py), then all the writes and counter updates with
+# executemany in one transaction.
+
+import re
+from collections import namedtuple, Counter
+
+from libs import config, translations
+from utils.alias_limits import get_max_aliases
+from utils.changes import record_changes
+from utils.counters import alias_counts, seed_alias_counts, adjust_alias_counts
+from utils.db import fetch_all, transaction
+from utils.ownership import get_owned_user_ids
+from utils.versions import bump_versions, domain_scope, admin_scope
+
+# Same rule as the alias forms
+SOURCE_LOCAL_RE = re.compile(r'^[a-z0-9_-]{8,}$')
+
+# "source destination", "source,destination", "source -> destination"
+PAIR_SEPARATOR_RE = re.compile(r'\s*(?:->|→|,|;|\s)\s*')
+
+# Values per IN (...) list
+IN_CHUNK = 500
+
+LineError = namedtuple('LineError', ['line', 'value', 'message'])
+
+def placeholders(values):
+    return ", ".join(["%s"] * len(values))
+
+def fetch_in(query_name, key, values):
+    """Rows of a {key} IN (...) query over any number of values"""
+    rows = []
+    values = list(values)
+    for start in range(0, len(values), IN_CHUNK):
+        chunk = values[start:start + IN_CHUNK]
+        query = config['sql_dovecot'][query_name].format(**{key: placeholders(chunk)})
+        rows.extend(fetch_all(query, tuple(chunk)))
+    return rows
+
+def input_lines(text):
+    """(line number, stripped line) of the non-empty, non-comment lines"""
+    for number, line in enumerate(text.splitlines(), start=1):
+        line = line.strip()
+        if line and not line.startswith('#'):
+            yield number, line
+
+def check_size(lines):
+    max_lines = config['limits']['max_bulk_aliases']
+    if len(lines) > max_lines:
+        raise ValueError(translations['alias_bulk_too_many'].format(max=max_lines))
+
+class BulkAliases:
+    """Operations on behalf of one admin (super_admin: no ownership checks)"""
+
+    def __init__(self, admin_user_id, admin_role):
+        self.admin_user_id = admin_user_id
+        self.admin_role = admin_role
+        self.errors = []
+        self.done = 0
+
+    def error(self, line, value, key, **values):
+        self.errors.append(LineError(line, value, translations[key].format(**values)))
+
+    def owns(self, user_id):
+        if self.admin_role == 'super_admin':
+            return True
+        return user_id in get_owned_user_ids(self.admin_user_id)
+
+    def mailboxes(self, emails):
+        """email -> mailbox row, for the existing ones"""
+        return {row['email'].lower(): row for row in fetch_in('select_user_ids_by_email_in', 'emails', set(emails))}
+
+    def alias_counts(self, destinations):
+        return {destination.lower(): count for destination, count in alias_counts(destinations).items()}
+
+    def bump(self, domain_ids):
+        if domain_ids:
+            bump_versions(admin_scope(self.admin_user_id), *{domain_scope(d) for d in domain_ids})
+
+    # --- Multi-add ---
+    def add(self, text):
+        """Lines of "source destination" """
+        lines = list(input_lines(text))
+        check_size(lines)
+        pairs = []
+
+        for line, value in lines:
+            parts = PAIR_SEPARATOR_RE.split(value, maxsplit=1)
+            if len(parts) != 2:
+                self.error(line, value, 'alias_bulk_error_format')
+                continue
+            pairs.append((line, parts[0], parts[1]))
+
+        return self.add_pairs(pairs)
+
+    def add_pairs(self, numbered_pairs):
+        """(line, source, destination); source is a local part or an address in the destination's domain"""
+        check_size(numbered_pairs)
+        pairs = []
+
+        for line, source, destination in numbered_pairs:
+            source, destination = source.strip().lower(), destination.strip().lower()
+            if '@' not in destination:
+                self.error(line, f"{source} {destination}".strip(), 'alias_bulk_error_format')
+                continue
+
+            domain_part = destination.split('@', 1)[1]
+            local_part, _, source_domain = source.partition('@')
+
+            if not SOURCE_LOCAL_RE.match(local_part) or (source_domain and source_domain != domain_part):
+                self.error(line, source, 'alias_bulk_error_source')
+                continue
+
+            pairs.append((line, f"{local_part}@{domain_part}", destination))
+
+        mailboxes = self.mailboxes(destination for _, _, destination in pairs)
+        existing = {row['source'].lower() for row in fetch_in('select_aliases_by_source_in', 'sources', {source for _, source, _ in pairs})}
+        counts = self.alias_counts(mailboxes)
+        max_aliases = get_max_aliases()
+
+        rows = []
+        seen = set()
+        added = Counter()
+
+        for line, source, destination in pairs:
+            mailbox = mailboxes.get(destination)
+
+            if mailbox is None:
+                self.error(line, source, 'destination_unknown')
+            elif not self.owns(mailbox['id']):
+                self.error(line, source, 'ownership_required')
+            elif source in existing or source in seen:
+                self.error(line, source, 'alias_exists')
+            elif counts.get(destination, 0) + added[destination] >= max_aliases:
+                self.error(line, source, 'error_alias_limit_exceeded', count=max_aliases)
+            else:
+                seen.add(source)
+                added[destination] += 1
+                rows.append((mailbox['domain_id'], source, destination))
+
+        if rows:
+            with transaction() as tx:
+                seed_alias_counts(tx, added)
+                tx.execute_many(config['sql_dovecot']['insert_alias'], rows)
+                adjust_alias_counts(tx, added)
+                record_changes(tx, 'alias', 'create', [source for _, source, _ in rows])
+            self.bump({domain_id for domain_id, _, _ in rows})
+
+        self.done = len(rows)
+        self.errors.sort(key=lambda e: e.line)
+        return self
+
+    # --- Multi-delete ---
+    def delete(self, text):
+        """Lines of alias addresses"""
+        return self.delete_sources(list(input_lines(text)))
+
+    def delete_sources(self, numbered_sources):
+        """(line, alias address) pairs"""
+        check_size(numbered_sources)
+
+        sources = [(line, value.strip().lower()) for line, value in numbered_sources]
+        aliases = {row['source'].lower(): row for row in fetch_in('select_aliases_by_source_in', 'sources', {s for _, s in sources})}
+        mailboxes = self.mailboxes(row['destination'].lower() for row in aliases.values()) if self.admin_role != 'super_admin' else {}
+
+        rows = []
+        seen = set()
+
+        for line, source in sources:
+            alias = aliases.get(source)
+
+            if alias is None:
+                self.error(line, source, 'alias_not_found')
+                continue
+
+            if self.admin_role != 'super_admin':
+                mailbox = mailboxes.get(alias['destination'].lower())
+                if mailbox is None or not self.owns(mailbox['id']):
+                    self.error(line, source, 'ownership_required')
+                    continue
+
+            if alias['id'] not in seen:
+                seen.add(alias['id'])
+                rows.append(alias)
+
+        if rows:
+            removed = Counter(alias['destination'] for alias in rows)
+            with transaction() as tx:
+                seed_alias_counts(tx, removed)
+                tx.execute_many(config['sql_dovecot']['delete_alias'], [(alias['id'],) for alias in rows])
+                adjust_alias_counts(tx, {destination: -count for destination, count in removed.items()})
+                record_changes(tx, 'alias', 'delete', [alias['source'] for alias in rows])
+            self.bump({alias['domain_id'] for alias in rows})
+
+        self.done = len(rows)
+        return self
+
+    # --- Domain-wide rewrite ---
+    def rewrite(self, old_destination, new_destination):
+        """Point every alias of old_destination at new_destination, in the same domain"""
+        old_destination = old_destination.strip().lower()
+        new_destination = new_destination.strip().lower()
+        mailboxes = self.mailboxes([old_destination, new_destination])
+        old, new = mailboxes.get(old_destination), mailboxes.get(new_destination)
+
+        if old is None or new is None:
+            self.error(0, new_destination if old else old_destination, 'destination_unknown')
+            return self
+
+        if old['domain_id'] != new['domain_id'] or old_destination == new_destination:
+            self.error(0, new_destination, 'alias_bulk_error_rewrite_domain')
+            return self
+
+        if not self.owns(old['id']) or not self.owns(new['id']):
+            self.error(0, new_destination, 'ownership_required')
+            return self
+
+        counts = self.alias_counts([old_destination, new_destination])
+        max_aliases = get_max_aliases()
+
+        if counts.get(old_destination, 0) + counts.get(new_destination, 0) > max_aliases:
+            self.error(0, new_destination, 'error_alias_limit_exceeded', count=max_aliases)
+            return self
+
+        # execute_many() for the row count: execute() returns lastrowid
+        with transaction() as tx:
+            seed_alias_counts(tx, [old_destination, new_destination])
+            sources = tx.fetch_all(
+                config['sql_dovecot']['select_alias_sources_by_destination_in_domain'],
+                (old['domain_id'], old_destination)
+            )
+            self.done = tx.execute_many(
+                config['sql_dovecot']['update_alias_destination_in_domain'],
+                [(new_destination, old['domain_id'], old_destination)]
+            )
+            adjust_alias_counts(tx, {old_destination: -self.done, new_destination: self.done})
+            record_changes(tx, 'alias', 'update', [row['source'] for row in sources])
+
+        self.bump({old['domain_id']})
+        return self
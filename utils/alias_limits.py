@@ -1,6 +1,6 @@
 # utils/alias_limits.py
 
-from utils.db import fetch_all
+from utils.counters import alias_count
 from libs import config
 
 def get_max_aliases():
@@ -12,13 +12,10 @@ def get_max_aliases():
 
 def get_alias_count(destination_email):
     """
-    Count aliases for a given mailbox (destination).
+    Count aliases for a given mailbox (destination), from its counter row
+    (utils/counters.py).
     """
-    result = fetch_all(
-        config['sql_dovecot']['count_aliases_by_mailbox'], 
-        (destination_email,)
-    )
-    return result[0]['count'] if result else 0
+    return alias_count(destination_email)
 
 def can_create_alias(destination_email):
     """
@@ -0,0 +1,39 @@
+# utils/api_keys.py
+#
+# Keys for /api/v1, each tied to a row of pymailadmin_admin_users and acting
+# with its role and ownerships. The key itself is only shown once, at
+# creation: the table holds its SHA-256, which is all a request needs to
+# find the admin (one indexed query, no session).
+
+import hashlib
+import secrets
+
+from libs import config, fetch_all, execute_query
+
+KEY_PREFIX = 'pma_'
+
+def hash_key(key):
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+def create_api_key(admin_user_id, name=''):
+    """Store a new key for that admin and return it"""
+    key = KEY_PREFIX + secrets.token_urlsafe(32)
+    execute_query(config['sql']['insert_api_key'], (admin_user_id, name, hash_key(key)))
+    return key
+
+def revoke_api_key(key_id):
+    execute_query(config['sql']['delete_api_key'], (key_id,))
+
+def list_api_keys():
+    return fetch_all(config['sql']['select_api_keys'], ())
+
+def authenticate(environ):
+    """Admin (id, email, role) of the request's Bearer key, None if missing, unknown or inactive"""
+    scheme, _, key = environ.get('HTTP_AUTHORIZATION', '').partition(' ')
+    key = key.strip()
+
+    if scheme.lower() != 'bearer' or not key.startswith(KEY_PREFIX):
+        return None
+
+    admin = fetch_all(config['sql']['select_api_key_admin'], (hash_key(key),))
+    return admin[0] if admin else None
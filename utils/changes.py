@@ -0,0 +1,107 @@
+# utils/changes.py
+#
+# Append-only feed of the changes made to the Dovecot tables, so the
+# connector on the Dovecot server (scripts/pymailadmin-cron.py) only reads
+# what changed since its cursor instead of rescanning the users table.
+#
+# Writers log the change inside the transaction of the write itself, so a
+# rolled back write never shows up in the feed:
+#
+#   with transaction() as tx:
+#       tx.execute(config['sql_dovecot']['insert_alias'], ...)
+#       record_changes(tx, 'alias', 'create', [source])
+#
+# Consumers read pages of (id, entity, action, object) after their cursor and
+# acknowledge the last id of each page they applied.
+#
+# Ids are taken at insert time but become visible at commit, so concurrent
+# writes can show up out of id order: a consumer that acknowledged id N+1
+# before id N was committed would never see N. Changes are therefore only
+# handed out once CHANGES_SETTLE_SECONDS old: every change whose transaction
+# committed within that delay is delivered, in id order. Rows acknowledged by
+# every consumer and older than CHANGES_RETENTION_DAYS are pruned by
+# python3 -m scripts.prune_changes.
+
+import time
+
+from libs import config
+from utils.db import fetch_all, execute_query, execute_many
+
+# What a change is about, and what happened to it. `object` is the email of
+# a mailbox or the source of an alias.
+ENTITIES = ('mailbox', 'alias')
+ACTIONS = ('create', 'update', 'disable', 'enable', 'delete')
+
+# Rows per DELETE when pruning
+PRUNE_CHUNK = 5000
+
+# --- Writers, inside a transaction ---
+def record_changes(tx, entity, action, objects):
+    rows = [(entity, action, obj) for obj in dict.fromkeys(objects) if obj]
+    if rows:
+        tx.execute_many(config['sql']['insert_change'], rows)
+
+def record_change(tx, entity, action, obj):
+    record_changes(tx, entity, action, [obj])
+
+# --- Consumers ---
+def settle_seconds():
+    return config['changes'].get('settle_seconds', 5)
+
+def last_change_id():
+    """Id of the last change old enough to be handed out"""
+    return fetch_all(config['sql']['select_last_change_id'], (settle_seconds(),))[0]['last_id']
+
+def changes_since(cursor, limit=None):
+    """Up to `limit` settled changes after id `cursor`, oldest first"""
+    limit = limit or config['changes']['page_size']
+    return fetch_all(config['sql']['select_changes_since'], (cursor, settle_seconds(), limit))
+
+def wait_for_changes(cursor, timeout, limit=None):
+    """
+    Long-poll: changes after `cursor`, waiting up to `timeout` seconds for
+    the first one. While waiting, only MAX(id) is read, every
+    CHANGES_POLL_INTERVAL seconds. Returns [] on timeout.
+    """
+    deadline = time.monotonic() + min(timeout, config['changes']['longpoll_timeout'])
+
+    while True:
+        if last_change_id() > cursor:
+            return changes_since(cursor, limit)
+
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return []
+        time.sleep(min(config['changes']['poll_interval'], remaining))
+
+def acknowledge(consumer, last_id):
+    """Move the consumer's cursor forward to last_id (never backwards)"""
+    execute_query(config['sql']['ack_change_cursor'], (consumer, last_id))
+
+def cursors():
+    return fetch_all(config['sql']['select_change_cursors'], ())
+
+def cursor_of(consumer):
+    for row in cursors():
+        if row['consumer'] == consumer:
+            return row['last_id']
+    return 0
+
+def prune_changes(retention_days=None):
+    """
+    Delete the changes every consumer acknowledged, once older than the
+    retention. Without any consumer yet, nothing is deleted. Returns the
+    number of rows deleted.
+    """
+    retention_days = config['changes']['retention_days'] if retention_days is None else retention_days
+    acked = [row['last_id'] for row in cursors()]
+
+    if not acked:
+        return 0
+
+    deleted = 0
+    while True:
+        count = execute_many(config['sql']['delete_changes_upto'], [(min(acked), retention_days, PRUNE_CHUNK)])
+        deleted += count
+        if count < PRUNE_CHUNK:
+            return deleted
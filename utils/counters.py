@@ -0,0 +1,79 @@
+# utils/counters.py
+#
+# Counters behind the limit checks: mailboxes per admin (ownerships joined
+# to existing users) and aliases per destination. A check is one primary
+# key read instead of a COUNT over ownerships/users or the alias table.
+#
+# Writers keep them in step inside their own transaction:
+#
+#   with transaction() as tx:
+#       seed_alias_counts(tx, [destination])      # before the write
+#       tx.execute(config['sql_dovecot']['insert_alias'], ...)
+#       adjust_alias_counts(tx, {destination: 1})  # after it
+#
+# A missing row is created from a real COUNT on first use, so counters
+# never need a migration step. Writes done outside pymailadmin make them
+# drift: python3 -m scripts.reconcile_counters puts them back.
+
+from libs import config
+from utils.db import fetch_all, transaction
+
+# Destinations per IN (...) list
+IN_CHUNK = 500
+
+# --- Writers, inside a transaction ---
+def seed_mailbox_counts(tx, admin_user_ids):
+    """Create the missing counters from the current ownerships, before the write"""
+    tx.execute_many(config['sql_dovecot']['seed_mailbox_count'], [(a, a) for a in set(admin_user_ids)])
+
+def seed_alias_counts(tx, destinations):
+    """Create the missing counters from the current aliases, before the write"""
+    tx.execute_many(config['sql_dovecot']['seed_alias_count'], [(d, d) for d in set(destinations)])
+
+def adjust_mailbox_counts(tx, deltas):
+    """{admin_user_id: +n/-n}, after the write"""
+    rows = [(delta, admin_user_id) for admin_user_id, delta in deltas.items() if delta]
+    if rows:
+        tx.execute_many(config['sql']['add_mailbox_count'], rows)
+
+def adjust_alias_counts(tx, deltas):
+    """{destination: +n/-n}, after the write"""
+    rows = [(delta, destination) for destination, delta in deltas.items() if delta]
+    if rows:
+        tx.execute_many(config['sql']['add_alias_count'], rows)
+
+# --- Readers ---
+def mailbox_count(admin_user_id):
+    """Mailboxes owned by admin_user_id"""
+    result = fetch_all(config['sql']['select_mailbox_count'], (admin_user_id,))
+
+    if not result:
+        with transaction() as tx:
+            seed_mailbox_counts(tx, [admin_user_id])
+        result = fetch_all(config['sql']['select_mailbox_count'], (admin_user_id,))
+
+    return result[0]['mailboxes'] if result else 0
+
+def _read_alias_counts(destinations):
+    counts = {}
+    for start in range(0, len(destinations), IN_CHUNK):
+        chunk = destinations[start:start + IN_CHUNK]
+        query = config['sql']['select_alias_counts_in'].format(destinations=", ".join(["%s"] * len(chunk)))
+        counts.update((row['destination'], row['aliases']) for row in fetch_all(query, tuple(chunk)))
+    return counts
+
+def alias_counts(destinations):
+    """destination -> aliases pointing to it, for each given destination"""
+    destinations = list(set(destinations))
+    counts = _read_alias_counts(destinations)
+    missing = [d for d in destinations if d not in counts]
+
+    if missing:
+        with transaction() as tx:
+            seed_alias_counts(tx, missing)
+        counts.update(_read_alias_counts(missing))
+
+    return counts
+
+def alias_count(destination):
+    return alias_counts([destination]).get(destination, 0)
@@ -1,30 +1,166 @@
 # utils/db.py
 
 import mysql.connector
-from mysql.connector import Error
-from libs import config
+from mysql.connector import Error as MySQLError
+import sqlite3
+from libs import config, register_reload_hook
+from utils import metrics
+from utils import db_sqlite
+from utils.db_pool import get_pool, pool_stats, PoolTimeout
 from datetime import datetime, timedelta
+import contextlib
+import contextvars
 import json
 import logging
+import threading
+import time
+
+slow_query_log = logging.getLogger('pymailadmin.slow_query')
+
+# Errors raised by either driver
+Error = (MySQLError, sqlite3.Error)
+
+# --- Query instrumentation ---
+class QueryStats:
+    """Statements run while handling one request: (name, seconds, rows)"""
+
+    def __init__(self):
+        self.queries = []
+        # Connections the pool couldn't hand out in time
+        self.pool_timeouts = 0
+
+    @property
+    def count(self):
+        return len(self.queries)
+
+    @property
+    def total_time(self):
+        return sum(duration for _, duration, _ in self.queries)
+
+    def add(self, name, duration, rows):
+        self.queries.append((name, duration, rows))
+
+# Request-scoped collector, set by middleware/query_stats.py
+_query_stats = contextvars.ContextVar('pymailadmin_query_stats', default=None)
+
+def begin_query_stats(stats):
+    return _query_stats.set(stats)
+
+def end_query_stats(token):
+    _query_stats.reset(token)
+
+# SQL text -> config key, and template heads, built on first use and
+# dropped on each configuration reload: one tuple, swapped as a whole
+_query_lookup = None
+_query_names_lock = threading.Lock()
+
+def reset_query_names():
+    global _query_lookup
+    _query_lookup = None
+
+register_reload_hook(reset_query_names)
+
+def query_name(query):
+    """Config key of a statement (e.g. 'sql_dovecot.select_user_by_id'), else its first words"""
+    global _query_lookup
+
+    lookup = _query_lookup
+    if lookup is None:
+        with _query_names_lock:
+            names, templates = {}, []
+            for section in ('sql', 'sql_dovecot'):
+                for key, text in (config.get(section) or {}).items():
+                    names[text] = f"{section}.{key}"
+                    # Templates with {placeholders} are formatted before use: match on their head
+                    if '{' in text:
+                        templates.append((text.split('{', 1)[0], f"{section}.{key}"))
+            lookup = _query_lookup = (names, templates)
+
+    names, templates = lookup
+    name = names.get(query)
+    if name:
+        return name
+
+    for head, name in templates:
+        if query.startswith(head):
+            return name
+
+    return " ".join(query.split())[:60]
+
+def record_query(query, duration, rows):
+    stats = _query_stats.get()
+    name = None
+
+    if stats is not None:
+        name = query_name(query)
+        stats.add(name, duration, rows)
+
+    metrics.inc('pymailadmin_db_queries_total')
+    metrics.observe('pymailadmin_db_query_duration_seconds', duration)
+
+    threshold_ms = config['db'].get('slow_query_ms', 0)
+
+    if threshold_ms and duration * 1000 >= threshold_ms:
+        slow_query_log.warning(f"{duration * 1000:.1f} ms | {name or query_name(query)} | rows: {rows}")
+
+def record_pool_timeout():
+    stats = _query_stats.get()
+    if stats is not None:
+        stats.pool_timeouts += 1
+    metrics.inc('pymailadmin_db_pool_timeouts_total')
 
 # Database connection
-def get_db_connection():
+def connect_mysql(db_conf, options):
+    connection = mysql.connector.connect(
+        host=db_conf['host'],
+        database=db_conf['dbname'],
+        user=db_conf['username'],
+        password=db_conf['password'],
+        charset=db_conf.get('charset', 'utf8mb4'),
+        **{'autocommit': True, **options}
+    )
+    metrics.inc('pymailadmin_db_connections_opened_total')
+    return connection
+
+def get_db_connection(**options):
+    """
+    A connection for one statement or transaction; always close() it.
+    MySQL connections come from a per-process pool (DB_POOL_SIZE, 0 to
+    connect each time), SQLite ones are per thread. Raises PoolTimeout when
+    the pool stays exhausted (answered 503 by middleware/unavailable.py);
+    None only if the database can't be reached.
+    """
     try:
         db_conf = config['db']
-        connection = mysql.connector.connect(
-            host=db_conf['host'],
-            database=db_conf['dbname'],
-            user=db_conf['username'],
-            password=db_conf['password'],
-            charset=db_conf.get('charset', 'utf8mb4'),
-            autocommit=True
+        
+        if db_conf.get('driver') == 'sqlite':
+            return db_sqlite.connect(db_conf, **options)
+        
+        if db_conf.get('pool_size', 0) <= 0:
+            return connect_mysql(db_conf, options)
+        
+        # One pool for every caller, autocommit set per checkout
+        pool = get_pool(
+            lambda: connect_mysql(db_conf, {}),
+            db_conf['pool_size'],
+            db_conf.get('pool_timeout', 10)
         )
-        return connection
-    
+        try:
+            return pool.acquire(autocommit=options.get('autocommit', True))
+        except PoolTimeout:
+            record_pool_timeout()
+            raise
+
     except Error as e:
         logging.error(f"Error when connecting to database: {e}")
         return None
 
+metrics.register_gauge(
+    'pymailadmin_db_pool_connections',
+    'Pooled database connections by state (idle/in_use)',
+    lambda: {(('state', state),): count for state, count in pool_stats().items()}
+)
+
 # INSERT, UPDATE, DELETE requests execution
 def execute_query(query, params=None):
     connection = None
@@ -35,7 +171,9 @@ def execute_query(query, params=None):
         if connection is None:
             return None
         cursor = connection.cursor()
+        started = time.perf_counter()
         cursor.execute(query, params)
+        record_query(query, time.perf_counter() - started, cursor.rowcount)
         lastrowid = cursor.lastrowid
     except Error as e:
         logging.error(f"Error when executing SQL request: {query} | Params: {params} | Error: {e}")
@@ -59,8 +197,10 @@ def fetch_all(query, params=None):
         if connection is None:
             return results
         cursor = connection.cursor(dictionary=True)
+        started = time.perf_counter()
         cursor.execute(query, params)
         results = cursor.fetchall()
+        record_query(query, time.perf_counter() - started, len(results))
     except Error as e:
         logging.error(f"Error when fetching data: {query} | Params: {params} | Error: {e}")
         raise
@@ -70,3 +210,102 @@ def fetch_all(query, params=None):
         if connection and connection.is_connected():
             connection.close()
     return results
+
+# Stream results through an unbuffered (server-side) cursor
+def iter_rows(query, params=None, batch_size=500):
+    """
+    Yield rows as they arrive from the server instead of loading the whole
+    result set. The connection stays open until the generator is exhausted
+    or closed, so do not keep it suspended longer than a response.
+    """
+    connection = None
+    cursor = None
+    rows_read = 0
+    elapsed = 0.0
+    try:
+        connection = get_db_connection()
+        if connection is None:
+            return
+        cursor = connection.cursor(dictionary=True, buffered=False)
+        started = time.perf_counter()
+        cursor.execute(query, params)
+        elapsed += time.perf_counter() - started
+        while True:
+            # Only time spent waiting on the server counts, not the consumer
+            started = time.perf_counter()
+            rows = cursor.fetchmany(batch_size)
+            elapsed += time.perf_counter() - started
+            if not rows:
+                break
+            rows_read += len(rows)
+            yield from rows
+    except Error as e:
+        logging.error(f"Error when streaming data: {query} | Params: {params} | Error: {e}")
+        raise
+    finally:
+        if connection is not None:
+            record_query(query, elapsed, rows_read)
+        if cursor:
+            # Closed early: read the rest of the result, or the connection is unusable
+            if connection.unread_result:
+                connection.consume_results()
+            cursor.close()
+        if connection and connection.is_connected():
+            connection.close()
+
+# Several statements committed together
+class Transaction:
+    """Statements on one connection, see transaction()"""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def execute(self, query, params=None):
+        started = time.perf_counter()
+        self._cursor.execute(query, params)
+        record_query(query, time.perf_counter() - started, self._cursor.rowcount)
+        return self._cursor.lastrowid
+
+    def execute_many(self, query, seq_params):
+        """One statement for many rows (multi-row INSERT with mysql.connector)"""
+        seq_params = list(seq_params)
+        if not seq_params:
+            return 0
+        started = time.perf_counter()
+        self._cursor.executemany(query, seq_params)
+        record_query(query, time.perf_counter() - started, self._cursor.rowcount)
+        return self._cursor.rowcount
+
+    def fetch_all(self, query, params=None):
+        started = time.perf_counter()
+        self._cursor.execute(query, params)
+        results = self._cursor.fetchall()
+        record_query(query, time.perf_counter() - started, len(results))
+        return results
+
+@contextlib.contextmanager
+def transaction():
+    """
+    with transaction() as tx: tx.execute(...); tx.execute_many(...)
+    Committed when the block ends, rolled back if it raises.
+    """
+    connection = get_db_connection(autocommit=False)
+    if connection is None:
+        raise MySQLError("No database connection")
+
+    cursor = connection.cursor(dictionary=True)
+    try:
+        yield Transaction(cursor)
+        connection.commit()
+    except Exception as e:
+        logging.error(f"Transaction rolled back: {e}")
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+        connection.close()
+
+def execute_many(query, seq_params):
+    """execute_query() for many rows, in one transaction"""
+    with transaction() as tx:
+        return tx.execute_many(query, seq_params)
@@ -0,0 +1,148 @@
+# utils/db_pool.py
+#
+# Thread-safe MySQL connection pool for utils/db.py.
+#
+# mysql.connector's own pool fails immediately when it is exhausted; this one
+# makes the caller wait up to DB_POOL_TIMEOUT seconds, so a gthread worker
+# with more threads than connections degrades instead of erroring. The pool is
+# created lazily per process (workers fork after --preload) and shared by
+# every caller: DB_POOL_SIZE is the worker's whole MySQL connection budget.
+# Connections are pooled in autocommit mode; a caller that asks otherwise
+# gets it for its checkout only.
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+# Idle connections older than this are pinged before being handed out
+PING_AFTER_SECONDS = 5
+
+class PoolTimeout(Exception):
+    pass
+
+class PooledConnection:
+    """Proxy to a pooled connection: close() hands it back instead of closing it"""
+
+    def __init__(self, pool, connection, autocommit=True):
+        self._pool = pool
+        self._connection = connection
+        self._autocommit = autocommit
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+    def is_connected(self):
+        # Checked by the pool when handed out: no ping per query
+        return self._connection is not None
+
+    def close(self):
+        connection, self._connection = self._connection, None
+        if connection is not None:
+            self._pool.release(connection, restore_autocommit=not self._autocommit)
+
+class ConnectionPool:
+    def __init__(self, connect, size, timeout):
+        self._connect = connect
+        self.size = size
+        self.timeout = timeout
+        self._idle = deque()
+        self._in_use = 0
+        self._condition = threading.Condition()
+
+    def stats(self):
+        with self._condition:
+            return {'idle': len(self._idle), 'in_use': self._in_use}
+
+    def acquire(self, autocommit=True):
+        deadline = time.monotonic() + self.timeout
+
+        with self._condition:
+            while not self._idle and self._in_use >= self.size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolTimeout(f"No database connection available after {self.timeout}s ({self.size} in use)")
+                self._condition.wait(remaining)
+
+            self._in_use += 1
+            entry = self._idle.pop() if self._idle else None
+
+        try:
+            connection = None
+            if entry is not None:
+                connection, released_at = entry
+                if time.monotonic() - released_at >= PING_AFTER_SECONDS and not self._alive(connection):
+                    self._discard(connection)
+                    connection = None
+            if connection is None:
+                connection = self._connect()
+            if not autocommit:
+                connection.autocommit = False
+            return PooledConnection(self, connection, autocommit)
+        except Exception:
+            with self._condition:
+                self._in_use -= 1
+                self._condition.notify()
+            raise
+
+    def release(self, connection, restore_autocommit=False):
+        reusable = True
+        try:
+            # Never hand out a connection in the middle of a transaction
+            if connection.in_transaction:
+                connection.rollback()
+            if restore_autocommit:
+                connection.autocommit = True
+        except Exception as e:
+            logging.error(f"Discarding database connection: {e}")
+            reusable = False
+
+        with self._condition:
+            self._in_use -= 1
+            if reusable:
+                # LIFO: keep the warm connections busy, let the others time out
+                self._idle.append((connection, time.monotonic()))
+            self._condition.notify()
+
+        if not reusable:
+            self._discard(connection)
+
+    def _alive(self, connection):
+        try:
+            connection.ping(reconnect=False)
+            return True
+        except Exception:
+            return False
+
+    def _discard(self, connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def close_all(self):
+        with self._condition:
+            idle, self._idle = list(self._idle), deque()
+        for connection, _ in idle:
+            self._discard(connection)
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+def get_pool(connect, size, timeout):
+    """This process' pool, created on first use"""
+    global _pool, _pool_pid
+
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            # Inherited sockets belong to the parent: never reuse them
+            _pool, _pool_pid = ConnectionPool(connect, size, timeout), os.getpid()
+        return _pool
+
+def pool_stats():
+    """Connections per state in this process' pool"""
+    if _pool is None or _pool_pid != os.getpid():
+        return {'idle': 0, 'in_use': 0}
+    return _pool.stats()
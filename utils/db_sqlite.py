@@ -0,0 +1,174 @@
+# utils/db_sqlite.py
+#
+# SQLite backend for utils/db.py (DB_DRIVER=sqlite), for tests, benchmarks
+# and single-node installs.
+#
+# Exposes the small part of the mysql.connector API that utils/db.py and the
+# scripts use: connection.cursor(dictionary=, buffered=), commit, rollback,
+# close, is_connected, unread_result, consume_results;
+# cursor.execute/executemany/fetchall/fetchmany/fetchone, rowcount and
+# lastrowid. SQL keeps the %s placeholders used everywhere else; dialect
+# differences are handled by config_loader.adapt_sql().
+
+import functools
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+# DATETIME columns in and out as datetime, like mysql.connector
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(' '))
+sqlite3.register_converter('DATETIME', lambda value: datetime.fromisoformat(value.decode()))
+
+@functools.lru_cache(maxsize=1024)
+def to_qmark(query):
+    """%s placeholders (pyformat) to ? (qmark)"""
+    return query.replace('%%', '\0').replace('%s', '?').replace('\0', '%')
+
+class SQLiteCursor:
+    def __init__(self, cursor, dictionary=False):
+        self._cursor = cursor
+        self._dictionary = dictionary
+
+    def _row(self, row):
+        if row is None:
+            return None
+        return dict(row) if self._dictionary else tuple(row)
+
+    def execute(self, query, params=None):
+        self._cursor.execute(to_qmark(query), params or ())
+
+    def executemany(self, query, seq_params):
+        self._cursor.executemany(to_qmark(query), seq_params)
+
+    def fetchone(self):
+        return self._row(self._cursor.fetchone())
+
+    def fetchmany(self, size=1):
+        return [self._row(row) for row in self._cursor.fetchmany(size)]
+
+    def fetchall(self):
+        return [self._row(row) for row in self._cursor.fetchall()]
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    def close(self):
+        self._cursor.close()
+
+class SharedConnection:
+    """A thread's sqlite3 connection and how many transactions are open on it"""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.depth = 0
+
+class SQLiteConnection:
+    """
+    Per-thread handle on a long-lived sqlite3 connection. close() only ends
+    the caller's use: uncommitted work is rolled back, the file stays open.
+
+    Every handle of a thread shares one sqlite3 connection, left in autocommit
+    mode: a transaction is an explicit BEGIN, or a SAVEPOINT inside another
+    one. Autocommit handles opened inside a transaction (fetch_all,
+    execute_query...) run in it and never commit it.
+    """
+
+    def __init__(self, shared, autocommit=True):
+        self._shared = shared
+        self._connection = shared.connection
+        self._savepoint = None
+        self._open = False
+        self._transactional = not autocommit
+
+        if not autocommit:
+            shared.depth += 1
+            if shared.depth > 1:
+                self._savepoint = f"pymailadmin_{shared.depth}"
+            try:
+                self._begin()
+            except Exception:
+                shared.depth -= 1
+                raise
+
+    def _begin(self):
+        self._connection.execute(f"SAVEPOINT {self._savepoint}" if self._savepoint else "BEGIN")
+        self._open = True
+
+    def _end(self, statements):
+        for statement in statements:
+            self._connection.execute(statement)
+        self._open = False
+
+    def cursor(self, dictionary=False, buffered=True):
+        return SQLiteCursor(self._connection.cursor(), dictionary)
+
+    def commit(self):
+        if self._open:
+            self._end([f"RELEASE {self._savepoint}"] if self._savepoint else ["COMMIT"])
+            # Like MySQL without autocommit: the next statements start another one
+            self._begin()
+
+    def _undo(self):
+        if self._savepoint:
+            self._end([f"ROLLBACK TO {self._savepoint}", f"RELEASE {self._savepoint}"])
+        else:
+            self._end(["ROLLBACK"])
+
+    def rollback(self):
+        if self._open:
+            self._undo()
+            self._begin()
+
+    def is_connected(self):
+        return True
+
+    @property
+    def unread_result(self):
+        # Rows not fetched are dropped with the cursor
+        return False
+
+    def consume_results(self):
+        pass
+
+    def close(self):
+        if not self._transactional:
+            return
+        self._transactional = False
+        try:
+            if self._open:
+                self._undo()
+        finally:
+            self._shared.depth -= 1
+
+_local = threading.local()
+
+def open_connection(path):
+    connection = sqlite3.connect(
+        path,
+        detect_types=sqlite3.PARSE_DECLTYPES,
+        # A streamed response may be resumed from another thread of the pool
+        check_same_thread=False,
+        isolation_level=None,
+    )
+    connection.row_factory = sqlite3.Row
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    connection.execute("PRAGMA foreign_keys=ON")
+    connection.execute("PRAGMA busy_timeout=5000")
+    return connection
+
+def connect(db_conf, autocommit=True, **options):
+    """One connection per thread and process (workers fork after --preload)"""
+    shared = getattr(_local, 'shared', None)
+
+    if shared is None or _local.pid != os.getpid():
+        shared = _local.shared = SharedConnection(open_connection(db_conf['path']))
+        _local.pid = os.getpid()
+
+    return SQLiteConnection(shared, autocommit=autocommit)
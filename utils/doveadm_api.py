@@ -3,6 +3,7 @@
 import os
 import requests
 import logging
+from libs import config
 
 class DoveadmAPIError(Exception):
     pass
@@ -11,11 +12,11 @@ def doveadm_post(commands):
     """Sends a command list JSON to doveadm HTTP API"""
     headers = {
         "Content-Type": "application/json",
-        "X-API-Key": DOVEADM_HTTP_API_SECRET_KEY,
+        "X-API-Key": config['DOVEADM_HTTP_API_SECRET_KEY'],
     }
     
     try:
-        resp = requests.post(DOVEADM_HTTP_API_URL, json={"commands": commands}, headers=headers, timeout=30)
+        resp = requests.post(config['DOVEADM_HTTP_API_URL'], json={"commands": commands}, headers=headers, timeout=30)
         resp.raise_for_status()
         result = resp.json()
         
@@ -29,25 +30,42 @@ def doveadm_post(commands):
         logging.error(f"HTTP error calling doveadm API: {e}")
         raise DoveadmAPIError(f"HTTP error calling doveadm API: {e}")
     
-def doveadm_create_mailbox(email, mailbox="INBOX"):
-    commands = [{
+def doveadm_post_batch(commands):
+    """
+    Sends many commands in one request. Returns {tag: error} for the
+    commands doveadm answered with an error, so callers can report them
+    one by one; raises DoveadmAPIError if the request itself failed.
+    """
+    result = doveadm_post(commands)
+    failed = {}
+    
+    # One ["doveadmResponse"|"error", data, tag] per command
+    for entry in result if isinstance(result, list) else []:
+        if isinstance(entry, list) and len(entry) == 3 and entry[0] == "error":
+            failed[entry[2]] = entry[1]
+    
+    return failed
+
+def create_mailbox_command(email, mailbox="INBOX", tag="create-mailbox"):
+    return {
         "command": "mailboxCreate",
         "parameters": {
-            "socketPath": DOVEADM_HTTP_API_SOCKET,
+            "socketPath": config['DOVEADM_HTTP_API_SOCKET'],
             "user": email,
             "mailbox": mailbox,
             "allUsers": False
         },
-        "tag": "create-mailbox"
-    }]
-    
-    return doveadm_post(commands)
+        "tag": tag
+    }
+
+def doveadm_create_mailbox(email, mailbox="INBOX"):
+    return doveadm_post([create_mailbox_command(email, mailbox)])
     
 def doveadm_delete_mailbox(email):
     commands = [{
         "command": "mailboxDelete",
         "parameters": {
-            "socketPath": DOVEADM_HTTP_API_SOCKET,
+            "socketPath": config['DOVEADM_HTTP_API_SOCKET'],
             "user": email,
             "mailbox": "*",
             "allUsers": False
@@ -60,17 +78,16 @@ def doveadm_delete_user(email):
     commands = [{
         "command": "userDelete",
         "parameters": {
-            "socketPath": DOVEADM_HTTP_API_SOCKET,
+            "socketPath": config['DOVEADM_HTTP_API_SOCKET'],
             "user": email
         },
         "tag": "delete-user"
     }]
     return doveadm_post(commands)
     
-def doveadm_rekey_mailbox_generate(email, old_password_cleartext=None, force_regen=False):
-    """Force regeneration of keys - destructive if force_regen=True"""
+def rekey_generate_command(email, old_password_cleartext=None, force_regen=False):
     params = {
-        "socketPath": DOVEADM_HTTP_API_SOCKET,
+        "socketPath": config['DOVEADM_HTTP_API_SOCKET'],
         "user": email,
         "userOnly": True,
         "reencrypt": True,
@@ -82,17 +99,41 @@ def doveadm_rekey_mailbox_generate(email, old_password_cleartext=None, force_reg
     if force_regen:
         params["force"] = True
 
-    commands = [{
+    return {
         "command": "mailboxCryptokeyGenerate",
         "parameters": params,
         "tag": f"rekey-mailbox-generate-{email}"
-    }]
-    return doveadm_post(commands)
+    }
+
+def doveadm_rekey_mailbox_generate(email, old_password_cleartext=None, force_regen=False):
+    """Force regeneration of keys - destructive if force_regen=True"""
+    return doveadm_post([rekey_generate_command(email, old_password_cleartext, force_regen)])
+
+def doveadm_create_mailboxes(mailboxes):
+    """
+    Create and generate the keys of many new mailboxes in one request.
+    `mailboxes` are (email, password) pairs; returns {email: error} for
+    those doveadm failed on.
+    """
+    commands = []
+    for email, password in mailboxes:
+        commands.append(create_mailbox_command(email, tag=f"create-mailbox-{email}"))
+        commands.append(rekey_generate_command(email, password))
+    
+    failed = doveadm_post_batch(commands)
+    errors = {}
+    
+    for email, _ in mailboxes:
+        for tag in (f"create-mailbox-{email}", f"rekey-mailbox-generate-{email}"):
+            if tag in failed:
+                errors.setdefault(email, f"{tag}: {failed[tag]}")
+    
+    return errors
 
 def doveadm_rekey_mailbox_password(email, old_password_cleartext, new_password_cleartext):
     """Change the password protecting the mail crypt private key safely"""
     params = {
-        "socketPath": DOVEADM_HTTP_API_SOCKET,
+        "socketPath": config['DOVEADM_HTTP_API_SOCKET'],
         "user": email,
         "oldPassword": old_password_cleartext,
         "newPassword": new_password_cleartext
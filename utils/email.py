@@ -1,26 +1,54 @@
 # utils/email.py
 
-from libs import config, MIMEText, smtplib
+from libs import config, MIMEText, smtplib, translations
 import logging
 
-def send_email(to_email, subject, body):
+def build_message(to_email, subject, body):
     msg = MIMEText(body)
     msg['Subject'] = subject
     msg['From'] = config['mail']['from_email']
     msg['To'] = to_email
+    return msg
+
+def smtp_connect():
+    if config['mail']['smtp_protocol'] == 'ssl':
+        server = smtplib.SMTP_SSL(config['mail']['smtp_host'], config['mail']['smtp_port'])
+    else:
+        server = smtplib.SMTP(config['mail']['smtp_host'], config['mail']['smtp_port'])
+        if config['mail']['smtp_protocol'] == 'tls':
+            server.starttls()
+    server.login(config['mail']['smtp_username'], config['mail']['smtp_password'])
+    return server
+
+def send_email(to_email, subject, body):
+    return not send_emails([(to_email, subject, body)])
+
+def send_emails(messages):
+    """
+    Send (to_email, subject, body) messages over one SMTP connection,
+    reconnecting after a failure. Returns the recipients not sent to.
+    """
+    failed = []
+    server = None
+
+    for to_email, subject, body in messages:
+        try:
+            if server is None:
+                server = smtp_connect()
+            server.send_message(build_message(to_email, subject, body))
+
+        except Exception as e:
+            logging.error(f"{translations['failed_sending_email']}: {e}")
+            failed.append(to_email)
+            server = quit_quietly(server)
 
-    try:
-        if config['mail']['smtp_protocol'] == 'ssl':
-            server = smtplib.SMTP_SSL(config['mail']['smtp_host'], config['mail']['smtp_port'])
-        else:
-            server = smtplib.SMTP(config['mail']['smtp_host'], config['mail']['smtp_port'])
-            if config['mail']['smtp_protocol'] == 'tls':
-                server.starttls()
-        server.login(config['mail']['smtp_username'], config['mail']['smtp_password'])
-        server.send_message(msg)
-        server.quit()
-        return True
-    except Exception as e:
-        logging.error(f"{failed_sending_email}: {e}")
-        return False
+    quit_quietly(server)
+    return failed
 
+def quit_quietly(server):
+    if server is not None:
+        try:
+            server.quit()
+        except Exception:
+            pass
+    return None
@@ -0,0 +1,103 @@
+# utils/export.py
+#
+# Streaming exports of domains, mailboxes and aliases as CSV or JSON Lines,
+# for the /export route and scripts/export.py.
+#
+# Rows come from iter_rows() (unbuffered server-side cursor) and are encoded
+# into chunks of about CHUNK_SIZE bytes as they arrive: memory use does not
+# depend on the number of rows. Queries are the export_* ones generated by
+# config_loader.generate_sql_queries(); password hashes are never exported.
+
+import csv
+import io
+import json
+
+from libs import config
+from utils.db import iter_rows
+
+KINDS = ('domains', 'mailboxes', 'aliases')
+
+COLUMNS = {
+    'domains': ('id', 'domain'),
+    'mailboxes': ('id', 'domain_id', 'email', 'quota', 'active'),
+    'aliases': ('id', 'domain_id', 'source', 'destination'),
+}
+
+# format -> Content-Type
+FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+}
+
+CHUNK_SIZE = 64 * 1024
+
+def export_query(kind, admin_user_id=None, domain_id=None, prefix='export'):
+    """
+    (query, params) for one kind of object. admin_user_id restricts it to
+    what that admin owns (None: everything, for super_admin), domain_id to
+    one domain (not for 'domains'). prefix 'api' gives the paginated
+    queries of /api/v1, whose last two params (cursor, limit) are left to add.
+    """
+    sql = config['sql_dovecot']
+
+    if kind == 'domains':
+        if domain_id is not None:
+            raise ValueError("Domains are exported for all domains only")
+        if admin_user_id is None:
+            return sql[f'{prefix}_domains'], ()
+        return sql[f'{prefix}_domains_by_admin'], (admin_user_id,)
+
+    name = f'{prefix}_users' if kind == 'mailboxes' else f'{prefix}_aliases'
+    params = []
+
+    if domain_id is not None:
+        name += '_by_domain'
+    if admin_user_id is not None:
+        name += '_and_owner' if domain_id is not None else '_by_owner'
+        params.append(admin_user_id)
+    if domain_id is not None:
+        params.append(domain_id)
+
+    return sql[name], tuple(params)
+
+def iter_records(kinds, admin_user_id=None, domain_id=None):
+    """Yield (kind, row) for each kind in turn, as the cursor streams them"""
+    for kind in kinds:
+        query, params = export_query(kind, admin_user_id, domain_id)
+        for row in iter_rows(query, params):
+            yield kind, row
+
+def export_chunks(kinds, fmt, admin_user_id=None, domain_id=None, chunk_size=CHUNK_SIZE):
+    """
+    Yield the export as byte chunks. CSV holds a single kind with a header
+    line; JSON Lines can hold several, each object tagged with its "type".
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    if fmt == 'csv' and len(kinds) != 1:
+        raise ValueError("A CSV export holds a single kind of object")
+
+    buffer = io.StringIO()
+    writer = None
+
+    if fmt == 'csv':
+        columns = COLUMNS[kinds[0]]
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+
+    for kind, row in iter_records(kinds, admin_user_id, domain_id):
+        if writer is not None:
+            writer.writerow([row[column] for column in columns])
+        else:
+            record = {'type': kind}
+            record.update((column, row[column]) for column in COLUMNS[kind])
+            buffer.write(json.dumps(record, default=str, ensure_ascii=False))
+            buffer.write("\n")
+
+        if buffer.tell() >= chunk_size:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
@@ -0,0 +1,105 @@
+# utils/mailbox_hash.py
+#
+# Dovecot password hashes for mailboxes (DOVECOT_HASH), one at a time for the
+# forms or in a process pool for bulk imports.
+#
+# Does not import libs (nor utils.metrics): pool workers are started by a
+# fork server and only need passlib, the hash settings are passed in
+# (config['mailbox_hash']).
+
+import multiprocessing
+import os
+import secrets
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from passlib.hash import argon2, bcrypt, sha512_crypt, sha256_crypt, pbkdf2_sha256
+
+def hash_mailbox_password(password, conf):
+    """Password hash in the format Dovecot expects, prefix included"""
+    alg = conf['algorithm']
+    prefix = conf['prefix']
+
+    # Argon2 hashing
+    if alg in ['argon2id', 'argon2i']:
+
+        # Salted-hash the password with a unique salt
+        hashed = argon2.using(
+            type='ID' if alg == 'argon2id' else 'I',
+            salt=secrets.token_bytes(16),
+            time_cost=conf['argon2_time_cost'],
+            memory_cost=conf['argon2_memory_cost'],
+            parallelism=conf['argon2_parallelism']
+        ).hash(password)
+
+        # Extract passlib hash ("$argon2id$v=...$...$salt$hash")
+        parts = hashed.split('$')
+        salt_part = parts[-2]
+        hash_part = parts[-1]
+
+        # Dovecot-style format
+        return f"{prefix}${salt_part}${hash_part}"
+
+    # Other algos hashing
+    if alg == 'bcrypt':
+        return prefix + bcrypt.using(rounds=conf['bcrypt_rounds']).hash(password)
+
+    if alg == 'sha512-crypt':
+        return prefix + sha512_crypt.hash(password)
+
+    if alg == 'sha256-crypt':
+        return prefix + sha256_crypt.hash(password)
+
+    if alg == 'pbkdf2':
+        return prefix + pbkdf2_sha256.using(rounds=conf['pbkdf2_rounds']).hash(password)
+
+    raise ValueError("Unsupported hash algorithm")
+
+# Passwords submitted to hash_passwords() and not hashed yet, in this process
+_pending = 0
+_pending_lock = threading.Lock()
+
+def _add_pending(count):
+    global _pending
+    with _pending_lock:
+        _pending += count
+
+def pending_hashes():
+    return _pending
+
+def hash_passwords(passwords, conf, workers=0):
+    """
+    Yield the hash of each password, in order, computed by `workers`
+    processes (0: one per CPU, 1: in this process). Hashes are CPU-bound
+    and argon2 also holds memory_cost KiB each: size workers accordingly.
+    """
+    passwords = list(passwords)
+    workers = workers or os.cpu_count() or 1
+    left = len(passwords)
+    _add_pending(left)
+
+    try:
+        if workers == 1 or left < 2:
+            results = (hash_mailbox_password(password, conf) for password in passwords)
+            for crypt_value in results:
+                left -= 1
+                _add_pending(-1)
+                yield crypt_value
+            return
+
+        # Not fork: the calling worker may run other threads holding locks
+        context = multiprocessing.get_context('forkserver')
+        # A plain dict: the frozen configuration cannot be pickled
+        conf = dict(conf)
+        chunksize = max(1, len(passwords) // (workers * 8))
+
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+            for crypt_value in executor.map(partial(hash_mailbox_password, conf=conf), passwords, chunksize=chunksize):
+                left -= 1
+                _add_pending(-1)
+                yield crypt_value
+
+    finally:
+        # Abandoned or failed: the rest is no longer queued
+        _add_pending(-left)
@@ -0,0 +1,232 @@
+# utils/mailbox_import.py
+#
+# Bulk mailbox creation from CSV lines "email,password,quota", for
+# scripts/import_mailboxes.py, the /import page and /api/v1/mailboxes.
+#
+# Every row is checked like create_mailbox_handler does (format, domain
+# ownership, existing address, utils/limits.py), then the valid ones are
+# hashed in a process pool and created batch by batch: one transaction for
+# the users and ownerships rows and the owner's mailbox counter, then one
+# doveadm request creating and keying all the mailboxes of the batch.
+
+import csv
+import io
+import logging
+import re
+from collections import namedtuple
+
+from libs import config, translations
+from utils import metrics
+from utils.changes import record_changes
+from utils.counters import seed_mailbox_counts, adjust_mailbox_counts
+from utils.db import fetch_all, transaction, Error
+from utils.doveadm_api import doveadm_create_mailboxes, DoveadmAPIError
+from utils.limits import remaining_mailboxes
+from utils.mailbox_hash import hash_passwords, pending_hashes
+from utils.ownership import owns_domain, invalidate_ownership
+from utils.versions import bump_versions, domain_scope, admin_scope
+
+# Same rules as the mailbox creation form
+LOCAL_PART_RE = re.compile(r'^[a-z0-9_-]{6,64}$')
+PASSWORD_MIN_LENGTH = 12
+PASSWORD_MAX_LENGTH = 64
+QUOTA_MIN = 1
+QUOTA_MAX = 5
+
+# Rows checked by each existence query
+EXISTING_CHUNK = 500
+
+ImportRow = namedtuple('ImportRow', ['line', 'email', 'password', 'quota', 'domain_id'])
+RowError = namedtuple('RowError', ['line', 'email', 'message'])
+
+metrics.register_gauge(
+    'pymailadmin_mailbox_hash_queue',
+    'Mailbox passwords waiting to be hashed by bulk imports',
+    pending_hashes
+)
+
+def parse_csv(text):
+    """Yield (line number, fields) for each non-empty line, header skipped"""
+    for line, fields in enumerate(csv.reader(io.StringIO(text)), start=1):
+        fields = [f.strip() for f in fields]
+        if not any(fields):
+            continue
+        if line == 1 and fields[0].lower() == 'email':
+            continue
+        yield line, fields
+
+class MailboxImport:
+    """
+    imp = MailboxImport(owner_id, owner_role)
+    imp.load(csv_text)
+    for stage, done, total in imp.run(): ...
+    imp.created, imp.errors
+    """
+
+    def __init__(self, owner_id, owner_role, batch_size=None, hash_workers=None):
+        conf = config['mailbox_import']
+        self.owner_id = owner_id
+        self.owner_role = owner_role
+        self.batch_size = batch_size or conf['batch_size']
+        self.hash_workers = conf['hash_workers'] if hash_workers is None else hash_workers
+        self.rows = []
+        self.created = []
+        self.errors = []
+        self._domains = {}
+
+    def error(self, line, email, message):
+        self.errors.append(RowError(line, email, message))
+
+    def domain_id(self, name):
+        """Domain ID if the owner may create mailboxes in it, else None"""
+        if name not in self._domains:
+            domain = fetch_all(config['sql_dovecot']['select_domain_by_name'], (name,))
+            domain_id = domain[0]['id'] if domain else None
+
+            if domain_id is not None and self.owner_role != 'super_admin' and not owns_domain(self.owner_id, domain_id):
+                domain_id = None
+
+            self._domains[name] = domain_id
+
+        return self._domains[name]
+
+    def check_row(self, line, fields):
+        if len(fields) not in (2, 3):
+            return self.error(line, fields[0] if fields else '', translations['import_error_columns'])
+
+        email = fields[0].lower()
+        password = fields[1]
+        quota = fields[2] if len(fields) == 3 and fields[2] else str(QUOTA_MIN)
+
+        local_part, _, domain = email.partition('@')
+        separator = config['POSTFIX_SEPARATOR']
+        if not LOCAL_PART_RE.match(local_part) or (separator and separator in local_part) or not domain:
+            return self.error(line, email, translations['import_error_email'])
+
+        if not PASSWORD_MIN_LENGTH <= len(password) <= PASSWORD_MAX_LENGTH or '%' in password:
+            return self.error(line, email, translations['import_error_password'])
+
+        if not quota.isdigit() or not QUOTA_MIN <= int(quota) <= QUOTA_MAX:
+            return self.error(line, email, translations['import_error_quota'])
+
+        domain_id = self.domain_id(domain)
+        if domain_id is None:
+            return self.error(line, email, translations['invalid_domain'])
+
+        return ImportRow(line, email, password, int(quota), domain_id)
+
+    def load(self, text):
+        """Check every CSV row; keep the valid ones in self.rows, the others in self.errors"""
+        return self.load_rows(parse_csv(text))
+
+    def load_rows(self, numbered_fields):
+        """Same as load() from (line, [email, password, quota]) pairs"""
+        rows = []
+        seen = set()
+
+        for line, fields in numbered_fields:
+            row = self.check_row(line, fields)
+            if row is None:
+                continue
+            if row.email in seen:
+                self.error(line, row.email, translations['import_error_duplicate'])
+                continue
+            seen.add(row.email)
+            rows.append(row)
+
+        # Addresses already in the users table
+        existing = set()
+        for start in range(0, len(rows), EXISTING_CHUNK):
+            emails = [row.email for row in rows[start:start + EXISTING_CHUNK]]
+            query = config['sql_dovecot']['select_user_ids_by_email_in'].format(emails=", ".join(["%s"] * len(emails)))
+            existing.update(r['email'].lower() for r in fetch_all(query, tuple(emails)))
+
+        remaining = remaining_mailboxes(self.owner_id)
+
+        for row in rows:
+            if row.email in existing:
+                self.error(row.line, row.email, translations['email_already_exists'])
+            elif remaining <= 0:
+                self.error(row.line, row.email, translations['import_error_limit'])
+            else:
+                remaining -= 1
+                self.rows.append(row)
+
+        self.errors.sort(key=lambda error: error.line)
+        return self
+
+    def insert_batch(self, batch):
+        """Users, ownerships and change feed rows of a batch, in one transaction"""
+        with transaction() as tx:
+            seed_mailbox_counts(tx, [self.owner_id])
+            tx.execute_many(
+                config['sql_dovecot']['insert_user'],
+                [(row.domain_id, row.email, crypt_value, row.quota, 1) for row, crypt_value in batch]
+            )
+
+            emails = [row.email for row, _ in batch]
+            query = config['sql_dovecot']['select_user_ids_by_email_in'].format(emails=", ".join(["%s"] * len(emails)))
+            user_ids = {r['email'].lower(): r['id'] for r in tx.fetch_all(query, tuple(emails))}
+
+            tx.execute_many(
+                config['sql']['add_ownership'],
+                [(self.owner_id, user_ids[row.email], 1) for row, _ in batch]
+            )
+            adjust_mailbox_counts(tx, {self.owner_id: len(batch)})
+            record_changes(tx, 'mailbox', 'create', emails)
+
+        invalidate_ownership(self.owner_id)
+        bump_versions(admin_scope(self.owner_id), *{domain_scope(row.domain_id) for row, _ in batch})
+
+    def create_batch(self, batch):
+        try:
+            self.insert_batch(batch)
+        except Error as e:
+            logging.error(f"Mailbox import: batch from line {batch[0][0].line} not inserted: {e}")
+            for row, _ in batch:
+                self.error(row.line, row.email, translations['import_error_database'])
+            return
+
+        try:
+            failed = doveadm_create_mailboxes([(row.email, row.password) for row, _ in batch])
+        except DoveadmAPIError as e:
+            failed = {row.email: str(e) for row, _ in batch}
+
+        for row, _ in batch:
+            if row.email in failed:
+                logging.error(f"Mailbox import: failed to initialize mailbox in Dovecot for {row.email}: {failed[row.email]}")
+                self.error(row.line, row.email, translations['import_error_doveadm'])
+            else:
+                self.created.append(row.email)
+
+    def run(self):
+        """
+        Create the loaded mailboxes. Yields ('hashed', done, total) and
+        ('created', done, total) once per batch, to report progress.
+        """
+        total = len(self.rows)
+        batch = []
+        done = 0
+
+        hashes = hash_passwords((row.password for row in self.rows), config['mailbox_hash'], self.hash_workers)
+
+        try:
+            for row, crypt_value in zip(self.rows, hashes):
+                batch.append((row, crypt_value))
+
+                if len(batch) >= self.batch_size:
+                    yield 'hashed', done + len(batch), total
+                    self.create_batch(batch)
+                    done += len(batch)
+                    batch = []
+                    yield 'created', done, total
+
+            if batch:
+                yield 'hashed', total, total
+                self.create_batch(batch)
+                yield 'created', total, total
+        finally:
+            # Stops the hashing processes if the caller gave up
+            hashes.close()
+
+        self.errors.sort(key=lambda error: error.line)
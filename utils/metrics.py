@@ -0,0 +1,262 @@
+# utils/metrics.py
+#
+# Prometheus metrics shared by all gunicorn workers.
+#
+# Each process keeps its own registry and dumps it to METRICS_DIR/metrics-<pid>.json
+# at most once per flush interval. A scrape merges every file: counters and
+# histograms of exited workers are folded into an archive file so they stay
+# monotonic, gauges only count live processes.
+
+import atexit
+import fcntl
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from libs import config
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+FLUSH_INTERVAL = 1.0
+
+# name -> (type, help)
+METRICS = {
+    'pymailadmin_http_requests_total': ('counter', 'HTTP requests by route, method and status'),
+    'pymailadmin_http_request_duration_seconds': ('histogram', 'HTTP request latency by route, until the response body is sent'),
+    'pymailadmin_http_requests_in_flight': ('gauge', 'HTTP requests being handled'),
+    'pymailadmin_db_queries_total': ('counter', 'SQL statements executed'),
+    'pymailadmin_db_query_duration_seconds': ('histogram', 'SQL statement latency'),
+    'pymailadmin_db_connections_opened_total': ('counter', 'Database connections opened'),
+    'pymailadmin_db_pool_timeouts_total': ('counter', 'Database connections not handed out by the pool within DB_POOL_TIMEOUT'),
+    'pymailadmin_ownership_cache_requests_total': ('counter', 'Ownership cache lookups by result (hit/miss)'),
+    'pymailadmin_shared_cache_requests_total': ('counter', 'Shared cache lookups by cache and result (hit/miss)'),
+    'pymailadmin_shared_cache_stores_total': ('counter', 'Shared cache writes by cache and result (stored/evicted/too_large)'),
+}
+
+# Gauges computed on flush: name -> callable returning a number or {labels dict as tuple: value}
+_gauge_callbacks = {}
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+        self.gauges = {}
+        self.last_flush = 0.0
+        self.pending_flush = None
+
+_registry = Registry()
+
+def _reset_after_fork():
+    global _registry
+    _registry = Registry()
+
+# Workers forked from a --preload master must not report the master's values
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+def get_metrics_config():
+    return config.get('metrics', {})
+
+def _key(name, labels):
+    return (name, tuple(sorted((labels or {}).items())))
+
+# --- Recording ---
+def inc(name, labels=None, value=1):
+    key = _key(name, labels)
+    with _registry.lock:
+        _registry.counters[key] = _registry.counters.get(key, 0) + value
+
+def add_gauge(name, delta, labels=None):
+    key = _key(name, labels)
+    with _registry.lock:
+        _registry.gauges[key] = _registry.gauges.get(key, 0) + delta
+
+def set_gauge(name, value, labels=None):
+    with _registry.lock:
+        _registry.gauges[_key(name, labels)] = value
+
+def observe(name, value, labels=None):
+    key = _key(name, labels)
+    with _registry.lock:
+        histogram = _registry.histograms.get(key)
+        if histogram is None:
+            histogram = _registry.histograms[key] = [[0] * len(DURATION_BUCKETS), 0.0, 0]
+        for i, bound in enumerate(DURATION_BUCKETS):
+            if value <= bound:
+                histogram[0][i] += 1
+                break
+        histogram[1] += value
+        histogram[2] += 1
+
+def register_gauge(name, help_text, callback):
+    """Gauge evaluated in every process at flush time (pool sizes, queue depths...)"""
+    METRICS[name] = ('gauge', help_text)
+    _gauge_callbacks[name] = callback
+
+# --- Multiprocess storage ---
+def _snapshot():
+    for name, callback in _gauge_callbacks.items():
+        try:
+            value = callback()
+            if isinstance(value, dict):
+                for labels, v in value.items():
+                    set_gauge(name, v, dict(labels))
+            else:
+                set_gauge(name, value)
+        except Exception as e:
+            logging.error(f"Error evaluating gauge {name}: {e}")
+
+    with _registry.lock:
+        return {
+            'pid': os.getpid(),
+            'counters': [[n, list(map(list, l)), v] for (n, l), v in _registry.counters.items()],
+            'histograms': [[n, list(map(list, l)), h[0], h[1], h[2]] for (n, l), h in _registry.histograms.items()],
+            'gauges': [[n, list(map(list, l)), v] for (n, l), v in _registry.gauges.items()],
+        }
+
+def _write_json(path, data):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+def flush(force=False):
+    """Dump this process' registry, at most once per FLUSH_INTERVAL unless forced"""
+    metrics_conf = get_metrics_config()
+    if not metrics_conf.get('enabled'):
+        return
+
+    now = time.monotonic()
+    if not force and now - _registry.last_flush < FLUSH_INTERVAL:
+        # Write the skipped updates later, in case the worker goes idle
+        with _registry.lock:
+            if _registry.pending_flush is None:
+                timer = threading.Timer(FLUSH_INTERVAL - (now - _registry.last_flush), flush, (True,))
+                timer.daemon = True
+                _registry.pending_flush = timer
+                timer.start()
+        return
+    _registry.last_flush = now
+    _registry.pending_flush = None
+
+    try:
+        metrics_dir = metrics_conf['dir']
+        os.makedirs(metrics_dir, exist_ok=True)
+        _write_json(os.path.join(metrics_dir, f"metrics-{os.getpid()}.json"), _snapshot())
+    except Exception as e:
+        logging.error(f"Error writing metrics: {e}")
+
+atexit.register(flush, True)
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+        return True
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+
+def _merge(totals, data, include_gauges):
+    for name, labels, value in data.get('counters', []):
+        key = (name, tuple(map(tuple, labels)))
+        totals['counters'][key] = totals['counters'].get(key, 0) + value
+
+    for name, labels, buckets, total, count in data.get('histograms', []):
+        key = (name, tuple(map(tuple, labels)))
+        current = totals['histograms'].get(key)
+        if current is None:
+            totals['histograms'][key] = [list(buckets), total, count]
+        else:
+            current[0] = [a + b for a, b in zip(current[0], buckets)]
+            current[1] += total
+            current[2] += count
+
+    if include_gauges:
+        for name, labels, value in data.get('gauges', []):
+            key = (name, tuple(map(tuple, labels)))
+            totals['gauges'][key] = totals['gauges'].get(key, 0) + value
+
+def collect():
+    """Merge every worker's metrics, folding exited workers into the archive"""
+    flush(force=True)
+    metrics_dir = get_metrics_config()['dir']
+    archive_path = os.path.join(metrics_dir, 'archive.json')
+    totals = {'counters': {}, 'histograms': {}, 'gauges': {}}
+
+    with open(os.path.join(metrics_dir, '.lock'), 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+
+        archive = {'counters': {}, 'histograms': {}, 'gauges': {}}
+        if os.path.exists(archive_path):
+            with open(archive_path) as f:
+                _merge(archive, json.load(f), include_gauges=False)
+        archive_changed = False
+
+        for path in glob.glob(os.path.join(metrics_dir, 'metrics-*.json')):
+            try:
+                with open(path) as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue
+
+            if _pid_alive(data.get('pid', 0)):
+                _merge(totals, data, include_gauges=True)
+            else:
+                _merge(archive, data, include_gauges=False)
+                archive_changed = True
+                os.remove(path)
+
+        if archive_changed:
+            _write_json(archive_path, {
+                'counters': [[n, list(map(list, l)), v] for (n, l), v in archive['counters'].items()],
+                'histograms': [[n, list(map(list, l)), h[0], h[1], h[2]] for (n, l), h in archive['histograms'].items()],
+            })
+
+    _merge(totals, {
+        'counters': [[n, l, v] for (n, l), v in archive['counters'].items()],
+        'histograms': [[n, l, h[0], h[1], h[2]] for (n, l), h in archive['histograms'].items()],
+    }, include_gauges=False)
+    return totals
+
+# --- Prometheus text format ---
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _labels(labels, extra=None):
+    items = list(labels) + list(extra or [])
+    if not items:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in items) + '}'
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+def render(totals):
+    lines = []
+    series = {}
+
+    for kind in ('counters', 'gauges', 'histograms'):
+        for (name, labels), value in totals[kind].items():
+            series.setdefault(name, []).append((labels, value))
+
+    for name in sorted(series):
+        metric_type, help_text = METRICS.get(name, ('untyped', ''))
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {metric_type}")
+
+        for labels, value in sorted(series[name], key=lambda s: s[0]):
+            if metric_type == 'histogram':
+                buckets, total, count = value
+                cumulative = 0
+                for bound, bucket in zip(DURATION_BUCKETS, buckets):
+                    cumulative += bucket
+                    lines.append(f"{name}_bucket{_labels(labels, [('le', bound)])} {cumulative}")
+                lines.append(f"{name}_bucket{_labels(labels, [('le', '+Inf')])} {count}")
+                lines.append(f"{name}_sum{_labels(labels)} {_number(total)}")
+                lines.append(f"{name}_count{_labels(labels)} {count}")
+            else:
+                lines.append(f"{name}{_labels(labels)} {_number(value)}")
+
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,139 @@
+# utils/moderation.py
+#
+# Approval and denial of confirmed registrations, shared by the /moderate
+# pages and /api/v1/registrations. Approving several registrations costs
+# the same few queries as one: the rows are read with `email IN (...)` and
+# written with executemany in one transaction.
+
+import logging
+
+from libs import config, translations
+from utils.db import fetch_all, transaction
+from utils.email import send_emails
+from utils.ownership import invalidate_ownership, get_owned_domain_ids
+from utils.reference_data import all_domains
+from utils.versions import bump_versions, admin_scope
+
+def placeholders(values):
+    return ", ".join(["%s"] * len(values))
+
+def fetch_by_emails(query_name, emails):
+    return fetch_all(config['sql'][query_name].format(emails=placeholders(emails)), tuple(emails))
+
+def moderation_domains(admin_user_id, admin_role):
+    """Domains a moderator may grant: all of them for a super_admin, else their own"""
+    if admin_role == 'super_admin':
+        return all_domains()
+    return fetch_all(config['sql_dovecot']['select_allowed_domains_by_admin'], (admin_user_id,))
+
+def grantable_domain_ids(admin_user_id, admin_role):
+    """IDs of the domains a moderator may allow new admins on, from the caches"""
+    if admin_role == 'super_admin':
+        return {domain['id'] for domain in all_domains()}
+    return set(get_owned_domain_ids(admin_user_id))
+
+def domain_ids(values):
+    """Integer domain IDs of a form or JSON list, invalid ones dropped"""
+    ids = set()
+    for value in values:
+        try:
+            ids.add(int(value))
+        except (TypeError, ValueError):
+            pass
+    return sorted(ids)
+
+def approve_registrations(emails, allowed_domains, admin_user_id, admin_role):
+    """
+    Turn confirmed registrations into active admin users, each allowed on
+    the given domain IDs the moderator may grant (the others are dropped).
+    Returns (approved emails, {email: translations key of the error}).
+    """
+    emails = list(dict.fromkeys(e.strip() for e in emails if e and e.strip()))
+    if not emails:
+        return [], {}
+
+    errors = {}
+    registrations = {r['email'].lower(): r for r in fetch_by_emails('select_admin_registrations_by_email_in', emails)}
+    existing = {r['email'].lower() for r in fetch_by_emails('select_admin_user_ids_by_email_in', emails)}
+    to_approve = []
+
+    for email in emails:
+        reg = registrations.get(email.lower())
+        if reg is None:
+            errors[email] = 'user_not_found'
+        elif email.lower() in existing:
+            errors[email] = 'email_already_exists'
+        else:
+            to_approve.append(reg)
+
+    if not to_approve:
+        return [], errors
+
+    approved = [reg['email'] for reg in to_approve]
+    grantable = grantable_domain_ids(admin_user_id, admin_role)
+    domains = [domain_id for domain_id in domain_ids(allowed_domains) if domain_id in grantable]
+
+    try:
+        with transaction() as tx:
+            tx.execute_many(
+                config['sql']['insert_user_from_registration'],
+                [(reg['email'], reg['password_hash'], 'user') for reg in to_approve]
+            )
+
+            ### Trigger doveadm here
+
+            query = config['sql']['select_admin_user_ids_by_email_in'].format(emails=placeholders(approved))
+            user_ids = [row['id'] for row in tx.fetch_all(query, tuple(approved))]
+
+            if len(user_ids) != len(approved):
+                raise ValueError("Users newly inserted not found")
+
+            # Insert allowed domains for the new users (no domains? OK then)
+            if domains:
+                tx.execute_many(
+                    config['sql']['insert_allowed_domains_for_user'],
+                    [(user_id, domain_id) for user_id in user_ids for domain_id in domains]
+                )
+
+            # Then cleanup registrations
+            tx.execute_many(config['sql']['delete_registration_by_email'], [(email,) for email in approved])
+
+    except Exception as e:
+        logging.error(f"Error approving registrations of {', '.join(approved)}: {e}")
+        errors.update((email, 'approval_failed') for email in approved)
+        return [], errors
+
+    for user_id in user_ids:
+        invalidate_ownership(user_id)
+    bump_versions(*(admin_scope(user_id) for user_id in user_ids))
+
+    return approved, errors
+
+def approve_registration(email, allowed_domains, admin_user_id, admin_role):
+    """approve_registrations() for one email: None, or the translations key of the error"""
+    _, errors = approve_registrations([email], allowed_domains, admin_user_id, admin_role)
+    return errors.get(email.strip())
+
+def approval_email(email):
+    login_url = f"{config['PYMAILADMIN_URL']}/login"
+    email_body = translations['email_confirmed_registration_body'].format(login_url=login_url)
+    subject = f"[{config['PRETTY_NAME']}] {translations['email_confirmed_registration_subject']}"
+    return email, subject, email_body
+
+def send_approval_emails(emails):
+    """Tell the new admins they can log in, over one SMTP connection. Returns the failed ones"""
+    return send_emails(approval_email(email) for email in emails)
+
+def send_approval_email(email):
+    return not send_approval_emails([email])
+
+def deny_registrations(emails):
+    """Don't send any mail, just refuse registrations silently and cleanup"""
+    emails = list(dict.fromkeys(e.strip() for e in emails if e and e.strip()))
+    if emails:
+        with transaction() as tx:
+            tx.execute_many(config['sql']['delete_registration_by_email'], [(email,) for email in emails])
+    return emails
+
+def deny_registration(email):
+    deny_registrations([email])
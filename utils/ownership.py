@@ -0,0 +1,118 @@
+# utils/ownership.py
+
+import logging
+import threading
+import time
+from collections import namedtuple
+from utils.db import fetch_all, execute_query, transaction
+from libs import config
+from utils import metrics
+from utils.counters import seed_mailbox_counts, adjust_mailbox_counts
+from utils.versions import bump_versions, get_versions, admin_scope
+
+# Per-process cache: admin_user_id -> (change token, expires_at, Ownership).
+# An entry is only used while the admin's admin:<id> change token (bumped by
+# every ownership write, in any worker) is the one it was loaded at.
+Ownership = namedtuple('Ownership', ['user_ids', 'domain_ids'])
+
+_cache = {}
+_lock = threading.Lock()
+
+def get_ttl():
+    """
+    Seconds an ownership set stays cached at most. Writes made by any worker
+    invalidate it through the change token; the TTL only bounds memory.
+    """
+    return config.get('ownership_cache', {}).get('ttl_seconds', 30)
+
+def load_ownership(admin_user_id):
+    user_rows = fetch_all(config['sql']['select_user_ids_by_owner'], (admin_user_id,))
+    domain_rows = fetch_all(config['sql']['select_domains_by_admin_user'], (admin_user_id,))
+    return Ownership(
+        frozenset(row['user_id'] for row in user_rows),
+        frozenset(row['domain_id'] for row in domain_rows),
+    )
+
+def ownership_token(admin_user_id):
+    """The admin's change token, None if it can't be read"""
+    scope = admin_scope(admin_user_id)
+    try:
+        return get_versions([scope])[scope]
+    except Exception as e:
+        logging.error(f"Error fetching version of {scope}: {e}")
+        return None
+
+def get_ownership(admin_user_id):
+    ttl = get_ttl()
+    # Read before loading: a write meanwhile leaves the entry at the old token
+    token = ownership_token(admin_user_id) if ttl > 0 else None
+    now = time.monotonic()
+    entry = _cache.get(admin_user_id)
+    
+    if token is not None and entry is not None and entry[0] == token and entry[1] > now:
+        metrics.inc('pymailadmin_ownership_cache_requests_total', {'result': 'hit'})
+        return entry[2]
+    
+    metrics.inc('pymailadmin_ownership_cache_requests_total', {'result': 'miss'})
+    ownership = load_ownership(admin_user_id)
+    
+    if token is not None:
+        with _lock:
+            _cache[admin_user_id] = (token, now + ttl, ownership)
+    
+    return ownership
+
+def get_owned_user_ids(admin_user_id):
+    return get_ownership(admin_user_id).user_ids
+
+def get_owned_domain_ids(admin_user_id):
+    return get_ownership(admin_user_id).domain_ids
+
+def is_owner(admin_user_id, user_id):
+    return int(user_id) in get_ownership(admin_user_id).user_ids
+
+def owns_domain(admin_user_id, domain_id):
+    return int(domain_id) in get_ownership(admin_user_id).domain_ids
+
+def invalidate_ownership(admin_user_id=None):
+    """
+    Drop one admin's cached ownership in this process, or everything. Other
+    workers notice through the admin:<id> token, which the writer bumps.
+    """
+    with _lock:
+        if admin_user_id is None:
+            _cache.clear()
+        else:
+            _cache.pop(admin_user_id, None)
+
+# --- Ownership-mutating paths: always go through these ---
+def add_ownership(admin_user_id, user_id, is_primary=1):
+    try:
+        with transaction() as tx:
+            seed_mailbox_counts(tx, [admin_user_id])
+            is_new = not tx.fetch_all(config['sql']['is_owner'], (admin_user_id, user_id))
+            row_id = tx.execute(config['sql']['add_ownership'], (admin_user_id, user_id, is_primary))
+            adjust_mailbox_counts(tx, {admin_user_id: 1 if is_new else 0})
+        return row_id
+    finally:
+        invalidate_ownership(admin_user_id)
+        bump_versions(admin_scope(admin_user_id))
+
+def remove_ownership(admin_user_id, user_id):
+    try:
+        with transaction() as tx:
+            seed_mailbox_counts(tx, [admin_user_id])
+            existed = bool(tx.fetch_all(config['sql']['is_owner'], (admin_user_id, user_id)))
+            row_id = tx.execute(config['sql']['remove_ownership'], (admin_user_id, user_id))
+            adjust_mailbox_counts(tx, {admin_user_id: -1 if existed else 0})
+        return row_id
+    finally:
+        invalidate_ownership(admin_user_id)
+        bump_versions(admin_scope(admin_user_id))
+
+def add_allowed_domain(admin_user_id, domain_id):
+    try:
+        return execute_query(config['sql']['insert_allowed_domains_for_user'], (admin_user_id, domain_id))
+    finally:
+        invalidate_ownership(admin_user_id)
+        bump_versions(admin_scope(admin_user_id))
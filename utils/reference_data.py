@@ -0,0 +1,30 @@
+# utils/reference_data.py
+#
+# Reference data read by most pages, through the cache shared by all workers
+# (utils/shared_cache.py). pymailadmin never writes the domains table, so
+# domains only expire with SHARED_CACHE_TTL (or a configuration reload).
+
+from libs import config
+from utils import shared_cache
+from utils.db import fetch_all
+
+def all_domains():
+    """Every domain of the mail server, as the rows of select_all_domains"""
+    return shared_cache.get('domains', 'all', lambda: fetch_all(config['sql_dovecot']['select_all_domains'], ()))
+
+def domain_name(domain_id):
+    """Name of a domain, None if it doesn't exist"""
+    domain_id = int(domain_id)
+
+    def load():
+        rows = fetch_all(config['sql_dovecot']['select_domain_by_id'], (domain_id,))
+        return rows[0]['domain'] if rows else None
+
+    return shared_cache.get('domains', f"name:{domain_id}", load)
+
+def superadmin_emails():
+    """Addresses of the active super_admins, who moderate registrations"""
+    return shared_cache.get('admins', 'super_admins', lambda: [row['email'] for row in fetch_all(config['sql']['select_superadmins_for_moderation'], ())])
+
+def invalidate_admins():
+    shared_cache.invalidate('admins')
@@ -0,0 +1,77 @@
+# utils/search.py
+#
+# Prefix search on mailbox emails and alias sources/destinations, for the
+# /search page and /search/autocomplete.
+#
+# A prefix is searched as the range [prefix, prefix with its last character
+# incremented): the same index range scan as LIKE 'prefix%', on SQLite too,
+# and no wildcard to escape. Pages follow a keyset cursor (last value, last
+# id), so page N costs the same as page 1.
+
+from libs import config
+from utils.db import fetch_all
+
+# kind -> (query name, searched column)
+KINDS = {
+    'mailboxes': ('search_mailboxes', 'email'),
+    'aliases': ('search_aliases_by_source', 'source'),
+    'destinations': ('search_aliases_by_destination', 'destination'),
+}
+
+def normalize(term):
+    """Searched prefix, or None if too short to be selective"""
+    term = (term or '').strip().lower()
+    if len(term) < config['search']['min_length'] or len(term) > 255:
+        return None
+    return term
+
+def prefix_range(prefix):
+    return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+def search(kind, prefix, admin_user_id=None, after=None, after_id=0, limit=None):
+    """
+    One page of matches as (rows, cursor). cursor is (value, id) to pass as
+    after/after_id for the next page, None on the last one. admin_user_id
+    restricts it to that admin's mailboxes (None: everything, for super_admin).
+    """
+    query_name, column = KINDS[kind]
+    limit = limit or config['search']['page_size']
+    start, end = prefix_range(prefix)
+
+    # Resume from the cursor: the range start moves with it, keeping the scan short
+    if after is not None and after >= start:
+        start = after
+    else:
+        after, after_id = start, 0
+
+    params = (start, end, after, after_id, limit + 1)
+    if admin_user_id is not None:
+        query_name += '_by_owner'
+        params = (admin_user_id,) + params
+
+    rows = fetch_all(config['sql_dovecot'][query_name], params)
+
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, (rows[-1][column], rows[-1]['id'])
+    return rows, None
+
+def suggest(prefix, admin_user_id=None, limit=None):
+    """Mailboxes and aliases starting with prefix, merged in order, for autocomplete"""
+    limit = limit or config['search']['autocomplete_limit']
+    suggestions = []
+
+    for kind, value_key in (('mailboxes', 'email'), ('aliases', 'source')):
+        rows, _ = search(kind, prefix, admin_user_id, limit=limit)
+        for row in rows:
+            suggestion = {
+                'type': 'mailbox' if kind == 'mailboxes' else 'alias',
+                'value': row[value_key],
+                'id': row['id'],
+            }
+            if kind == 'aliases':
+                suggestion['destination'] = row['destination']
+            suggestions.append(suggestion)
+
+    suggestions.sort(key=lambda s: (s['value'], s['type']))
+    return suggestions[:limit]
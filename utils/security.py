@@ -1,7 +1,8 @@
 # utils/security.py
 
-from libs import config, parse_qs, secrets, datetime, timedelta
+from libs import config, parse_qs, secrets, datetime, timedelta, argon2, register_reload_hook
 from utils.db import fetch_all, execute_query
+from functools import lru_cache
 import secrets
 import hmac
 import hashlib
@@ -47,3 +48,61 @@ def check_rate_limit(key, max_attempts, window_minutes, block_minutes):
     else:
         remaining = max_attempts - record['attempts'] - 1
         return True, remaining, 0
+
+# --- Login ---
+def hash_admin_password(password):
+    """argon2id hash of an admin password, with the ADMIN_HASH_* cost"""
+    cost = config['security']['argon2id']
+    return argon2.using(
+        type='ID',
+        time_cost=cost['time_cost'],
+        memory_cost=cost['memory_cost'] // 1024,
+        parallelism=cost['threads']
+    ).hash(password)
+
+def verify_admin_password(password, password_hash):
+    try:
+        return argon2.verify(password, password_hash)
+    except (TypeError, ValueError):
+        return False
+
+@lru_cache(maxsize=1)
+def dummy_admin_hash():
+    """
+    Verified against on logins for unknown emails, so that a miss costs the
+    same argon2 work as a wrong password. Rebuilt when the cost changes.
+    """
+    return hash_admin_password(secrets.token_hex(16))
+
+register_reload_hook(dummy_admin_hash.cache_clear)
+
+def login_state(email, key):
+    """The admin user (id None if unknown) and the rate limit row of key, in one query"""
+    return fetch_all(config['sql']['select_login_state'], (email, key))[0]
+
+def blocked_for(state, now):
+    """Seconds left of an active block, 0 if not blocked"""
+    if state['blocked_until'] and state['blocked_until'] > now:
+        return max(1, int((state['blocked_until'] - now).total_seconds()))
+    return 0
+
+def reserve_login_attempt(key, state, max_attempts, window_minutes, block_minutes, now):
+    """
+    Count a login attempt before its password is verified, so that requests
+    racing each other each take their own place in the counter. The counter
+    starts again after an expired block or window_minutes without attempt;
+    the upsert blocks for block_minutes the attempt reaching the limit, the
+    last one verified. Returns the seconds to wait if this attempt is over
+    the limit, else 0: reset_rate_limit() once the password matched.
+    """
+    if state['attempts'] is not None and (state['blocked_until'] or state['last_attempt'] < now - timedelta(minutes=window_minutes)):
+        # Conditional: a concurrent attempt already counted is not undone
+        execute_query(config['sql']['expire_rate_limit'], (key, window_minutes))
+        execute_query(config['sql']['delete_expired_rate_limits'])
+
+    execute_query(config['sql']['upsert_rate_limit'], (key, max_attempts, block_minutes))
+    counted = fetch_all(config['sql']['get_rate_limit'], (key,))[0]
+
+    if counted['attempts'] < max_attempts:
+        return 0
+    return blocked_for(counted, now) or block_minutes * 60
@@ -0,0 +1,238 @@
+# utils/shared_cache.py
+#
+# Reference data shared by all gunicorn workers: domains, super_admin
+# addresses, static CSS... read on most requests, rarely written, and until
+# now fetched again by every worker.
+#
+# Entries live in one file that every process maps in memory, under
+# SHARED_CACHE_DIR, so workers forked from a --preload master read the same
+# pages. The file has a fixed size: a header holding one version counter per
+# scope, then SHARED_CACHE_SLOTS slots of SHARED_CACHE_SLOT_BYTES each.
+#
+#   domains = shared_cache.get('domains', 'all', load_domains)
+#   ...
+#   shared_cache.invalidate('domains')    # after a write, from any worker
+#
+# An entry is valid while its scope is still at the version it was loaded
+# at, and for SHARED_CACHE_TTL seconds at most: that bounds staleness for
+# writes made outside pymailadmin (the domains belong to the mail server).
+# Invalidating a scope bumps its counter in the file, so every worker misses
+# on its next read.
+#
+# Writers lock the file (flock). Readers don't: a slot carries a sequence
+# number, odd while it is being written, and the CRC of its value, and a read
+# that raced a write is a miss. Values are stored as JSON; a value larger
+# than a slot, or None, is not cached.
+
+import fcntl
+import hashlib
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from libs import config, register_reload_hook
+from utils import metrics
+
+# Scopes invalidated together; their order is the layout of the header
+SCOPES = ('domains', 'admins', 'static')
+
+MAGIC = b'PMASC001'
+HEADER = struct.Struct('<8sII')  # magic, slots, slot bytes
+HEADER_SIZE = 4096
+VERSIONS_OFFSET = 64
+VERSION = struct.Struct('<Q')
+
+# seq, key hash, scope, value length, scope version, stored at, CRC32, padding
+SLOT = struct.Struct('<QQIIQdII')
+
+# Slots a key may live in, from its hash on
+PROBES = 4
+
+MISSING = object()
+
+class Store:
+    """The cache file, mapped in this process"""
+
+    def __init__(self, path, slots, slot_bytes):
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+        self.capacity = slot_bytes - SLOT.size
+        self.lock = threading.Lock()
+        self.map = None
+        size = HEADER_SIZE + slots * slot_bytes
+
+        self.fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_NOFOLLOW, 0o600)
+        try:
+            with self.locked():
+                # Only ever grown: other processes may have it mapped
+                if os.fstat(self.fd).st_size < size:
+                    os.ftruncate(self.fd, size)
+                self.map = mmap.mmap(self.fd, size)
+                if HEADER.unpack_from(self.map, 0)[0] != MAGIC:
+                    HEADER.pack_into(self.map, 0, MAGIC, slots, slot_bytes)
+        except Exception:
+            self.close()
+            raise
+
+    def close(self):
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+        os.close(self.fd)
+
+    @contextmanager
+    def locked(self):
+        # flock excludes other processes, the lock other threads of this one
+        with self.lock:
+            fcntl.flock(self.fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self.fd, fcntl.LOCK_UN)
+
+    def version(self, scope):
+        return VERSION.unpack_from(self.map, VERSIONS_OFFSET + scope * VERSION.size)[0]
+
+    def bump(self, scope):
+        with self.locked():
+            offset = VERSIONS_OFFSET + scope * VERSION.size
+            VERSION.pack_into(self.map, offset, VERSION.unpack_from(self.map, offset)[0] + 1)
+
+    def offsets(self, key_hash):
+        return [HEADER_SIZE + ((key_hash + n) % self.slots) * self.slot_bytes for n in range(PROBES)]
+
+    def is_live(self, entry, now, ttl):
+        seq, key_hash, scope, length, version, stored_at, crc, _ = entry
+        return key_hash != 0 and scope < len(SCOPES) and version == self.version(scope) and stored_at + ttl > now
+
+    def read(self, key_hash, scope, version, ttl):
+        for offset in self.offsets(key_hash):
+            seq, slot_hash, slot_scope, length, slot_version, stored_at, crc, _ = SLOT.unpack_from(self.map, offset)
+            if slot_hash != key_hash or seq % 2:
+                continue
+            if slot_scope != scope or slot_version != version or stored_at + ttl <= time.time() or length > self.capacity:
+                return MISSING
+
+            start = offset + SLOT.size
+            data = self.map[start:start + length]
+            if VERSION.unpack_from(self.map, offset)[0] != seq or zlib.crc32(data) != crc:
+                return MISSING
+            return json.loads(data)
+        return MISSING
+
+    def write(self, key_hash, scope, version, data, ttl):
+        """Store one value. Returns 'stored', 'evicted' (a live entry made room) or 'too_large'"""
+        if len(data) > self.capacity:
+            return 'too_large'
+
+        with self.locked():
+            now = time.time()
+            entries = [(offset, SLOT.unpack_from(self.map, offset)) for offset in self.offsets(key_hash)]
+
+            # The key's own slot, else a free or stale one, else the oldest entry
+            target = next((e for e in entries if e[1][1] == key_hash), None)
+            if target is None:
+                target = next((e for e in entries if not self.is_live(e[1], now, ttl)), None)
+            evicted = target is None
+            if evicted:
+                target = min(entries, key=lambda e: e[1][5])
+
+            offset, entry = target
+            seq = entry[0] + 1 if entry[0] % 2 == 0 else entry[0]
+            start = offset + SLOT.size
+
+            # Odd sequence while the slot changes, even once it is consistent
+            SLOT.pack_into(self.map, offset, seq, key_hash, scope, len(data), version, now, zlib.crc32(data), 0)
+            self.map[start:start + len(data)] = data
+            VERSION.pack_into(self.map, offset, seq + 1)
+
+        return 'evicted' if evicted else 'stored'
+
+_store = None
+_store_lock = threading.Lock()
+
+def _reset_after_fork():
+    # The inherited descriptor shares its flock with the parent: reopen
+    global _store
+    if _store:
+        _store.close()
+    _store = None
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+def get_cache_config():
+    return config.get('shared_cache', {})
+
+def get_ttl():
+    return get_cache_config().get('ttl_seconds', 300)
+
+def get_store():
+    """This process' mapping of the cache file, None if it can't be opened"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                cache_conf = get_cache_config()
+                slots, slot_bytes = cache_conf.get('slots', 128), cache_conf.get('slot_bytes', 131072)
+                try:
+                    os.makedirs(cache_conf['dir'], mode=0o700, exist_ok=True)
+                    path = os.path.join(cache_conf['dir'], f"cache-{slots}x{slot_bytes}.bin")
+                    _store = Store(path, slots, slot_bytes)
+                except Exception as e:
+                    logging.error(f"Shared cache unavailable, reading through: {e}")
+                    _store = False
+    return _store or None
+
+def key_hash(scope, key):
+    digest = hashlib.blake2b(f"{scope}\0{key}".encode('utf-8'), digest_size=8).digest()
+    # 0 marks a free slot
+    return int.from_bytes(digest, 'little') or 1
+
+def get(scope, key, loader):
+    """loader()'s value, from the shared cache while it is valid"""
+    ttl = get_ttl()
+    store = get_store() if ttl > 0 else None
+    if store is None:
+        return loader()
+
+    scope_index = SCOPES.index(scope)
+    h = key_hash(scope, key)
+    version = store.version(scope_index)
+
+    value = store.read(h, scope_index, version, ttl)
+    if value is not MISSING:
+        metrics.inc('pymailadmin_shared_cache_requests_total', {'cache': scope, 'result': 'hit'})
+        return value
+
+    metrics.inc('pymailadmin_shared_cache_requests_total', {'cache': scope, 'result': 'miss'})
+    value = loader()
+
+    if value is not None:
+        # Stored at the version read before loading: a write meanwhile makes it stale
+        try:
+            data = json.dumps(value, separators=(',', ':')).encode('utf-8')
+            result = store.write(h, scope_index, version, data, ttl)
+            metrics.inc('pymailadmin_shared_cache_stores_total', {'cache': scope, 'result': result})
+        except (TypeError, ValueError) as e:
+            logging.error(f"Value of {scope}/{key} not cached: {e}")
+
+    return value
+
+def invalidate(*scopes):
+    """Make every worker reload these scopes on their next read"""
+    store = get_store() if get_ttl() > 0 else None
+    if store is None:
+        return
+    for scope in scopes:
+        store.bump(SCOPES.index(scope))
+
+def invalidate_all():
+    invalidate(*SCOPES)
+
+# A new configuration may point at other tables or files
+register_reload_hook(invalidate_all)
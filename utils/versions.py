@@ -0,0 +1,88 @@
+# utils/versions.py
+
+import hashlib
+import logging
+from utils.db import fetch_all, execute_query
+from libs import config
+
+# Change token scopes:
+#   global          bumped by every write, covers super_admin's all-domains views
+#   domain:<id>     bumped by writes on mailboxes/aliases of that domain
+#   admin:<id>      bumped by writes on what that admin owns
+GLOBAL_SCOPE = 'global'
+
+def domain_scope(domain_id):
+    return f"domain:{domain_id}"
+
+def admin_scope(admin_user_id):
+    return f"admin:{admin_user_id}"
+
+def bump_versions(*scopes):
+    """
+    Invalidate cached pages for the given scopes (plus the global one).
+    A failure here must never fail the write that triggered it.
+    """
+    for scope in {GLOBAL_SCOPE, *scopes}:
+        try:
+            execute_query(config['sql']['bump_version'], (scope,))
+        except Exception as e:
+            logging.error(f"Error bumping version for {scope}: {e}")
+
+def get_versions(scopes):
+    """Fetch change tokens for several scopes in one query"""
+    scopes = list(scopes)
+    placeholders = ", ".join(["%s"] * len(scopes))
+    rows = fetch_all(config['sql']['select_versions_in'].format(scopes=placeholders), tuple(scopes))
+    versions = {row['scope']: row['version'] for row in rows}
+    return {scope: versions.get(scope, 0) for scope in scopes}
+
+def compute_etag(scopes, *extra):
+    """
+    Weak ETag from the scopes' change tokens and whatever else shapes the
+    page (user, role, query string...). Returns None if tokens can't be read.
+    """
+    try:
+        versions = get_versions(scopes)
+    except Exception as e:
+        logging.error(f"Error fetching versions: {e}")
+        return None
+    
+    parts = [f"{scope}={version}" for scope, version in sorted(versions.items())]
+    parts.extend(str(value) for value in extra)
+    digest = hashlib.blake2b("|".join(parts).encode(), digest_size=12).hexdigest()
+    return f'W/"{digest}"'
+
+def etag_matches(environ, etag):
+    """Weak comparison against If-None-Match, as required for GET"""
+    if_none_match = environ.get('HTTP_IF_NONE_MATCH', '')
+    
+    if not etag or not if_none_match:
+        return False
+    
+    if if_none_match.strip() == '*':
+        return True
+    
+    opaque = etag[2:] if etag.startswith('W/') else etag
+    
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    
+    return False
+
+def cache_headers(etag):
+    """Headers making browsers revalidate every time, with the ETag when known"""
+    headers = [("Cache-Control", "private, no-cache")]
+    if etag:
+        headers.append(("ETag", etag))
+    return headers
+
+def not_modified(environ, start_response, etag):
+    """Answer 304 if the client already has this version, else return None"""
+    if environ.get('REQUEST_METHOD', 'GET') in ('GET', 'HEAD') and etag_matches(environ, etag):
+        start_response("304 Not Modified", cache_headers(etag))
+        return [b""]
+    return None